@@ -0,0 +1,334 @@
+"""Offline benchmarks for the indicator, tick, decision and order hot paths.
+
+Runs against seeded synthetic candles and ticks and a StubKite in place of
+KiteApp, so results only move when the code does. Every case is timed several
+times and its median kept; results go out as JSON and can be saved as a
+baseline and compared against on later runs, e.g.
+
+    python bench.py --save-baseline bench_baseline.json
+    python bench.py --baseline bench_baseline.json   # exits 1 on a regression
+"""
+import argparse
+import itertools
+import json
+import logging
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import pandas as pd
+import requests
+import urllib3
+
+SEED = 42
+REPEATS = 7
+TOLERANCE = 0.15  # Slowdown (as a fraction of the baseline) flagged as a regression
+SESSION_MINUTES = 375  # 09:15 to 15:30
+ORDER_PLACED = b'{"status": "success", "data": {"order_id": "151220000000000"}}'
+
+BENCHMARKS = {}  # group -> function(quick) yielding (name, Result)
+
+
+def benchmark(group):
+    def register(fn):
+        BENCHMARKS[group] = fn
+        return fn
+    return register
+
+
+class Result:
+    """Median of the repeated timings, in the unit the case is judged by."""
+
+    def __init__(self, samples, unit, higher_is_better=False):
+        self.samples = samples
+        self.unit = unit
+        self.higher_is_better = higher_is_better
+
+    def as_dict(self):
+        return {"value": statistics.median(self.samples), "best": max(self.samples) if self.higher_is_better else
+                min(self.samples), "unit": self.unit, "higher_is_better": self.higher_is_better,
+                "runs": len(self.samples)}
+
+
+def latency(fn, repeats=REPEATS, number=1, setup=None):
+    """Milliseconds per call of fn(), median over `repeats` timings of `number` calls."""
+    samples = []
+    for _ in range(repeats):
+        state = setup() if setup else None
+        started = time.perf_counter()
+        for _ in range(number):
+            fn(state) if setup else fn()
+        samples.append((time.perf_counter() - started) * 1000 / number)
+    return Result(samples, "ms")
+
+
+def throughput(fn, items, repeats=REPEATS):
+    """Items per second through fn(), which processes `items` items per call."""
+    samples = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        samples.append(items / (time.perf_counter() - started))
+    return Result(samples, "per_s", higher_is_better=True)
+
+
+def make_instruments(count):
+    return [{"token": 100000 + i, "symbol": f"SYM{i}", "exchange": "NSE"} for i in range(count)]
+
+
+def make_candles(token, from_date, to_date, interval_minutes=1):
+    """Seeded random-walk candles for every session minute in [from_date, to_date]."""
+    rng = np.random.default_rng(token)
+    day = from_date.replace(hour=0, minute=0, second=0, microsecond=0)
+    dates = []
+    while day <= to_date:
+        if day.weekday() < 5:
+            opened = day.replace(hour=9, minute=15)
+            dates.extend(opened + timedelta(minutes=m) for m in range(0, SESSION_MINUTES, interval_minutes))
+        day += timedelta(days=1)
+    dates = [d for d in dates if from_date <= d <= to_date]
+    close = 1000 + np.cumsum(rng.normal(0, 0.5, len(dates)))
+    spread = rng.random(len(dates))
+    return [{"date": d, "open": c, "high": c + s, "low": c - s, "close": c, "volume": 100}
+            for d, c, s in zip(dates, close.tolist(), spread.tolist())]
+
+
+def make_ticks(instruments, count, rng):
+    tokens = [instrument["token"] for instrument in instruments]
+    now = datetime.now()
+    return [{"instrument_token": rng.choice(tokens), "last_price": 1000 + rng.random() * 10,
+             "ohlc": {"open": 1000, "high": 1010, "low": 990, "close": 1000}, "exchange_timestamp": now,
+             "volume_traded": 1000} for _ in range(count)]
+
+
+class StubKite:
+    """Just enough of KiteApp for the hot paths: instant orders, synthetic candles, no network."""
+
+    def __init__(self):
+        self.order_ids = itertools.count(1)
+        self.order_tag = "bench"
+        self.updates = None  # order_waiter.OrderUpdates to push fills into, like the websocket would
+        self.candles = {}
+
+    def historical_data(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
+        parse = lambda d: d if isinstance(d, datetime) else datetime.strptime(d, "%Y-%m-%d %H:%M:%S")
+        minutes = 1 if interval == "minute" else int(interval[:-6]) if interval.endswith("minute") else SESSION_MINUTES
+        return make_candles(instrument_token, parse(from_date), parse(to_date), minutes)
+
+    def place_order(self, variety, **params):
+        order_id = str(next(self.order_ids))
+        if self.updates:
+            self.updates.update({"order_id": order_id, "status": "COMPLETE", "filled_quantity": params["quantity"],
+                                 "average_price": params.get("price") or 0, **params})
+        return order_id
+
+    def orders(self):
+        return []
+
+    def positions(self):
+        return {"net": [], "day": []}
+
+    def order_history(self, order_id):
+        return [{"order_id": order_id, "status": "COMPLETE", "filled_quantity": 1}]
+
+    def margins(self, segment=None):
+        return {"available": {"live_balance": 1e9}}
+
+
+class CannedAdapter(requests.adapters.BaseAdapter):
+    """requests transport that answers every order with an order ID, so only the client's own work is timed."""
+
+    def send(self, request, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["Content-Type"] = "application/json"
+        response._content = ORDER_PLACED
+        response.request, response.url = request, request.url
+        return response
+
+    def close(self):
+        pass
+
+
+class CannedPool:
+    """The same for an OrderChannel's urllib3 pool."""
+
+    def urlopen(self, method, url, body=None, headers=None, **kwargs):
+        return urllib3.HTTPResponse(ORDER_PLACED, headers={"Content-Type": "application/json"}, status=200)
+
+    def close(self):
+        pass
+
+
+class NullExecutor:
+    def refresh_all(self):
+        pass
+
+    def place_sell_order(self, instrument, ltp):
+        pass
+
+
+@benchmark("indicators")
+def bench_indicators(quick):
+    from indicators import calculate_indicators
+    lengths = [375, 1875] if quick else [375, 1875, 9375]  # 1, 5 and 25 sessions of minute bars
+    counts = [1, 10] if quick else [1, 10, 50]
+    end = datetime(2025, 3, 7, 15, 29)
+    for length in lengths:
+        base = pd.DataFrame(make_candles(1, end - timedelta(days=length // SESSION_MINUTES * 7 // 5 + 2), end))
+        base = base.tail(length).reset_index(drop=True)
+        for count in counts:
+            yield f"indicators.calculate_all.{length}bars.x{count}", latency(
+                lambda state: [calculate_indicators(df) for df in state],
+                setup=lambda: [base[["date", "open", "high", "low", "close", "volume"]].copy() for _ in range(count)])
+
+
+@benchmark("ticks")
+def bench_ticks(quick):
+    from scanner import UniverseState
+    from candles import CandleStore
+    from pnl import PnLEngine
+    rng = random.Random(SEED)
+    batch = 1000 if quick else 10000
+    for count in ([50] if quick else [50, 2000]):
+        instruments = make_instruments(count)
+        ticks = make_ticks(instruments, batch, rng)
+
+        universe = UniverseState(instruments)
+        yield f"ticks.universe_state.{count}tokens", throughput(lambda: universe.on_ticks(None, ticks), batch)
+
+        store = CandleStore(StubKite(), history_days=1)
+        for instrument in instruments:
+            store.refresh(instrument)
+        yield f"ticks.candle_store.{count}tokens", throughput(lambda: store.on_ticks(None, ticks), batch)
+
+        pnl = PnLEngine()
+        for instrument in instruments[:20]:
+            pnl.on_order_update({"order_id": instrument["symbol"], "status": "COMPLETE", "tradingsymbol": instrument["symbol"],
+                                 "instrument_token": instrument["token"], "exchange": "NSE", "transaction_type": "SELL",
+                                 "filled_quantity": 10, "average_price": 1000, "product": "MIS"})
+        yield f"ticks.pnl.{count}tokens", throughput(lambda: pnl.on_ticks(None, ticks), batch)
+
+
+@benchmark("decision")
+def bench_decision(quick):
+    from strategy_host import StrategyHost
+    from strategies import MA50OrLowerBB, MA50CrossOnce, MA50TrendConfirmed, ConfiguredRules
+    for count in ([5] if quick else [5, 25]):
+        instruments = make_instruments(count)
+        live_data = {instrument["token"]: {"ltp": 1000.0, "high": 1010.0, "low": 990.0} for instrument in instruments}
+        strategies = [MA50OrLowerBB(), MA50CrossOnce(), MA50TrendConfirmed(),
+                      ConfiguredRules({"default": "ltp < 50MA and RSI > 30"})]
+        host = StrategyHost(StubKite(), instruments, strategies, NullExecutor(), live_data)
+        host.run_cycle()  # First cycle fetches history; later ones run from the CandleStore like the live loop
+        yield f"decision.run_cycle.{count}instruments.x{len(strategies)}strategies", latency(host.run_cycle)
+
+
+@benchmark("orders")
+def bench_orders(quick):
+    from multi_account import AccountSession
+    from order_waiter import OrderUpdates
+    from pnl import PnLEngine
+    from pretrade import PreTradeValidator
+    from ratelimit import RateLimiter
+    from risk import RiskEngine
+    from submission import OrderSubmitter
+    instrument = {"token": 408065, "symbol": "INFY", "exchange": "NSE"}
+    number = 200 if quick else 2000
+
+    validator = PreTradeValidator(StubKite(), {"INFY": {"sl_buffer": 2, "target_buffer": 4, "quantity": 1}})
+    yield "orders.pretrade_validate", latency(lambda: validator.validate(instrument, 1, 1500.0), number=number)
+
+    risk = RiskEngine(PnLEngine(), {"max_gross_notional": 1e9, "max_net_notional": 1e9, "max_underlying_notional": 1e9,
+                                    "max_sector_notional": 1e9, "max_open_orders": 1000}, {"INFY": "IT"})
+    yield "orders.risk_check", latency(lambda: risk.check(instrument, 1, 1500.0), number=number)
+
+    kite = StubKite()
+    submitter = OrderSubmitter(kite, RateLimiter(1e9))
+    params = dict(variety="regular", exchange="NSE", tradingsymbol="INFY", transaction_type="SELL", quantity=1,
+                  product="MIS", order_type="LIMIT", price=1500.0, validity="DAY")
+    yield "orders.submitter_place", latency(lambda: submitter.place(**params), number=number // 4)
+    submitter.shutdown()
+
+    kite = StubKite()
+    kite.updates = OrderUpdates()
+    session = AccountSession(kite, "BENCH")
+    session.limiter = RateLimiter(1e9)
+    session.order_updates = kite.updates
+    config = {"sl_buffer": 2, "target_buffer": 4, "quantity": 1}
+    yield "orders.place_bracket", latency(lambda: session.place_bracket(instrument, 1500.0, config), number=number // 4)
+
+    # One order through KiteApp's generic _request against the same order through the prebuilt OrderChannel
+    import kiteapp
+    from order_channel import OrderChannel
+    kite = kiteapp.KiteApp("kite", "BENCH", "enctoken")
+    kite.reqsession.mount("https://", CannedAdapter())
+    yield "orders.send_generic", latency(lambda: kite.place_order(**params), number=number)
+    channel = OrderChannel(kite)
+    channel.pool = CannedPool()
+    channel.prepare([instrument])
+    yield "orders.send_channel", latency(lambda: channel.place_order(**params), number=number)
+
+
+def run(groups, quick=False):
+    logging.disable(logging.CRITICAL)  # The hot paths log per call; don't time the log handlers
+    results = {}
+    for group in groups:
+        for name, result in BENCHMARKS[group](quick):
+            results[name] = result.as_dict()
+            print(f"{name:60s} {results[name]['value']:14.4f} {result.unit}", file=sys.stderr)
+    logging.disable(logging.NOTSET)
+    return {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                 "machine": platform.machine(), "platform": platform.platform(), "quick": quick,
+                 "time": datetime.now().isoformat(timespec="seconds")},
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance=TOLERANCE):
+    """Names of cases that got worse than the baseline by more than `tolerance`, with the change."""
+    regressions = {}
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if not before or not before["value"]:
+            continue
+        change = result["value"] / before["value"] - 1
+        if result["higher_is_better"]:
+            change = before["value"] / result["value"] - 1 if result["value"] else float("inf")
+        if change > tolerance:
+            regressions[name] = {"baseline": before["value"], "current": result["value"], "slowdown": change}
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the trading hot paths offline.")
+    parser.add_argument("groups", nargs="*", default=list(BENCHMARKS), help=f"Any of {list(BENCHMARKS)}")
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes, for a fast check")
+    parser.add_argument("--out", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--save-baseline", help="Also save the results as the baseline file")
+    parser.add_argument("--baseline", help="Compare against this baseline and exit 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = parser.parse_args()
+
+    current = run(args.groups, args.quick)
+    if args.baseline:
+        with open(args.baseline) as f:
+            current["regressions"] = compare(current, json.load(f), args.tolerance)
+    output = json.dumps(current, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            f.write(output + "\n")
+
+    for name, regression in current.get("regressions", {}).items():
+        print(f"REGRESSION {name}: {regression['baseline']:.4f} -> {regression['current']:.4f} "
+              f"({regression['slowdown']:+.0%})", file=sys.stderr)
+    sys.exit(1 if current.get("regressions") else 0)
@@ -0,0 +1,214 @@
+import logging
+import threading
+from datetime import timedelta
+import pandas as pd
+from indicators import IndicatorFrame
+import clock
+
+log = logging.getLogger(__name__)
+
+BASE_INTERVAL = "minute"
+HISTORY_DAYS = 5
+SESSION_OPEN = {"MCX": 9 * 60, "NCO": 9 * 60}  # Minutes after midnight; NSE/BSE/NFO open at 09:15
+DEFAULT_SESSION_OPEN = 9 * 60 + 15
+DATE, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+
+def interval_minutes(interval):
+    """2 for "2minute", 1 for "minute", None for intervals that aren't built from minute bars ("day")."""
+    if interval == "minute":
+        return 1
+    if interval.endswith("minute") and interval[:-6].isdigit():
+        return int(interval[:-6])
+    return None
+
+
+def bucket_start(date, minutes, session_open):
+    """Start of the `minutes`-long bar a minute bar falls in, aligned to the session open like Kite's own candles."""
+    offset = date.hour * 60 + date.minute - session_open
+    start = session_open + offset // minutes * minutes
+    return date.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0)
+
+
+def bucket_end(date, minutes, session_open):
+    """When the `minutes`-long bar holding `date` closes, on the same session-open alignment."""
+    return bucket_start(date, minutes, session_open) + timedelta(minutes=minutes)
+
+
+class BaseSeries:
+    """One token's 1-minute bars as [date, open, high, low, close, volume] rows, oldest first.
+
+    Filled from historical_data() and kept current from ticks between fetches;
+    dates are naive exchange-local times so API candles and tick times compare.
+    """
+
+    def __init__(self):
+        self.bars = []
+        self.resamplers = []  # Told the first index that changed, so they only redo their tail
+
+    def touch(self, index):
+        for resampled in self.resamplers:
+            resampled.dirty = min(resampled.dirty, index)
+
+    def merge(self, candles):
+        """Replace the fetched candles' span with them, keeping tick bars newer than the last one."""
+        if not candles:
+            return
+        rows = [[c["date"].replace(tzinfo=None), c["open"], c["high"], c["low"], c["close"], c.get("volume", 0)]
+                for c in candles]
+        keep = len(self.bars)
+        while keep and self.bars[keep - 1][DATE] >= rows[0][DATE]:
+            keep -= 1
+        newer = keep
+        while newer < len(self.bars) and self.bars[newer][DATE] <= rows[-1][DATE]:
+            newer += 1
+        self.bars[keep:newer] = rows
+        self.touch(keep)
+
+    def on_tick(self, price, when):
+        """Fold a trade into the forming minute bar (volume stays as last fetched)."""
+        minute = when.replace(second=0, microsecond=0, tzinfo=None)
+        if self.bars and self.bars[-1][DATE] == minute:
+            bar = self.bars[-1]
+            bar[HIGH] = max(bar[HIGH], price)
+            bar[LOW] = min(bar[LOW], price)
+            bar[CLOSE] = price
+            self.touch(len(self.bars) - 1)
+        elif not self.bars or minute > self.bars[-1][DATE]:
+            self.bars.append([minute, price, price, price, price, 0])
+            self.touch(len(self.bars) - 1)
+
+
+class Resampled:
+    """Bars of one timeframe kept in step with a BaseSeries.
+
+    Only the tail is recomputed: the bar holding the first changed base bar
+    and everything after it, so keeping a timeframe current costs a few rows
+    per update however long the history is.
+    """
+
+    def __init__(self, base, minutes, session_open):
+        self.base = base
+        self.minutes = minutes
+        self.session_open = session_open
+        self.bars = []
+        self.starts = []  # Index into the base bars where each resampled bar begins
+        self.dirty = 0  # First base index not yet reflected in self.bars
+        base.resamplers.append(self)
+
+    def update(self):
+        base = self.base
+        if self.dirty >= len(base.bars) and self.bars:
+            return
+        while self.starts and self.starts[-1] >= self.dirty:
+            self.bars.pop()
+            self.starts.pop()
+        # The bar the change falls into (or that new bars may extend) is rebuilt from its first minute
+        rebuild = self.starts.pop() if self.starts else 0
+        if self.bars:
+            self.bars.pop()
+        for i in range(rebuild, len(base.bars)):
+            row = base.bars[i]
+            key = bucket_start(row[DATE], self.minutes, self.session_open)
+            if self.bars and self.bars[-1][DATE] == key:
+                bar = self.bars[-1]
+                bar[HIGH] = max(bar[HIGH], row[HIGH])
+                bar[LOW] = min(bar[LOW], row[LOW])
+                bar[CLOSE] = row[CLOSE]
+                bar[VOLUME] += row[VOLUME]
+            else:
+                self.bars.append([key, row[OPEN], row[HIGH], row[LOW], row[CLOSE], row[VOLUME]])
+                self.starts.append(i)
+        self.dirty = len(base.bars)
+
+    def frame(self):
+        self.update()
+        return pd.DataFrame(self.bars, columns=["date", "open", "high", "low", "close", "volume"])
+
+
+class CandleStore:
+    """Every timeframe a strategy asks for, resampled from one 1-minute series per token.
+
+    The first request for a token fetches HISTORY_DAYS of minute bars; after
+    that each refresh() asks only for the bars since the last one the API
+    returned, at most once per minute, and ticks keep the forming bar current
+    in between. Bars built from ticks are only stand-ins until a fetch replaces
+    them, so an outage leaves no gap. Asking for another timeframe of the same
+    token costs no API call at all.
+    """
+
+    def __init__(self, kite, history_days=HISTORY_DAYS):
+        self.kite = kite
+        self.history_days = history_days
+        self.series = {}  # instrument token -> BaseSeries
+        self.resampled = {}  # (instrument token, minutes) -> Resampled
+        self.exchanges = {}  # instrument token -> exchange, for the session open
+        self.fetched_at = {}  # instrument token -> minute of the last fetch
+        self.synced = {}  # instrument token -> date of the last bar historical_data() returned
+        self.lock = threading.Lock()
+
+    def on_ticks(self, ws, ticks):
+        with self.lock:
+            for tick in ticks:
+                series = self.series.get(tick["instrument_token"])
+                if series is not None:
+                    series.on_tick(tick["last_price"], tick.get("exchange_timestamp") or clock.now())
+
+    def refresh(self, instrument):
+        """Bring a token's minute bars up to date with the fewest candles fetched."""
+        token = instrument["token"]
+        now = clock.now()
+        minute = now.replace(second=0, microsecond=0)
+        series = self.series.get(token)
+        if series is not None and self.fetched_at.get(token) == minute:
+            return series  # Already synced this minute; ticks cover the rest
+        from_date = self.synced.get(token) or now - timedelta(days=self.history_days)
+        try:
+            candles = self.kite.historical_data(instrument_token=token,
+                                                from_date=from_date.strftime("%Y-%m-%d %H:%M:%S"),
+                                                to_date=now.strftime("%Y-%m-%d %H:%M:%S"), interval=BASE_INTERVAL)
+        except Exception as e:
+            log.error(f"Error fetching minute candles for {instrument['symbol']}: {e}")
+            return series
+        with self.lock:
+            if series is None:
+                series = self.series[token] = BaseSeries()
+                self.exchanges[token] = instrument.get("exchange")
+            self.merge(series, token, candles)
+            self.fetched_at[token] = minute
+        return series
+
+    def merge(self, series, token, candles):
+        series.merge(candles)
+        if candles:
+            self.synced[token] = candles[-1]["date"].replace(tzinfo=None)
+
+    def backfill(self, token, candles):
+        """ManagedFeed's on_backfill: merge the minute candles missed while the websocket was down."""
+        with self.lock:
+            series = self.series.get(token)
+            if series is not None:
+                self.merge(series, token, candles)
+
+    def mark_fetched(self, minute):
+        """Count every loaded series as synced at `minute`, e.g. the open when nothing can have formed since the last fetch."""
+        with self.lock:
+            for token in self.series:
+                self.fetched_at[token] = minute
+
+    def frame(self, instrument, interval):
+        """IndicatorFrame of `interval` bars for an instrument, or None if there are no candles."""
+        minutes = interval_minutes(interval)
+        if minutes is None:
+            raise ValueError(f"{interval} candles can't be built from minute bars")
+        series = self.refresh(instrument)
+        if series is None or not series.bars:
+            return None
+        token = instrument["token"]
+        with self.lock:
+            resampled = self.resampled.get((token, minutes))
+            if resampled is None:
+                session_open = SESSION_OPEN.get(self.exchanges.get(token), DEFAULT_SESSION_OPEN)
+                resampled = self.resampled[(token, minutes)] = Resampled(series, minutes, session_open)
+            df = resampled.frame()
+        return IndicatorFrame(df)
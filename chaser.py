@@ -0,0 +1,160 @@
+import logging
+import math
+import threading
+import clock
+from ratelimit import RateLimiter, ORDER_RATE
+from order_waiter import TERMINAL_STATUSES
+
+log = logging.getLogger(__name__)
+
+MAX_SLIPPAGE = 0.2  # Percent below the signal price a SELL entry may be repriced to
+CHASE_DEADLINE = 20  # Seconds to chase before the on-expiry action
+ON_EXPIRY = "market"  # "market" converts the remainder to MARKET, "cancel" gives up
+MIN_REPRICE_INTERVAL = 0.5  # Seconds between modify_order calls for one order
+STATUS_POLL = 1.0  # Seconds between orders() polls when there is no order-update stream
+DEFAULT_TICK = 0.05
+
+
+class Chase:
+    def __init__(self, order_id, instrument, quantity, price, floor, deadline, on_expiry, tick_size, variety):
+        self.order_id = order_id
+        self.symbol = instrument["symbol"]
+        self.token = instrument["token"]
+        self.quantity = quantity
+        self.price = price  # Limit price currently live at the broker
+        self.desired = price
+        self.floor = floor  # Lowest price the SELL may be repriced to
+        self.deadline = deadline
+        self.on_expiry = on_expiry
+        self.tick_size = tick_size
+        self.variety = variety
+        self.last_modify = 0.0
+        self.expired = False
+
+    def reprice(self, tick):
+        """Follow the best bid (or LTP without depth) down to the floor; True if the price should change."""
+        depth = tick.get("depth", {}).get("buy")
+        best = depth[0]["price"] if depth and depth[0]["price"] else tick["last_price"]
+        desired = max(self.floor, math.floor(round(best / self.tick_size, 6)) * self.tick_size)
+        desired = round(desired, 2)
+        if abs(desired - self.price) >= self.tick_size - 1e-9:
+            self.desired = desired
+            return True
+        self.desired = self.price
+        return False
+
+
+class LimitChaser:
+    """Reprice unfilled LIMIT entries against live ticks within a slippage cap and deadline.
+
+    All chases share the caller's on_ticks and one worker thread; repricing is
+    throttled per order and fill status comes from the order-update stream or a
+    single orders() poll for every chase at once.
+    """
+
+    def __init__(self, kite, updates=None, min_interval=MIN_REPRICE_INTERVAL):
+        self.kite = kite
+        self.updates = updates
+        self.min_interval = min_interval
+        self.limiter = RateLimiter(ORDER_RATE)
+        self.chases = {}  # order_id -> Chase
+        self.by_token = {}  # instrument token -> {order_id: Chase}
+        self.last_poll = 0.0
+        self.condition = threading.Condition()
+        self.running = True
+        self.worker = threading.Thread(target=self.run, name="limit-chaser", daemon=True)
+        self.worker.start()
+
+    def chase(self, order_id, instrument, quantity, price, max_slippage=MAX_SLIPPAGE, deadline=CHASE_DEADLINE,
+              on_expiry=ON_EXPIRY, tick_size=DEFAULT_TICK, variety="regular"):
+        floor = round(math.ceil(round(price * (1 - max_slippage / 100) / tick_size, 6)) * tick_size, 2)
+        chase = Chase(order_id, instrument, quantity, price, floor, clock.monotonic() + deadline, on_expiry,
+                      tick_size, variety)
+        with self.condition:
+            self.chases[order_id] = chase
+            self.by_token.setdefault(chase.token, {})[order_id] = chase
+            self.condition.notify()
+        log.info(f"Chasing SELL {order_id} for {chase.symbol} from {price} down to {floor} for {deadline}s")
+
+    def forget(self, order_id):
+        with self.condition:
+            chase = self.chases.pop(order_id, None)
+            if chase:
+                self.by_token.get(chase.token, {}).pop(order_id, None)
+
+    def on_ticks(self, ws, ticks):
+        moved = False
+        with self.condition:
+            for tick in ticks:
+                for chase in self.by_token.get(tick["instrument_token"], {}).values():
+                    moved = chase.reprice(tick) or moved
+            if moved:
+                self.condition.notify()
+
+    def statuses(self, now):
+        """Latest status per chased order, from the update stream or one throttled orders() call."""
+        if self.updates:
+            return {order_id: (self.updates.get(order_id) or {}).get("status") for order_id in self.chases}
+        if now - self.last_poll < STATUS_POLL:
+            return {}
+        self.last_poll = now
+        try:
+            return {order["order_id"]: order["status"] for order in self.kite.orders() if order["order_id"] in self.chases}
+        except Exception as e:
+            log.warning(f"Error polling chased orders: {e}")
+            return {}
+
+    def run(self):
+        while self.running:
+            with self.condition:
+                if not self.chases:
+                    clock.wait(self.condition)
+                    continue
+                clock.wait(self.condition, 0.1)
+            now = clock.monotonic()
+            for order_id, status in self.statuses(now).items():
+                if status in TERMINAL_STATUSES:
+                    log.info(f"Chased order {order_id} is {status}")
+                    self.forget(order_id)
+
+            with self.condition:
+                expired = [c for c in self.chases.values() if now >= c.deadline and not c.expired]
+                for chase in expired:
+                    chase.expired = True
+                # Longest-waiting orders first; whatever the rate budget can't cover waits for the next pass
+                reprice = sorted((c for c in self.chases.values() if now < c.deadline and c.desired != c.price
+                                  and now - c.last_modify >= self.min_interval), key=lambda c: c.last_modify)
+
+            for chase in expired:
+                self.expire(chase)
+            for chase in reprice:
+                if not self.limiter.try_acquire():
+                    break
+                chase.last_modify = now
+                price = chase.desired
+                try:
+                    self.kite.modify_order(variety=chase.variety, order_id=chase.order_id, price=price)
+                    chase.price = price
+                    log.info(f"Repriced SELL {chase.order_id} for {chase.symbol} to {price}")
+                except Exception as e:
+                    log.error(f"Error repricing {chase.order_id} for {chase.symbol}: {e}")
+
+    def expire(self, chase):
+        self.limiter.acquire()
+        try:
+            if chase.on_expiry == "market":
+                self.kite.modify_order(variety=chase.variety, order_id=chase.order_id, order_type="MARKET")
+                log.info(f"Chase deadline hit for {chase.symbol}: converted {chase.order_id} to MARKET")
+            else:
+                self.kite.cancel_order(variety=chase.variety, order_id=chase.order_id)
+                log.info(f"Chase deadline hit for {chase.symbol}: cancelled {chase.order_id}")
+        except Exception as e:
+            log.error(f"Error expiring chase {chase.order_id} for {chase.symbol}: {e}")
+        # A MARKET conversion stays tracked until its terminal status arrives
+        if chase.on_expiry != "market":
+            self.forget(chase.order_id)
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
@@ -1,11 +1,25 @@
 import kiteapp as kt
 import pandas as pd
-from datetime import datetime, timedelta
 import logging
-from tabulate import tabulate
-from instrument_config import instruments, trade_config
+from instrument_config import instruments, trade_config, risk_limits, sectors
+from pretrade import PreTradeValidator
+from order_waiter import OrderUpdates, await_fill, FILL_TIMEOUT
+from gtt import GTTManager, SL_SLIPPAGE
+from trailing_stop import TrailingStopEngine
+from chaser import LimitChaser
+from slicer import SliceExecutor, ProtectiveBracket
+from pnl import PnLEngine
+from risk import RiskEngine
+from paper import PaperBroker
+from killswitch import KillSwitch
+from submission import OrderSubmitter
+from feed import ManagedFeed
+from candles import CandleStore, BASE_INTERVAL
+from warmup import WarmUp
+from order_channel import OrderChannel
+from dashboard import DeskPublisher, account_port
 import threading
-from time import sleep
+import clock
 import signal
 import sys
 
@@ -13,8 +27,10 @@ import sys
 INTERVAL = "2minute"
 DURATION = 3  # Duration for each sleep cycle in seconds
 MANUAL_CLOSE_CHECK_INTERVAL = 60  # Interval to check for manually closed positions in seconds
-RETRY_DELAY = 2  # Delay between retries in seconds
-MAX_RETRIES = 3  # Maximum number of retries for placing SL and target orders
+DEFAULT_TRAIL = None  # e.g. {"mode": "atr", "distance": 2}; a "trail" entry in trade_config overrides it
+CHASE_ENTRIES = True  # Reprice unfilled LIMIT entries against the best bid, then convert to MARKET at the deadline
+USE_GTT_OCO = False  # Exit bracket as one broker-side GTT OCO instead of SL-M + LIMIT orders watched locally
+PAPER_TRADING = "--paper" in sys.argv  # Simulate orders against live ticks instead of sending them
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
@@ -32,9 +48,37 @@ logging.info("Kite API initialized successfully")
 # Initialize Kite Ticker
 kws = kite.kws()  # For Websocket
 
+if PAPER_TRADING:
+    # Order and portfolio calls stay in process; market data still comes from the real account
+    kite = PaperBroker(kite, instruments)
+    logging.info("📄 Paper trading: orders are simulated against live ticks")
+
+# Tags this session's orders; SIGINT/SIGTERM or `python killswitch.py` cancels them and squares off
+kill_switch = KillSwitch(kite)
+kill_switch.watch()
+channel = None if PAPER_TRADING else OrderChannel(kite)  # Entries and bracket legs from prebuilt requests on warm connections
+submitter = OrderSubmitter(channel or kite)  # Tagged, idempotent retries for entries and exits
+
+# Pre-trade checks: lot size, tick size and margin, with a negative cache for doomed orders
+validator = PreTradeValidator(kite, trade_config)
+validator.load_instruments(instruments)
+
 live_data = {}
 closed_positions_today = set()  # To track instruments with closed positions today
 open_orders = {}  # To track SL and target orders
+open_gtts = {}  # To track GTT OCO exit triggers when USE_GTT_OCO is on
+gtt_exits = {}  # symbol -> (exit order, quantity, stop) of a triggered GTT, until that order fills
+gtts = GTTManager(kite)
+trailing = TrailingStopEngine(kite)  # Trails SL-M legs from ticks, coalescing modify_order calls
+pnl = PnLEngine(risk_limits["daily_loss_limit"])  # Positions and P&L from fills and ticks, no positions() polling
+risk = RiskEngine(pnl, risk_limits, sectors)  # Notional, sector/underlying and open-order limits
+candles = CandleStore(kite)  # 5 days of minute bars fetched once, then only the new ones; INTERVAL bars resampled from them
+desk = DeskPublisher(instruments)  # LTP and indicators as evaluated here, for `python dashboard.py`
+try:
+    pnl.seed(kite.positions()["net"])
+    risk.seed_orders(kite.orders())
+except Exception as e:
+    logging.error(f"Error seeding P&L and risk from positions and orders: {e}")
 previous_candle_below_50ma = {}  # To track previous candle status for crossing below 50MA
 
 def on_ticks(ws, ticks):
@@ -44,22 +88,41 @@ def on_ticks(ws, ticks):
             "high": tick["ohlc"]["high"],
             "low": tick["ohlc"]["low"]
         }
+    candles.on_ticks(ws, ticks)
+    desk.on_ticks(ws, ticks)
+    pnl.on_ticks(ws, ticks)
+    trailing.on_ticks(ws, ticks)
+    chaser.on_ticks(ws, ticks)
     # Log ticks received at less frequent intervals
     if ticks:
         logging.debug("Received ticks for instruments: %s", [tick['instrument_token'] for tick in ticks])
 
 def on_connect(ws, response):
     ws.subscribe([instrument["token"] for instrument in instruments])
-    ws.set_mode(ws.MODE_QUOTE, [instrument["token"] for instrument in instruments])
+    # Full mode carries market depth, which the entry chaser reprices against
+    ws.set_mode(ws.MODE_FULL if CHASE_ENTRIES else ws.MODE_QUOTE, [instrument["token"] for instrument in instruments])
     logging.info("WebSocket connected and subscribed to instruments")
 
 def on_close(ws, code, reason):
-    ws.stop()
-    logging.info("WebSocket closed")
+    logging.info("WebSocket closed, reconnecting")
 
 kws.on_ticks = on_ticks
 kws.on_connect = on_connect
 kws.on_close = on_close
+# Reconnects and resubscribes; `ready` is clear until the minute bars missed while it was down are merged
+feed = ManagedFeed(kite, kws, BASE_INTERVAL, candles.backfill, instruments)
+
+# Order updates pushed over the websocket wake fill waiters immediately
+order_updates = OrderUpdates()
+order_updates.attach(kws)
+pnl.attach(kws)
+risk.attach(kws)
+if PAPER_TRADING:
+    kite.attach(kws)  # Last, so paper fills reach every order-update hook above
+chaser = LimitChaser(kite, order_updates)  # One shared tick loop for every unfilled entry
+slicer = SliceExecutor(kite, order_updates)  # Large entries are split into child orders
+warmup = WarmUp(kite, candles, instruments, validator)  # History, indicators, connections and websocket before the open
+warmup.attach(kws)
 
 def has_active_sell_order_or_position(symbol):
     """Check if there's an active SELL order or any position (open or closed) for the given symbol."""
@@ -86,29 +149,12 @@ def has_closed_position_today(symbol):
     return symbol in closed_positions_today
 
 def fetch_historical_data(instrument):
-    """Fetch historical OHLC data for the given instrument."""
-    today = datetime.now()
-    from_date = (today - timedelta(days=5)).strftime("%Y-%m-%d %H:%M:%S")
-    to_date = today.strftime("%Y-%m-%d %H:%M:%S")
-
-    logging.info(f"Fetching data for {instrument['symbol']} from {from_date} to {to_date}")
-
-    try:
-        data = kite.historical_data(
-            instrument_token=instrument["token"],
-            from_date=from_date,
-            to_date=to_date,
-            interval=INTERVAL
-        )
-
-        df = pd.DataFrame(data)
-        if df.empty:
-            logging.warning(f"No data available for {instrument['symbol']}. Market might be closed.")
-            return None
-        return df
-    except Exception as e:
-        logging.error(f"Error fetching historical data for {instrument['symbol']}: {e}")
+    """OHLC candles for the given instrument, from minute bars topped up at most once a minute."""
+    frame = candles.frame(instrument, INTERVAL)
+    if frame is None:
+        logging.warning(f"No data available for {instrument['symbol']}. Market might be closed.")
         return None
+    return frame.df
 
 def calculate_indicators(df):
     """Calculate 20MA, 50MA, Bollinger Bands, RSI, MACD for the stock."""
@@ -135,6 +181,11 @@ def calculate_indicators(df):
     df["MACD"] = df["12EMA"] - df["26EMA"]
     df["Signal_Line"] = df["MACD"].ewm(span=9, adjust=False).mean()
 
+    # Average True Range (for ATR trailing stops)
+    prev_close = df["close"].shift(1)
+    true_range = pd.concat([df["high"] - df["low"], (df["high"] - prev_close).abs(), (df["low"] - prev_close).abs()], axis=1).max(axis=1)
+    df["ATR"] = true_range.rolling(window=14).mean()
+
     return df
 
 def check_trade_condition(instrument):
@@ -160,12 +211,15 @@ def check_trade_condition(instrument):
     rsi = latest_candle["RSI"]
     macd = latest_candle["MACD"]
     signal_line = latest_candle["Signal_Line"]
+    trailing.set_atr(instrument["symbol"], latest_candle["ATR"])
+    desk.publish(instrument, lower_bb, ma_50, latest_candle["20MA"])
 
     logging.info(f"{instrument['symbol']} - Latest Close: {close_price}, 50MA: {ma_50}, Lower BB: {lower_bb}, RSI: {rsi}, MACD: {macd}, Signal Line: {signal_line}")
 
     # Example enhanced trade condition
     if close_price < ma_50 and not previous_candle_below_50ma.get(instrument["symbol"], False):
-        if has_active_sell_order_or_position(instrument["symbol"]):
+        # A symbol still in gtt_exits is open until its exit order fills, even if that fill is already in
+        if instrument["symbol"] in gtt_exits or has_active_sell_order_or_position(instrument["symbol"]):
             logging.info(f"Skipping SELL order for {instrument['symbol']} as an active order or position exists.")
         else:
             logging.info(f"Condition met for {instrument['symbol']}: Placing SELL order!")
@@ -174,6 +228,23 @@ def check_trade_condition(instrument):
     elif close_price >= ma_50:
         previous_candle_below_50ma[instrument["symbol"]] = False
 
+def place_sliced_sell_order(instrument, ltp, quantity, stop_loss, target, config):
+    """Work a large SELL as child orders (freeze-limit, TWAP or iceberg) and grow the SL/target with each fill."""
+    slicing = dict(config.get("slicing") or {"mode": "freeze"})
+    bracket = ProtectiveBracket(kite, instrument, stop_loss, target)
+    parent = slicer.execute(instrument, quantity, ltp, lot_size=validator.lot_size(instrument["symbol"]),
+                            freeze_quantity=config.get("freeze_quantity"),
+                            on_fill=lambda parent: bracket.resize(parent.filled), **slicing)
+    parent.wait()
+    logging.info(f"Sliced SELL for {instrument['symbol']} done: filled {parent.filled}/{quantity}")
+
+    if bracket.sl_order_id:
+        trail = config.get("trail", DEFAULT_TRAIL)
+        if trail:
+            trailing.track(instrument, bracket.sl_order_id, stop_loss, ltp, trail, validator.tick_size(instrument["symbol"]))
+        open_orders[instrument["symbol"]] = (bracket.sl_order_id, bracket.target_order_id)
+        monitor_oco_orders(bracket.sl_order_id, bracket.target_order_id, instrument["symbol"])
+
 def place_sell_order(instrument, ltp):
     """Place a SELL order for the given instrument and set stop-loss and target orders only if the main order is executed."""
     try:
@@ -181,10 +252,29 @@ def place_sell_order(instrument, ltp):
         sl_buffer = config["sl_buffer"]
         target_buffer = config["target_buffer"]
         quantity = config["quantity"]
-        stop_loss = round(ltp + sl_buffer, 2)
-        target = round(ltp - target_buffer, 2)
-
-        order_id = kite.place_order(
+        ltp = validator.round_to_tick(instrument["symbol"], ltp)
+        stop_loss = validator.round_to_tick(instrument["symbol"], ltp + sl_buffer, "up")
+        target = validator.round_to_tick(instrument["symbol"], ltp - target_buffer, "down")
+
+        if not pnl.allows_entry():
+            logging.info(f"Daily loss limit reached, skipping SELL order for {instrument['symbol']}")
+            return
+        ok, reason = risk.check(instrument, quantity, ltp)
+        if not ok:
+            logging.info(f"Risk limit rejected SELL order for {instrument['symbol']}: {reason}")
+            return
+
+        ok, reason = validator.validate(instrument, quantity, ltp)
+        if not ok:
+            logging.info(f"Pre-trade check rejected SELL order for {instrument['symbol']}: {reason}")
+            return
+
+        # Above the exchange freeze quantity (or with a slicing plan configured) the entry goes out in slices
+        if config.get("slicing") or quantity > config.get("freeze_quantity", quantity):
+            place_sliced_sell_order(instrument, ltp, quantity, stop_loss, target, config)
+            return
+
+        order_id = submitter.place(
             variety="regular",
             exchange=instrument["exchange"],
             tradingsymbol=instrument["symbol"],
@@ -197,59 +287,60 @@ def place_sell_order(instrument, ltp):
         )
         logging.info(f"✅ SELL Order placed successfully for {instrument['symbol']}! Order ID: {order_id}")
 
-        # Wait for order execution before placing SL and Target orders
-        sleep(2)
-        orders = kite.orders()
-
-        for order in orders:
-            if order["order_id"] == order_id and order["status"] == "COMPLETE":
-                # Place stop-loss order (BUY SL-M)
-                sl_order_id = place_order_with_retry(
-                    variety="regular",
-                    exchange=instrument["exchange"],
-                    tradingsymbol=instrument["symbol"],
-                    transaction_type="BUY",
-                    quantity=quantity,
-                    product="MIS",
-                    order_type="SL-M",
-                    trigger_price=stop_loss,
-                    validity="DAY"
-                )
-                logging.info(f"🛑 Stop-Loss Order placed at {stop_loss} for {instrument['symbol']}! Order ID: {sl_order_id}")
-
-                # Place target order (BUY LIMIT)
-                target_order_id = place_order_with_retry(
-                    variety="regular",
-                    exchange=instrument["exchange"],
-                    tradingsymbol=instrument["symbol"],
-                    transaction_type="BUY",
-                    quantity=quantity,
-                    product="MIS",
-                    order_type="LIMIT",
-                    price=target,
-                    validity="DAY"
-                )
-                logging.info(f"🎯 Target Order placed at {target} for {instrument['symbol']}! Order ID: {target_order_id}")
-
-                # Save the SL and target order IDs
-                open_orders[instrument["symbol"]] = (sl_order_id, target_order_id)
-                # Start monitoring the orders for OCO functionality
-                monitor_oco_orders(sl_order_id, target_order_id, instrument["symbol"])
+        if CHASE_ENTRIES:
+            chaser.chase(order_id, instrument, quantity, ltp, tick_size=validator.tick_size(instrument["symbol"]))
+
+        # Place SL and Target orders the moment the entry fills (cancelled if it doesn't fill in time)
+        filled_quantity = await_fill(kite, order_id, FILL_TIMEOUT, order_updates)
+        chaser.forget(order_id)
+
+        if filled_quantity and USE_GTT_OCO:
+            # One two-leg GTT: the broker cancels the other leg when either triggers
+            sl_price = validator.round_to_tick(instrument["symbol"], stop_loss * (1 + SL_SLIPPAGE), "up")
+            trigger_id = gtts.place_oco(instrument, filled_quantity, stop_loss, target, ltp, sl_price)
+            logging.info(f"🛑🎯 GTT OCO placed for {instrument['symbol']}: SL {stop_loss}, target {target}! Trigger ID: {trigger_id}")
+            open_gtts[instrument["symbol"]] = trigger_id
+        elif filled_quantity:
+            quantity = filled_quantity
+            # Place stop-loss (BUY SL-M) and target (BUY LIMIT) orders concurrently
+            sl_future = submitter.submit(
+                variety="regular",
+                exchange=instrument["exchange"],
+                tradingsymbol=instrument["symbol"],
+                transaction_type="BUY",
+                quantity=quantity,
+                product="MIS",
+                order_type="SL-M",
+                trigger_price=stop_loss,
+                validity="DAY"
+            )
+            target_future = submitter.submit(
+                variety="regular",
+                exchange=instrument["exchange"],
+                tradingsymbol=instrument["symbol"],
+                transaction_type="BUY",
+                quantity=quantity,
+                product="MIS",
+                order_type="LIMIT",
+                price=target,
+                validity="DAY"
+            )
+            sl_order_id = sl_future.result()
+            logging.info(f"🛑 Stop-Loss Order placed at {stop_loss} for {instrument['symbol']}! Order ID: {sl_order_id}")
+            target_order_id = target_future.result()
+            logging.info(f"🎯 Target Order placed at {target} for {instrument['symbol']}! Order ID: {target_order_id}")
+
+            trail = config.get("trail", DEFAULT_TRAIL)
+            if trail:
+                trailing.track(instrument, sl_order_id, stop_loss, ltp, trail, validator.tick_size(instrument["symbol"]))
+
+            # Save the SL and target order IDs
+            open_orders[instrument["symbol"]] = (sl_order_id, target_order_id)
+            # Start monitoring the orders for OCO functionality
+            monitor_oco_orders(sl_order_id, target_order_id, instrument["symbol"])
     except Exception as e:
         logging.error(f"Error placing SELL order for {instrument['symbol']}: {e}")
-
-def place_order_with_retry(**order_params):
-    """Place an order with retry logic."""
-    retries = 0
-    while retries < MAX_RETRIES:
-        try:
-            order_id = kite.place_order(**order_params)
-            return order_id
-        except Exception as e:
-            retries += 1
-            logging.error(f"Error placing order: {e}. Retrying {retries}/{MAX_RETRIES}...")
-            sleep(RETRY_DELAY)
-    raise Exception("Failed to place order after maximum retries")
+        validator.record_rejection(instrument, e)
 
 def monitor_oco_orders(sl_order_id, target_order_id, symbol):
     """Monitor SL and target orders and cancel the other if one is executed."""
@@ -264,18 +355,70 @@ def monitor_oco_orders(sl_order_id, target_order_id, symbol):
                 kite.cancel_order(variety="regular", order_id=target_order_id)
                 closed_positions_today.add(symbol)  # Mark as closed position for today
                 del open_orders[symbol]  # Remove from open orders
+                trailing.remove(symbol)
                 break
             elif target_order_status == "COMPLETE":
                 logging.info(f"Target order executed. Cancelling stop-loss order {sl_order_id}.")
                 kite.cancel_order(variety="regular", order_id=sl_order_id)
                 closed_positions_today.add(symbol)  # Mark as closed position for today
                 del open_orders[symbol]  # Remove from open orders
+                trailing.remove(symbol)
                 break
 
-            sleep(1)
+            clock.sleep(1)
     except Exception as e:
         logging.error(f"Error monitoring OCO orders: {e}")
 
+def check_gtt_exits():
+    """Refresh the GTT cache with one call, follow triggered OCOs to their exit fill and cover failed exits."""
+    if not open_gtts and not gtt_exits:
+        return
+    if open_gtts:
+        gtts.refresh()
+    for symbol, trigger_id in list(open_gtts.items()):
+        if gtts.is_active(trigger_id):
+            continue
+        status = gtts.status(trigger_id)
+        del open_gtts[symbol]
+        if status == "triggered":
+            # The GTT only placed a LIMIT leg; the short is open until that fills
+            gtt_exits[symbol] = gtts.exit_leg(trigger_id)
+            logging.info(f"GTT OCO {trigger_id} for {symbol} triggered. Exit order: {gtt_exits[symbol][0]}")
+        else:
+            logging.info(f"GTT OCO {trigger_id} for {symbol} is {status or 'gone'}. Position closed.")
+            closed_positions_today.add(symbol)  # Mark as closed position for today
+    if not gtt_exits:
+        return
+    try:
+        orders = {order["order_id"]: order for order in kite.orders()}
+        for symbol, (order_id, quantity, stop_loss) in list(gtt_exits.items()):
+            order = orders.get(order_id)
+            if order and order["status"] == "COMPLETE":
+                logging.info(f"GTT exit {order_id} for {symbol} filled. Position closed.")
+                closed_positions_today.add(symbol)  # Mark as closed position for today
+                del gtt_exits[symbol]
+            elif order_id is None or (order and order["status"] in ("REJECTED", "CANCELLED")):
+                remaining = quantity - ((order or {}).get("filled_quantity") or 0)
+                outcome = order["status"] if order else "NOT PLACED"
+                logging.warning(f"GTT exit for {symbol} {outcome}; covering {remaining} with a regular stop")
+                gtt_exits[symbol] = (cover_short(symbol, remaining, stop_loss), remaining, stop_loss)
+    except Exception as e:
+        logging.error(f"Error checking GTT exit orders: {e}")
+
+def cover_short(symbol, quantity, stop_loss):
+    """Protect a short with a BUY SL-M at its stop, or buy at market if the price is already past it."""
+    instrument = next(instrument for instrument in instruments if instrument["symbol"] == symbol)
+    ltp = live_data.get(instrument["token"], {}).get("ltp")
+    params = dict(variety="regular", exchange=instrument["exchange"], tradingsymbol=symbol, transaction_type="BUY",
+                  quantity=quantity, product="MIS", validity="DAY")
+    if ltp is not None and ltp >= stop_loss:
+        order_id = submitter.place(order_type="MARKET", **params)
+        logging.info(f"🛑 {symbol} is past its stop {stop_loss}; covering at market! Order ID: {order_id}")
+    else:
+        order_id = submitter.place(order_type="SL-M", trigger_price=stop_loss, **params)
+        logging.info(f"🛑 Fallback Stop-Loss Order placed at {stop_loss} for {symbol}! Order ID: {order_id}")
+    return order_id
+
 def check_manually_closed_positions():
     """Check for manually closed positions and cancel any remaining SL and target orders."""
     try:
@@ -288,11 +431,30 @@ def check_manually_closed_positions():
                 kite.cancel_order(variety="regular", order_id=target_order_id)
                 closed_positions_today.add(symbol)  # Mark as closed position for today
                 del open_orders[symbol]  # Remove from open orders
+                trailing.remove(symbol)
+        flat = [symbol for symbol in open_gtts
+                if next((p["quantity"] for p in positions["net"] if p["tradingsymbol"] == symbol), None) == 0]
+        if flat:
+            logging.info(f"Manually closed positions detected for {flat}. Deleting their GTTs.")
+            gtts.delete_many([open_gtts[symbol] for symbol in flat])
+            for symbol in flat:
+                closed_positions_today.add(symbol)  # Mark as closed position for today
+                del open_gtts[symbol]
     except Exception as e:
         logging.error(f"Error checking manually closed positions: {e}")
 
 def signal_handler(sig, frame):
-    logging.info("Interrupt received, stopping...")
+    logging.info("Interrupt received, flattening and stopping...")
+    # Stop everything that can place or modify orders before flattening
+    trailing.stop()
+    chaser.stop()
+    slicer.shutdown()
+    submitter.shutdown()
+    if channel:
+        channel.stop()
+    gtts.delete_many(list(open_gtts.values()))  # A GTT left live would re-open the flattened position
+    kill_switch.run()
+    gtts.shutdown()
     kws.stop()
     sys.exit(0)
 
@@ -305,14 +467,32 @@ ws_thread = threading.Thread(target=kws.connect)
 ws_thread.daemon = True
 ws_thread.start()
 
+def prepare_instrument(instrument):
+    """Build an instrument's frame and indicators once, so the first live evaluation pays no first-call costs."""
+    df = fetch_historical_data(instrument)
+    if df is not None:
+        calculate_indicators(df)
+
 try:
+    desk.serve(account_port(kite.user_id))
+    if channel:
+        logging.info(f"⚡ Order channel: {channel.prepare(instruments)} order templates, "
+                     f"{channel.start()} warm connections to {channel.origin}")
+    warmup.run(prepare_instrument)
+    warmup.park()  # Started before the open: waits here, warm, for the first tick of the session
+
     # Main loop (Runs continuously)
     while True:
         logging.info("Starting new cycle")
-        for instrument in instruments:
-            check_trade_condition(instrument)
+        validator.refresh_margins(instruments, live_data)
+        if feed.ready.is_set():
+            for instrument in instruments:
+                check_trade_condition(instrument)
+        else:
+            logging.warning("Market feed is down, holding entry signals until it is back")
+        check_gtt_exits()  # One get_gtts() call covers every open GTT bracket
         check_manually_closed_positions()  # Check for manually closed positions
         logging.info(f"Sleeping for {DURATION} seconds...\n")
-        sleep(DURATION)
+        clock.sleep(DURATION)
 except (KeyboardInterrupt, SystemExit):
     signal_handler(None, None)
\ No newline at end of file
@@ -0,0 +1,258 @@
+"""Wall clock, timers and waits for the live engine, swappable for a simulated clock.
+
+Code reads the time and blocks through this module - clock.now(), clock.time(),
+clock.monotonic(), clock.sleep(s), clock.wait(condition, timeout),
+clock.wait_event(event, timeout), clock.Timer - always as attributes
+(`import clock`, never `from clock import now`). By default they are the
+datetime/time/threading functions themselves, so the live path pays nothing;
+clock.use(SimClock(start)) rebinds them to virtual time for replay.py.
+"""
+import heapq
+import itertools
+import math
+import threading
+import time as _time
+from datetime import datetime
+
+GRACE = 0.05  # Real seconds a thread may run without touching the clock before it is treated as idle
+SETTLE = 0.00005  # Real seconds of no clock activity needed to call the engine quiet
+POLL = 0.0005  # Real seconds between checks of an Event under a virtual timeout
+
+
+class RealClock:
+    now = staticmethod(datetime.now)
+    time = staticmethod(_time.time)
+    monotonic = staticmethod(_time.monotonic)
+    sleep = staticmethod(_time.sleep)
+
+    @staticmethod
+    def wait(condition, timeout=None):
+        return condition.wait(timeout)
+
+    @staticmethod
+    def wait_event(event, timeout=None):
+        return event.wait(timeout)
+
+
+def use(new):
+    """Make `new` the clock for every caller of this module."""
+    global _clock, now, time, monotonic, sleep, wait, wait_event
+    _clock = new
+    now, time, monotonic, sleep, wait, wait_event = new.now, new.time, new.monotonic, new.sleep, new.wait, new.wait_event
+
+
+def current():
+    return _clock
+
+
+class Timer(threading.Thread):
+    """threading.Timer that waits on the current clock."""
+
+    def __init__(self, interval, function, args=(), kwargs=None):
+        super().__init__(name="clock-timer", daemon=True)
+        self.interval = interval
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        sleep(self.interval)
+        if not self.cancelled:
+            self.function(*self.args, **self.kwargs)
+
+
+class _Sleeper:
+    __slots__ = ("deadline", "condition", "own", "thread", "fired", "cancelled")
+
+    def __init__(self, deadline, condition, own, thread):
+        self.deadline = deadline
+        self.condition = condition
+        self.own = own  # Condition on the clock's lock (sleep) rather than the caller's
+        self.thread = thread
+        self.fired = False
+        self.cancelled = False
+
+
+class SimClock:
+    """Virtual time that only moves when the replay driver advances it.
+
+    Every sleep and timed wait parks its thread on a heap keyed by virtual
+    deadline. advance_to(t) wakes the parked threads in deadline order, each
+    time letting the engine run until it is quiet again - every thread that
+    woke has parked once more, finished, or gone GRACE without touching the
+    clock (e.g. back to an executor's queue) - so timers fire in order and a
+    day of 3-second loops, 1-second polls and fill timeouts takes only as long
+    as the work in them.
+    """
+
+    def __init__(self, start, grace=GRACE, settle=SETTLE):
+        self.t = start.timestamp() if isinstance(start, datetime) else float(start)
+        self.grace = grace
+        self.settle_interval = settle
+        self.lock = threading.Lock()
+        self.heap = []
+        self.sequence = itertools.count()
+        self.running = {}  # thread -> real time it last touched the clock, for threads not parked
+        self.activity = 0
+        self.finished = False
+        self.interrupt = None  # Thread whose next sleep raises KeyboardInterrupt after finish()
+        self.driver = None  # Thread calling advance_to(); never waited for
+
+    def _seen(self):
+        thread = threading.current_thread()
+        if thread is not self.driver:
+            self.running[thread] = _time.monotonic()
+
+    def now(self):
+        self._seen()
+        return datetime.fromtimestamp(self.t)
+
+    def time(self):
+        self._seen()
+        return self.t
+
+    monotonic = time
+
+    def _park(self, deadline, condition, own):
+        thread = threading.current_thread()
+        sleeper = _Sleeper(deadline, condition, own, thread)
+        self.running.pop(thread, None)
+        self.activity += 1
+        if deadline is not None:
+            heapq.heappush(self.heap, (deadline, next(self.sequence), sleeper))
+        return sleeper
+
+    def _unpark(self, sleeper):
+        sleeper.cancelled = True
+        self.running[sleeper.thread] = _time.monotonic()
+        self.activity += 1
+
+    def _deadline(self, seconds):
+        """Virtual deadline `seconds` from now; always later than now for a positive wait, however small.
+
+        Epoch floats only resolve about 0.2us, and a rate limiter a hair short of
+        a token would otherwise sleep to a deadline equal to now, forever.
+        """
+        if seconds <= 0:
+            return self.t
+        return max(self.t + seconds, math.nextafter(self.t, math.inf))
+
+    def _after_finish(self, seconds):
+        """Once the replay is over, waits return at once and time runs on, so shutdown code completes."""
+        if threading.current_thread() is self.interrupt:
+            self.interrupt = None
+            raise KeyboardInterrupt
+        self.t += max(seconds or 0, 0)
+        _time.sleep(0.001 if seconds else 0)
+
+    def sleep(self, seconds):
+        with self.lock:
+            if not self.finished:
+                sleeper = self._park(self._deadline(seconds), threading.Condition(self.lock), True)
+                while not sleeper.fired and not self.finished:
+                    sleeper.condition.wait()
+                self._unpark(sleeper)
+                if not self.finished:
+                    return
+        self._after_finish(seconds)
+
+    def wait(self, condition, timeout=None):
+        """condition.wait(timeout) in virtual time; the caller holds `condition`, as with Condition.wait."""
+        if self.finished:
+            self._after_finish(0)
+            return condition.wait(0.001 if timeout is not None else None)
+        with self.lock:
+            sleeper = self._park(None if timeout is None else self._deadline(timeout), condition, False)
+        condition.wait()  # Woken by the caller's own notify or by advance_to() at the deadline
+        with self.lock:
+            self._unpark(sleeper)
+        return not sleeper.fired
+
+    def wait_event(self, event, timeout=None):
+        if timeout is None or self.finished:
+            with self.lock:
+                sleeper = self._park(None, None, False)
+            result = event.wait(None if timeout is None else 0.001)
+            with self.lock:
+                self._unpark(sleeper)
+            return result
+        with self.lock:
+            sleeper = self._park(self._deadline(timeout), None, False)
+        while not event.is_set() and not sleeper.fired and not self.finished:
+            event.wait(POLL)
+        with self.lock:
+            self._unpark(sleeper)
+        return event.is_set()
+
+    def _fire(self, due):
+        """Wake sleepers whose deadline passed; the caller's conditions are notified outside the clock lock."""
+        foreign = []
+        with self.lock:
+            for sleeper in due:
+                sleeper.fired = True
+                self.running[sleeper.thread] = _time.monotonic()
+                if sleeper.own:
+                    sleeper.condition.notify_all()
+                elif sleeper.condition is not None:
+                    foreign.append(sleeper.condition)
+        for condition in foreign:
+            with condition:
+                condition.notify_all()
+
+    def advance_to(self, target):
+        """Move virtual time to `target` (epoch seconds or datetime), firing every timer due on the way."""
+        if isinstance(target, datetime):
+            target = target.timestamp()
+        self.driver = threading.current_thread()
+        while True:
+            with self.lock:
+                while self.heap and self.heap[0][2].cancelled:
+                    heapq.heappop(self.heap)
+                if not self.heap or self.heap[0][0] > target:
+                    self.t = max(self.t, target)
+                    break
+                self.t = max(self.t, self.heap[0][0])
+                due = []
+                while self.heap and self.heap[0][0] <= self.t:
+                    sleeper = heapq.heappop(self.heap)[2]
+                    if not sleeper.cancelled:
+                        due.append(sleeper)
+            self._fire(due)
+            self.settle()
+        self.settle()
+
+    def quiet(self):
+        real = _time.monotonic()
+        return all(not thread.is_alive() or real - seen > self.grace for thread, seen in list(self.running.items()))
+
+    def settle(self):
+        """Block until every thread the clock knows of is parked, finished or idle elsewhere."""
+        while True:
+            before = self.activity
+            _time.sleep(self.settle_interval)
+            if self.activity == before and self.quiet():
+                with self.lock:
+                    for thread in [t for t in list(self.running) if not t.is_alive()]:
+                        del self.running[thread]
+                return
+
+    def next_deadline(self):
+        with self.lock:
+            live = [entry[0] for entry in self.heap if not entry[2].cancelled]
+            return min(live) if live else None
+
+    def finish(self, interrupt=None):
+        """End the replay: wake everything, let time run freely, and interrupt `interrupt`'s next sleep."""
+        with self.lock:
+            self.finished = True
+            self.interrupt = interrupt
+            due = [entry[2] for entry in self.heap if not entry[2].cancelled]
+            self.heap = []
+        self._fire(due)
+
+
+use(RealClock())
@@ -0,0 +1,250 @@
+"""Desk view of a running engine: LTP, lower BB and 20/50 MA per instrument, as the engine computed them.
+
+A trading script keeps a DeskPublisher fed from its own ticks and indicator
+frames and serves it on its account's port; watching costs the engine no API
+calls. `python dashboard.py --account YQ6639` draws that engine's rows in the
+terminal, redrawing only rows that changed; the same rows are served as a
+web page at http://127.0.0.1:<port>/.
+"""
+import argparse
+import json
+import logging
+import math
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+log = logging.getLogger(__name__)
+
+DASHBOARD_PORT = 8765  # For accounts without a "dashboard_port" in instrument_config.accounts
+DESK_COLUMNS = ["LTP", "Lower BB", "50 MA", "20 MA"]
+MIN_REDRAW_INTERVAL = 0.1  # Seconds; caps terminal redraws under a burst of ticks
+LONG_POLL = 10  # Seconds an HTTP request waits for a change before returning empty
+COLUMN_WIDTH = 14
+
+PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>Dashboard</title>
+<style>body{font-family:monospace}td,th{padding:2px 10px;text-align:right}td:first-child{text-align:left}
+tr.flash td{background:#ffe9a8}</style></head>
+<body><table><thead><tr id="head"></tr></thead><tbody id="rows"></tbody></table>
+<script>
+let version = 0;
+const rows = {};
+async function poll() {
+  try {
+    const data = await (await fetch("/rows?since=" + version)).json();
+    if (!version) document.getElementById("head").innerHTML = ["Instrument", ...data.columns].map(c => "<th>" + c + "</th>").join("");
+    for (const [key, values] of Object.entries(data.rows)) {
+      let tr = rows[key];
+      if (!tr) { tr = rows[key] = document.getElementById("rows").insertRow(); }
+      tr.innerHTML = "<td>" + key + "</td>" + values.map(v => "<td>" + (v === null ? "" : v) + "</td>").join("");
+      tr.className = "flash"; setTimeout(() => tr.className = "", 300);
+    }
+    version = data.version;
+  } catch (e) { await new Promise(r => setTimeout(r, 1000)); }
+  poll();
+}
+poll();
+</script></body></html>"""
+
+
+def clean(value):
+    """Round for display; NaN/None (indicator still warming up) becomes None."""
+    if value is None:
+        return None
+    value = float(value)
+    return None if math.isnan(value) else round(value, 2)
+
+
+class DashboardState:
+    """Display rows keyed by symbol, each stamped with the version it last changed at.
+
+    Writers call update() from wherever the numbers already live (ticks, candle
+    close); renderers ask for rows changed since the version they last drew, so
+    an unchanged row is never re-rendered or re-sent.
+    """
+
+    def __init__(self, columns):
+        self.columns = columns
+        self.rows = {}  # key -> tuple of values
+        self.versions = {}  # key -> version of its last change
+        self.version = 0
+        self.condition = threading.Condition()
+
+    def update(self, key, values):
+        values = tuple(clean(value) for value in values)
+        with self.condition:
+            if self.rows.get(key) == values:
+                return
+            self.version += 1
+            self.rows[key] = values
+            self.versions[key] = self.version
+            self.condition.notify_all()
+
+    def changed_since(self, version):
+        with self.condition:
+            return self.version, {key: self.rows[key] for key, v in self.versions.items() if v > version}
+
+    def wait(self, version, timeout=None):
+        """Block until something changes after `version` (or the timeout passes)."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.version > version, timeout)
+
+
+def account_port(user_id):
+    """Port an account's engine serves its dashboard on."""
+    from instrument_config import accounts
+    return next((account.get("dashboard_port", DASHBOARD_PORT) for account in accounts if account["user_id"] == user_id),
+                DASHBOARD_PORT)
+
+
+class DeskPublisher:
+    """A trading script's desk rows: LTP from its ticks, indicators from the frames it trades on."""
+
+    def __init__(self, instruments, state=None):
+        self.state = state or DashboardState(DESK_COLUMNS)
+        self.symbols = {instrument["token"]: instrument["symbol"] for instrument in instruments}
+        self.ltp = {}  # symbol -> last traded price
+        self.indicators = {}  # symbol -> (lower BB, 50 MA, 20 MA) at the last evaluation
+        self.server = None
+
+    def on_ticks(self, ws, ticks):
+        for tick in ticks:
+            symbol = self.symbols.get(tick["instrument_token"])
+            if symbol is not None:
+                self.ltp[symbol] = tick["last_price"]
+                self.state.update(symbol, (tick["last_price"],) + self.indicators.get(symbol, (None, None, None)))
+
+    def publish(self, instrument, lower_bb, ma_50, ma_20):
+        """Record the indicator values the engine just evaluated an instrument on."""
+        symbol = instrument["symbol"]
+        self.indicators[symbol] = (lower_bb, ma_50, ma_20)
+        self.state.update(symbol, (self.ltp.get(symbol), lower_bb, ma_50, ma_20))
+
+    def serve(self, port=DASHBOARD_PORT):
+        """Serve the rows for `python dashboard.py`; a port in use only costs the desk view, never the engine."""
+        try:
+            self.server = serve(self.state, port)
+        except OSError as e:
+            log.warning(f"Dashboard not served on port {port}: {e}")
+        return self.server
+
+
+class TerminalDashboard:
+    """Fixed-layout table in the terminal; changed rows are rewritten in place with ANSI cursor moves."""
+
+    def __init__(self, state, out=None, min_interval=MIN_REDRAW_INTERVAL):
+        self.state = state
+        self.out = out or sys.stdout
+        self.min_interval = min_interval
+        self.lines = {}  # key -> screen line
+        self.stopped = threading.Event()
+
+    def format_row(self, key, values):
+        cells = [str(key).ljust(COLUMN_WIDTH)] + ["" if v is None else f"{v:.2f}".rjust(COLUMN_WIDTH) for v in values]
+        return "".join(cells)
+
+    def redraw_all(self):
+        _, rows = self.state.changed_since(0)
+        header = "".join(["Instrument".ljust(COLUMN_WIDTH)] + [c.rjust(COLUMN_WIDTH) for c in self.state.columns])
+        self.lines = {key: line for line, key in enumerate(rows, start=3)}
+        self.out.write("\x1b[2J\x1b[H" + header + "\n" + "-" * len(header) + "\n")
+        self.out.write("\n".join(self.format_row(key, values) for key, values in rows.items()) + "\n")
+
+    def run(self):
+        version = 0
+        while not self.stopped.is_set():
+            self.state.wait(version, timeout=1)
+            version, changed = self.state.changed_since(version)
+            if any(key not in self.lines for key in changed):
+                self.redraw_all()  # New rows shift the layout
+            else:
+                for key, values in changed.items():
+                    self.out.write(f"\x1b[{self.lines[key]};1H{self.format_row(key, values)}\x1b[K")
+                self.out.write(f"\x1b[{len(self.lines) + 3};1H")
+            self.out.flush()
+            time.sleep(self.min_interval)
+
+    def stop(self):
+        self.stopped.set()
+
+
+def serve(state, port=DASHBOARD_PORT, host="127.0.0.1"):
+    """Serve the dashboard on a local port: "/" is the page, "/rows?since=N" long-polls for changed rows."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/":
+                body, content_type = PAGE.encode(), "text/html; charset=utf-8"
+            elif url.path == "/rows":
+                since = int(parse_qs(url.query).get("since", ["0"])[0])
+                if since > state.version:
+                    since = 0  # A viewer left over from before an engine restart
+                state.wait(since, timeout=LONG_POLL)
+                version, rows = state.changed_since(since)
+                body = json.dumps({"version": version, "columns": state.columns, "rows": rows}).encode()
+                content_type = "application/json"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="dashboard-http", daemon=True).start()
+    log.info(f"Dashboard at http://{host}:{port}/")
+    return server
+
+
+def follow(url, state, stopped, poll=LONG_POLL):
+    """Mirror the rows an engine serves at `url` into `state` until `stopped` is set."""
+    version = 0
+    while not stopped.is_set():
+        try:
+            with urllib.request.urlopen(f"{url}/rows?since={version}", timeout=poll + 5) as response:
+                data = json.load(response)
+        except (OSError, ValueError) as e:
+            log.warning(f"Waiting for the engine at {url}: {e}")
+            stopped.wait(1)
+            continue
+        if data["version"] < version:
+            version = 0  # The engine restarted; take its rows from the start
+            continue
+        state.columns = data["columns"]
+        for key, values in data["rows"].items():
+            state.update(key, values)
+        version = data["version"]
+
+
+if __name__ == "__main__":
+    from instrument_config import accounts
+
+    parser = argparse.ArgumentParser(description="Watch a running engine's LTP and indicators")
+    parser.add_argument("--account", default=accounts[0]["user_id"], help="User id of the engine to watch")
+    parser.add_argument("--host", default="127.0.0.1")
+    args = parser.parse_args()
+
+    # The terminal belongs to the dashboard
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler("DFS_check.log")])
+
+    url = f"http://{args.host}:{account_port(args.account)}"
+    logging.info(f"Watching {args.account} at {url}/")
+    state = DashboardState(DESK_COLUMNS)
+    stopped = threading.Event()
+    threading.Thread(target=follow, args=(url, state, stopped), name="dashboard-follow", daemon=True).start()
+    try:
+        TerminalDashboard(state).run()
+    except KeyboardInterrupt:
+        stopped.set()
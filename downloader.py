@@ -0,0 +1,214 @@
+import argparse
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import numpy as np
+from ratelimit import RateLimiter, HISTORICAL_RATE
+from store import ColumnStore, COLUMNS
+
+log = logging.getLogger(__name__)
+
+# Longest date range historical_data() accepts per request, by interval
+MAX_DAYS = {"minute": 60, "2minute": 100, "3minute": 100, "5minute": 100, "10minute": 100,
+            "15minute": 200, "30minute": 200, "60minute": 400, "day": 2000}
+STEP_SECONDS = {"minute": 60, "2minute": 120, "3minute": 180, "5minute": 300, "10minute": 600,
+                "15minute": 900, "30minute": 1800, "60minute": 3600}
+MAX_ATTEMPTS = 5
+WORKERS = 6  # Enough in-flight requests to keep the rate limiter saturated despite latency
+
+
+def chunks(from_date, to_date, interval):
+    """Split [from_date, to_date] into the fewest ranges historical_data() accepts."""
+    span = timedelta(days=MAX_DAYS[interval])
+    ranges = []
+    start = from_date
+    while start <= to_date:
+        end = min(start + span - timedelta(seconds=1), to_date)
+        ranges.append((start, end))
+        start = end + timedelta(seconds=1)
+    return ranges
+
+
+def continuity(dates, interval):
+    """Gaps inside a trading day (consecutive bars more than one interval apart on the same date)."""
+    step = STEP_SECONDS.get(interval)
+    if step is None or len(dates) < 2:
+        return []
+    diffs = np.diff(dates)
+    days = (dates + 19800) // 86400  # IST calendar day of each bar
+    gaps = np.flatnonzero((diffs > step) & (days[1:] == days[:-1]))
+    return [(int(dates[i]), int(dates[i + 1])) for i in gaps]
+
+
+class BulkDownloader:
+    """Download long candle histories for many tokens in parallel under the historical rate limit.
+
+    Only the spans a token's store doesn't cover yet are requested, and every
+    (token, chunk) is one request; a finished chunk is saved as its own part
+    file at once, which is the checkpoint: a rerun only requests chunks without
+    a complete part - one named for the same range and fetched after the range
+    had ended, so a chunk reaching into the future is fetched again. When all
+    of a token's chunks are in, they are merged with what the store holds,
+    de-duplicated, checked for intraday gaps and written to the ColumnStore.
+    """
+
+    def __init__(self, kite, store, interval="minute", workers=WORKERS, rate=HISTORICAL_RATE):
+        self.kite = kite
+        self.store = store
+        self.interval = interval
+        self.limiter = RateLimiter(rate)
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.done_requests = 0
+        self.started = None
+
+    def parts_dir(self, token):
+        return os.path.join(self.store.root, self.interval, "_parts", str(token))
+
+    def part_path(self, token, start, end):
+        return os.path.join(self.parts_dir(token), f"{start:%Y%m%d%H%M%S}-{end:%Y%m%d%H%M%S}.npz")
+
+    def checkpointed(self, token, start, end):
+        """True if the chunk's part holds every candle of its range."""
+        path = self.part_path(token, start, end)
+        if not os.path.exists(path):
+            return False
+        with np.load(path) as part:
+            return "fetched" in part.files and float(part["fetched"]) >= end.timestamp()
+
+    def fetch_chunk(self, instrument, start, end):
+        path = self.part_path(instrument["token"], start, end)
+        for attempt in range(MAX_ATTEMPTS):
+            self.limiter.acquire()
+            try:
+                fetched = time.time()
+                candles = self.kite.historical_data(instrument["token"], start.strftime("%Y-%m-%d %H:%M:%S"),
+                                                    end.strftime("%Y-%m-%d %H:%M:%S"), self.interval)
+                break
+            except Exception as e:
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                log.warning(f"Retrying {instrument['symbol']} {start:%Y-%m-%d}: {e}")
+                time.sleep(2 ** attempt)
+        columns = {
+            "date": [int(candle["date"].timestamp()) for candle in candles],
+            **{name: [candle[name] for candle in candles] for name in COLUMNS if name != "date"},
+        }
+        os.makedirs(self.parts_dir(instrument["token"]), exist_ok=True)
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, fetched=np.float64(fetched),
+                 **{name: np.asarray(columns[name], dtype=COLUMNS[name]) for name in COLUMNS})
+        os.replace(tmp, path)  # Atomic: a part either exists complete or not at all
+        with self.lock:
+            self.done_requests += 1
+        return len(candles)
+
+    def finish(self, instrument, from_date, to_date, ranges):
+        """Merge a token's parts into what the store already holds for it and drop them."""
+        token = instrument["token"]
+        parts = [np.load(self.part_path(token, start, end)) for start, end in ranges]
+        meta = self.store.meta(self.interval, token)
+        if meta is not None:
+            parts.insert(0, self.store.load(self.interval, token, mmap=False))
+            from_date = min(from_date, datetime.fromisoformat(meta["from"]))
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+        order = np.argsort(columns["date"], kind="stable")
+        keep = np.ones(len(order), dtype=bool)
+        keep[:-1] = np.diff(columns["date"][order]) != 0  # Chunk edges can overlap by a bar; the newest copy wins
+        columns = {name: values[order][keep] for name, values in columns.items()}
+        gaps = continuity(columns["date"], self.interval)
+        if gaps:
+            log.warning(f"{instrument['symbol']}: {len(gaps)} intraday gaps in {self.interval} data")
+        # Only as far as had happened when the run began, so a later run fills in the rest of today
+        to_date = min(to_date, self.started)
+        if meta is not None:
+            to_date = max(to_date, datetime.fromisoformat(meta["to"]))
+        self.store.write(self.interval, token, columns, {
+            "token": token, "symbol": instrument["symbol"], "exchange": instrument.get("exchange"),
+            "interval": self.interval, "from": from_date.isoformat(), "to": to_date.isoformat(),
+            "rows": int(len(columns["date"])), "gaps": gaps[:100], "gap_count": len(gaps),
+        })
+        shutil.rmtree(self.parts_dir(token), ignore_errors=True)
+
+    def missing(self, token, from_date, to_date):
+        """Spans of [from_date, to_date] the store doesn't hold yet, reaching over any hole next to what it does."""
+        meta = self.store.meta(self.interval, token)
+        if meta is None:
+            return [(from_date, to_date)]
+        stored_from, stored_to = datetime.fromisoformat(meta["from"]), datetime.fromisoformat(meta["to"])
+        spans = []
+        if from_date < stored_from:
+            spans.append((from_date, stored_from - timedelta(seconds=1)))
+        if min(to_date, self.started) > stored_to:
+            # From the start of the last stored day, so a candle still forming when it was stored comes in whole
+            spans.append((stored_to.replace(hour=0, minute=0, second=0, microsecond=0), max(to_date, stored_to)))
+        return spans
+
+    def run(self, instruments, from_date, to_date):
+        self.started = datetime.now()
+        pending = {}
+        for instrument in instruments:
+            ranges = [chunk for start, end in self.missing(instrument["token"], from_date, to_date)
+                      for chunk in chunks(start, end, self.interval)]
+            if not ranges:
+                continue
+            todo = [(start, end) for start, end in ranges if not self.checkpointed(instrument["token"], start, end)]
+            pending[instrument["token"]] = (instrument, ranges, todo)
+
+        total = sum(len(todo) for _, _, todo in pending.values())
+        chunked = sum(len(ranges) for _, ranges, _ in pending.values())
+        log.info(f"{len(pending)} of {len(instruments)} tokens to download: {total} requests "
+                 f"({chunked} chunks, {chunked - total} already checkpointed)")
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="download") as pool:
+            futures = {token: [pool.submit(self.fetch_chunk, instrument, start, end) for start, end in todo]
+                       for token, (instrument, _, todo) in pending.items()}
+            failed = []
+            for token, token_futures in futures.items():
+                instrument, ranges, _ = pending[token]
+                errors = [future.exception() for future in token_futures if future.exception()]
+                if errors:
+                    log.error(f"{instrument['symbol']}: {len(errors)} chunks failed ({errors[0]}); rerun to resume")
+                    failed.append(instrument["symbol"])
+                    continue
+                self.finish(instrument, from_date, to_date, ranges)
+                elapsed = time.monotonic() - started
+                log.info(f"Stored {instrument['symbol']} ({self.done_requests}/{total} requests, {elapsed:.0f}s)")
+        return failed
+
+
+if __name__ == "__main__":
+    import kiteapp as kt
+    from instrument_config import instruments as configured
+
+    parser = argparse.ArgumentParser(description="Download candle history into a columnar store (resumable).")
+    parser.add_argument("--from", dest="from_date", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--to", dest="to_date", default=datetime.now().strftime("%Y-%m-%d"), help="YYYY-MM-DD")
+    parser.add_argument("--interval", default="minute", choices=sorted(MAX_DAYS))
+    parser.add_argument("--store", default="candles")
+    parser.add_argument("--universe", action="store_true", help="Every NSE equity and NFO future instead of instrument_config")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler("downloader.log"), logging.StreamHandler()])
+
+    with open('enctoken.txt', 'r') as rd:
+        token = rd.read().strip()
+    kite = kt.KiteApp("kite", "YQ6639", token)
+
+    if args.universe:
+        from scanner import load_universe
+        instruments = load_universe(kite)
+    else:
+        instruments = configured
+
+    from_date = datetime.strptime(args.from_date, "%Y-%m-%d")
+    to_date = datetime.strptime(args.to_date, "%Y-%m-%d").replace(hour=23, minute=59, second=59)
+    failed = BulkDownloader(kite, ColumnStore(args.store), args.interval).run(instruments, from_date, to_date)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,132 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from ratelimit import RateLimiter, HISTORICAL_RATE
+from candles import SESSION_OPEN, DEFAULT_SESSION_OPEN, bucket_start, interval_minutes
+import clock
+
+log = logging.getLogger(__name__)
+
+RECONNECT_MAX_DELAY = 5  # Seconds; ceiling of the ticker's exponential reconnect back-off (Kite's minimum)
+RECONNECT_MAX_TRIES = 300  # Kite's maximum
+INTERVAL_SECONDS = {"minute": 60, "2minute": 120, "3minute": 180, "5minute": 300, "10minute": 600,
+                    "15minute": 900, "30minute": 1800, "60minute": 3600}
+
+
+def complete_candles(candles, interval):
+    """Candles that had closed by now (the still-forming one is dropped)."""
+    step = INTERVAL_SECONDS.get(interval, 60)
+    now = clock.time()
+    return [candle for candle in candles if candle["date"].timestamp() + step <= now]
+
+
+class ManagedFeed:
+    """Keep a KiteTicker alive across network blips and repair what was missed.
+
+    The ticker reconnects itself with exponential back-off (capped low, so
+    recovery takes seconds) and resubscribes every token in its saved mode; the
+    caller's on_connect runs again as well. On a reconnect only the candles
+    since the drop are fetched, for every token that had been ticking, in
+    parallel under the historical rate limit, and handed to on_backfill. `ready` is clear from the disconnect
+    until the backfill is done, so callers can hold signals on stale data.
+    """
+
+    def __init__(self, kite, kws, interval="minute", on_backfill=None, instruments=(), max_delay=RECONNECT_MAX_DELAY,
+                 max_tries=RECONNECT_MAX_TRIES, workers=HISTORICAL_RATE):
+        self.kite = kite
+        self.kws = kws
+        self.interval = interval
+        self.on_backfill = on_backfill
+        self.exchanges = {instrument["token"]: instrument.get("exchange") for instrument in instruments}
+        self.limiter = RateLimiter(HISTORICAL_RATE)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="backfill")
+        self.last_tick = {}  # instrument token -> wall-clock time of its last tick
+        self.disconnected_at = None
+        self.ready = threading.Event()
+
+        # Read by KiteTicker.connect() when it builds the reconnecting factory
+        kws.reconnect_max_delay = max_delay
+        kws.reconnect_max_tries = max_tries
+        self.attach(kws)
+
+    def attach(self, kws):
+        """Wrap the ticker's callbacks, keeping the ones already set."""
+        previous_ticks, previous_connect, previous_close = kws.on_ticks, kws.on_connect, kws.on_close
+
+        def on_ticks(ws, ticks):
+            now = clock.time()
+            for tick in ticks:
+                self.last_tick[tick["instrument_token"]] = now
+            if previous_ticks:
+                previous_ticks(ws, ticks)
+
+        def on_connect(ws, response):
+            if previous_connect:
+                previous_connect(ws, response)
+            self.on_connect()
+
+        def on_close(ws, code, reason):
+            self.ready.clear()
+            if self.disconnected_at is None:
+                self.disconnected_at = clock.time()
+            if previous_close:
+                previous_close(ws, code, reason)
+
+        def on_reconnect(ws, attempts):
+            log.warning(f"Websocket reconnecting (attempt {attempts})")
+
+        def on_noreconnect(ws):
+            log.error("Websocket gave up reconnecting; signals stay paused on stale data")
+
+        kws.on_ticks = on_ticks
+        kws.on_connect = on_connect
+        kws.on_close = on_close
+        kws.on_reconnect = on_reconnect
+        kws.on_noreconnect = on_noreconnect
+
+    def on_connect(self):
+        if self.disconnected_at is None:
+            self.ready.set()  # First connect: nothing was missed
+            return
+        disconnected_at, self.disconnected_at = self.disconnected_at, None
+        log.info(f"Websocket back after {clock.time() - disconnected_at:.1f}s")
+        if self.on_backfill and self.last_tick:
+            # Off the reactor thread, so ticks keep flowing while the gap is filled
+            threading.Thread(target=self.backfill, args=(disconnected_at,), name="feed-backfill", daemon=True).start()
+        else:
+            self.ready.set()
+
+    def gap_start(self, token, disconnected_at):
+        """Start of the token's candle that was forming when the feed dropped: everything from here on is suspect."""
+        # Candles are counted from the exchange's session open, not the epoch
+        session_open = SESSION_OPEN.get(self.exchanges.get(token), DEFAULT_SESSION_OPEN)
+        return bucket_start(datetime.fromtimestamp(disconnected_at), interval_minutes(self.interval) or 1, session_open)
+
+    def fetch(self, token, from_date, to_date):
+        self.limiter.acquire()
+        candles = self.kite.historical_data(token, from_date.strftime("%Y-%m-%d %H:%M:%S"),
+                                            to_date.strftime("%Y-%m-%d %H:%M:%S"), self.interval)
+        return token, candles
+
+    def backfill(self, disconnected_at):
+        """Fetch only the candles missed during the outage for every token that was ticking, in parallel."""
+        started = time.monotonic()
+        to_date = clock.now()
+        tokens = [token for token in self.kws.subscribed_tokens if token in self.last_tick]
+        futures = [self.pool.submit(self.fetch, token, self.gap_start(token, disconnected_at), to_date) for token in tokens]
+        candles = 0
+        for future in futures:
+            try:
+                token, data = future.result()
+                candles += len(data)
+                self.on_backfill(token, data)
+            except Exception as e:
+                log.error(f"Error backfilling missed candles: {e}")
+        log.info(f"Backfilled {candles} candles for {len(tokens)} tokens in {time.monotonic() - started:.2f}s")
+        self.ready.set()
+
+    def stop(self):
+        self.pool.shutdown(wait=False)
+        self.kws.stop()
@@ -0,0 +1,114 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from ratelimit import RateLimiter, DEFAULT_RATE
+
+log = logging.getLogger(__name__)
+
+GTT_TYPE_OCO = "two-leg"
+SL_SLIPPAGE = 0.005  # GTT legs are LIMIT orders; the stop leg's limit sits this fraction beyond its trigger
+INACTIVE_STATUSES = ("triggered", "disabled", "expired", "cancelled", "rejected", "deleted")
+
+
+class GTTManager:
+    """Broker-side OCO exits: place, modify and delete GTTs in bulk, with a local cache refreshed in one call."""
+
+    def __init__(self, kite, workers=4):
+        self.kite = kite
+        self.cache = {}  # trigger_id -> GTT as returned by get_gtts()
+        self.limiter = RateLimiter(DEFAULT_RATE)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gtt")
+        self.lock = threading.Lock()
+
+    def refresh(self):
+        """Reload every GTT on the account with a single get_gtts() call."""
+        try:
+            gtts = self.kite.get_gtts()
+        except Exception as e:
+            log.error(f"Error refreshing GTTs: {e}")
+            return self.cache
+        with self.lock:
+            self.cache = {gtt["id"]: gtt for gtt in gtts}
+        return self.cache
+
+    def status(self, trigger_id):
+        gtt = self.cache.get(trigger_id)
+        return gtt["status"] if gtt else None
+
+    def is_active(self, trigger_id):
+        gtt = self.cache.get(trigger_id)
+        return gtt is not None and gtt["status"] not in INACTIVE_STATUSES
+
+    def exit_leg(self, trigger_id):
+        """What a triggered OCO left to watch: the order its leg placed (None if placing it failed), the
+        quantity and the stop to cover with if that order never fills."""
+        gtt = self.cache[trigger_id]
+        results = [(leg.get("result") or {}).get("order_result") or {} for leg in gtt["orders"]]
+        order_id = next((result["order_id"] for result in results
+                         if result.get("order_id") and result.get("status") != "failed"), None)
+        return order_id, gtt["orders"][0]["quantity"], gtt["condition"]["trigger_values"][1]
+
+    @staticmethod
+    def oco_params(instrument, quantity, stop_loss, target, last_price, sl_price=None, product="MIS"):
+        """Two-leg exit for a short: BUY at the target below and BUY at the stop above the last price."""
+        if sl_price is None:
+            sl_price = round(stop_loss * (1 + SL_SLIPPAGE), 2)
+        leg = {"transaction_type": "BUY", "quantity": quantity, "order_type": "LIMIT", "product": product}
+        return dict(
+            trigger_type=GTT_TYPE_OCO,
+            tradingsymbol=instrument["symbol"],
+            exchange=instrument["exchange"],
+            trigger_values=[target, stop_loss],
+            last_price=last_price,
+            orders=[dict(leg, price=target), dict(leg, price=sl_price)],
+        )
+
+    def place_oco(self, instrument, quantity, stop_loss, target, last_price, sl_price=None, product="MIS"):
+        """Place the SL/target bracket as one GTT OCO; returns the trigger id."""
+        params = self.oco_params(instrument, quantity, stop_loss, target, last_price, sl_price, product)
+        self.limiter.acquire()
+        trigger_id = self.kite.place_gtt(**params)["trigger_id"]
+        with self.lock:
+            self.cache[trigger_id] = {"id": trigger_id, "status": "active", "condition": params}
+        return trigger_id
+
+    def modify_oco(self, trigger_id, instrument, quantity, stop_loss, target, last_price, sl_price=None, product="MIS"):
+        params = self.oco_params(instrument, quantity, stop_loss, target, last_price, sl_price, product)
+        self.limiter.acquire()
+        self.kite.modify_gtt(trigger_id=trigger_id, **params)
+        with self.lock:
+            self.cache[trigger_id] = {"id": trigger_id, "status": "active", "condition": params}
+        return trigger_id
+
+    def delete(self, trigger_id):
+        self.limiter.acquire()
+        self.kite.delete_gtt(trigger_id)
+        with self.lock:
+            self.cache.pop(trigger_id, None)
+        return trigger_id
+
+    def _bulk(self, fn, calls):
+        """Run calls concurrently under the shared rate limiter; returns results (exceptions in place)."""
+        futures = [self.pool.submit(fn, *args) for args in calls]
+        results = []
+        for args, future in zip(calls, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                log.error(f"GTT {fn.__name__} failed for {args[0] if args else ''}: {e}")
+                results.append(e)
+        return results
+
+    def place_many(self, brackets):
+        """brackets: iterable of (instrument, quantity, stop_loss, target, last_price)."""
+        return self._bulk(self.place_oco, [tuple(bracket) for bracket in brackets])
+
+    def modify_many(self, brackets):
+        """brackets: iterable of (trigger_id, instrument, quantity, stop_loss, target, last_price)."""
+        return self._bulk(self.modify_oco, [tuple(bracket) for bracket in brackets])
+
+    def delete_many(self, trigger_ids):
+        return self._bulk(self.delete, [(trigger_id,) for trigger_id in trigger_ids])
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
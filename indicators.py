@@ -0,0 +1,78 @@
+import pandas as pd
+
+
+def rsi(get, window=14):
+    delta = get("close").diff()
+    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+    rs = gain / loss
+    return 100 - (100 / (1 + rs))
+
+
+def atr(get, window=14):
+    prev_close = get("close").shift(1)
+    true_range = pd.concat([get("high") - get("low"), (get("high") - prev_close).abs(),
+                            (get("low") - prev_close).abs()], axis=1).max(axis=1)
+    return true_range.rolling(window=window).mean()
+
+
+# Indicator name -> function of a getter, so each indicator is built from the (cached) ones it depends on.
+# Names match the columns calculate_indicators() adds in the live scripts.
+INDICATORS = {
+    "20MA": lambda get: get("close").rolling(window=20).mean(),
+    "50MA": lambda get: get("close").rolling(window=50).mean(),
+    "std_dev": lambda get: get("close").rolling(window=20).std(),
+    "Upper_BB": lambda get: get("20MA") + (get("std_dev") * 2),
+    "Lower_BB": lambda get: get("20MA") - (2 * get("std_dev")),
+    "RSI": rsi,
+    "12EMA": lambda get: get("close").ewm(span=12, adjust=False).mean(),
+    "26EMA": lambda get: get("close").ewm(span=26, adjust=False).mean(),
+    "MACD": lambda get: get("12EMA") - get("26EMA"),
+    "Signal_Line": lambda get: get("MACD").ewm(span=9, adjust=False).mean(),
+    "ATR": atr,
+}
+
+
+class IndicatorFrame:
+    """Candles plus lazily computed, memoized indicator columns.
+
+    Asking for "Lower_BB" computes 20MA and std_dev once and keeps them, so
+    any other consumer of 20MA on the same candles gets the cached column.
+    """
+
+    def __init__(self, df):
+        if "close" not in df.columns:
+            raise KeyError("Column 'close' is missing from DataFrame. Check the API response.")
+        self.df = df
+
+    def get(self, name):
+        if name not in self.df.columns:
+            if name not in INDICATORS:
+                raise KeyError(f"Unknown indicator: {name}")
+            self.df[name] = INDICATORS[name](self.get)
+        return self.df[name]
+
+    def compute(self, names):
+        for name in names:
+            self.get(name)
+        return self.df
+
+    def latest(self, name):
+        """Last non-NaN value of an indicator, or None while it is still warming up."""
+        series = self.get(name).dropna()
+        return series.iloc[-1] if not series.empty else None
+
+    def value(self, name, offset=-1):
+        """Raw value at a position from the end (-1 is the latest candle)."""
+        return self.get(name).iloc[offset]
+
+
+def calculate_indicators(df, names=tuple(INDICATORS)):
+    """Add the requested indicator columns to a candle DataFrame."""
+    return IndicatorFrame(df).compute(names)
+
+
+def to_frame(candles):
+    """Build an IndicatorFrame from historical_data() rows, or None if there are none."""
+    df = pd.DataFrame(candles)
+    return IndicatorFrame(df) if not df.empty else None
@@ -26,4 +26,50 @@ trade_config = {
     "TATAMOTORS": {"sl_buffer": 2, "target_buffer": 4, "quantity": 1},
     "M&M": {"sl_buffer": 2, "target_buffer": 4, "quantity": 1},
     "TATACONSUM": {"sl_buffer": 2, "target_buffer": 4, "quantity": 1},
-}
\ No newline at end of file
+}
+# Optional per-symbol keys for large entries (see slicer.py):
+#   "freeze_quantity": 1800  -> quantities above it are split into freeze-sized child orders
+#   "slicing": {"mode": "twap", "slices": 5, "duration": 60} or {"mode": "iceberg", "visible": 300}
+
+# Account-level risk limits (None disables a limit)
+risk_limits = {
+    "daily_loss_limit": None,  # e.g. 5000: halt new entries once the day's P&L reaches -5000
+    "max_gross_notional": None,  # Sum of |quantity x LTP| over all positions
+    "max_net_notional": None,  # |Sum of signed quantity x LTP|
+    "max_underlying_notional": None,  # Per underlying, cash and its futures/options together (INFY + INFY25MARFUT)
+    "max_sector_notional": None,  # Per sector in `sectors`
+    "max_open_orders": None,  # Working orders (entries and exit legs)
+}
+
+# Underlying -> sector, for the per-sector exposure limit
+sectors = {
+    "TATACHEM": "Chemicals",
+    "TATATECH": "IT",
+    "INFY": "IT",
+    "KOTAKBANK": "Banks",
+    "SBIN": "Banks",
+    "RELIANCE": "Energy",
+    "TATACONSUM": "FMCG",
+    "TATAMOTORS": "Auto",
+    "M&M": "Auto",
+}
+
+# Accounts traded by the multi-account fan-out executor.
+# quantity_scale multiplies trade_config quantities; a trade_config entry may also carry
+# "quantity_scale": {"<user_id>": scale} to override it per symbol. dashboard_port is where that
+# account's engine serves its desk view (`python dashboard.py --account <user_id>`).
+accounts = [
+    {"user_id": "YQ6639", "token_file": "enctoken.txt", "quantity_scale": 1, "dashboard_port": 8765},
+    {"user_id": "PO5476", "token_file": "enctoken_PO5476.txt", "quantity_scale": 1, "dashboard_port": 8766},
+]
+
+# Strategy plugins run by strategy_host.py (names from strategies.STRATEGIES)
+strategies = ["50ma_or_lower_bb", "50ma_cross_once"]
+
+# Entry rules for the "rules" strategy, per symbol with a "default" fallback. Names are the
+# indicator columns (20MA, 50MA, std_dev, Upper_BB, Lower_BB, RSI, 12EMA, 26EMA, MACD, Signal_Line),
+# candle columns (open, high, low, close, volume), ltp, and sma/std/ema/rsi/prev(series, n).
+trade_rules = {
+    "default": "ltp < 50MA or ltp <= Lower_BB",
+    # "INFY": "ltp < 50MA and ltp <= Lower_BB and RSI > 70 and MACD < Signal_Line",
+}
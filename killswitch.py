@@ -0,0 +1,128 @@
+import logging
+import os
+import signal
+import sys
+import threading
+import clock
+from concurrent.futures import ThreadPoolExecutor, wait
+from ratelimit import RateLimiter, ORDER_RATE
+
+log = logging.getLogger(__name__)
+
+KILL_DEADLINE = 5  # Seconds the kill switch may take before it reports what is still pending
+KILL_FILE = "KILL_SWITCH"  # Creating this file (python killswitch.py) trips the running script
+WATCH_INTERVAL = 0.2
+OPEN_STATUSES = ("OPEN", "TRIGGER PENDING", "PARTIALLY EXECUTED", "PENDING", "AMO REQ RECEIVED",
+                 "VALIDATION PENDING", "OPEN PENDING", "MODIFY PENDING", "MODIFIED")
+
+
+def session_tag():
+    """Fixed-width order tag unique to this process, so its orders can be told apart from everyone else's."""
+    return f"ll{os.getpid() & 0xffff:04x}{int(clock.time()) & 0xffffff:06x}"
+
+
+class KillSwitch:
+    """Cancel this process's open orders and square off its MIS positions, all in parallel.
+
+    Orders are recognised by the session tag KiteApp stamps on every order
+    (set here unless the caller already chose one). Positions are squared off
+    only in symbols this process traded, and only for the MIS product.
+    """
+
+    def __init__(self, kite, tag=None, workers=16):
+        self.kite = kite
+        self.tag = tag or getattr(kite, "order_tag", None) or session_tag()
+        kite.order_tag = self.tag
+        self.limiter = RateLimiter(ORDER_RATE)
+        self.workers = workers
+        self.tripped = threading.Event()
+
+    def mine(self, order):
+        return (order.get("tag") or "").startswith(self.tag)
+
+    def cancel(self, order, deadline):
+        if not self.limiter.acquire(timeout=max(0, deadline - clock.monotonic())):
+            raise TimeoutError("order rate budget exhausted before the deadline")
+        self.kite.cancel_order(variety=order.get("variety") or "regular", order_id=order["order_id"])
+
+    def square_off(self, position, deadline):
+        if not self.limiter.acquire(timeout=max(0, deadline - clock.monotonic())):
+            raise TimeoutError("order rate budget exhausted before the deadline")
+        return self.kite.place_order(
+            variety="regular",
+            exchange=position["exchange"],
+            tradingsymbol=position["tradingsymbol"],
+            transaction_type="BUY" if position["quantity"] < 0 else "SELL",
+            quantity=abs(position["quantity"]),
+            product="MIS",
+            order_type="MARKET",
+            validity="DAY"
+        )
+
+    def _fan_out(self, pool, fn, items, label, deadline, report):
+        futures = {pool.submit(fn, item, deadline): name for name, item in items}
+        done, pending = wait(futures, timeout=max(0, deadline - clock.monotonic()))
+        for future in done:
+            if future.exception():
+                report["failed"].append((label, futures[future], str(future.exception())))
+            else:
+                report[label].append(futures[future])
+        report["pending"].extend((label, futures[future]) for future in pending)
+
+    def run(self, deadline=KILL_DEADLINE, square_off=True):
+        """Flatten everything this process owns; returns a report of what was done within the deadline."""
+        self.tripped.set()
+        start = clock.monotonic()
+        deadline = start + deadline
+        report = {"cancelled": [], "squared_off": [], "failed": [], "pending": []}
+        try:
+            orders = [order for order in self.kite.orders() if self.mine(order)]
+        except Exception as e:
+            log.error(f"Kill switch could not fetch orders: {e}")
+            orders = []
+        open_orders = [(order["order_id"], order) for order in orders if order["status"] in OPEN_STATUSES]
+        symbols = {order["tradingsymbol"] for order in orders}
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="kill-switch")
+        # Exits first, so no SL or target can fire against the square-off and flip the position
+        self._fan_out(pool, self.cancel, open_orders, "cancelled", deadline, report)
+
+        if square_off and symbols:
+            try:
+                positions = [p for p in self.kite.positions()["net"]
+                             if p["product"] == "MIS" and p["quantity"] != 0 and p["tradingsymbol"] in symbols]
+            except Exception as e:
+                log.error(f"Kill switch could not fetch positions: {e}")
+                positions = []
+            self._fan_out(pool, self.square_off, [(p["tradingsymbol"], p) for p in positions],
+                          "squared_off", deadline, report)
+        pool.shutdown(wait=False)
+
+        elapsed = clock.monotonic() - start
+        log.info(f"🧯 Kill switch done in {elapsed:.2f}s: cancelled {len(report['cancelled'])} orders, "
+                 f"squared off {report['squared_off']}")
+        if report["failed"] or report["pending"]:
+            log.error(f"🧯 Kill switch incomplete - failed: {report['failed']}, still pending: {report['pending']}")
+        return report
+
+    def watch(self, path=KILL_FILE, interval=WATCH_INTERVAL):
+        """Raise SIGTERM in this process when the trigger file appears, so the signal handler runs the kill."""
+        def poll():
+            while not self.tripped.is_set():
+                if os.path.exists(path):
+                    log.warning(f"Kill switch triggered by {path}")
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    os.kill(os.getpid(), signal.SIGTERM)
+                    return
+                clock.sleep(interval)
+        threading.Thread(target=poll, name="kill-switch-watch", daemon=True).start()
+
+
+if __name__ == "__main__":
+    # Local trigger: python killswitch.py [trigger file]
+    path = sys.argv[1] if len(sys.argv) > 1 else KILL_FILE
+    open(path, "w").close()
+    print(f"Kill switch tripped via {path}")
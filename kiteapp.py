@@ -17,8 +17,14 @@ class KiteApp(KiteConnect):
             "x-kite-version": "3",
             'Authorization': 'enctoken {}'.format(self.enctoken)
         }
+        self.order_tag = None  # Stamped on every order that doesn't carry its own tag
         KiteConnect.__init__(self, api_key=api_key)
 
+    def place_order(self, variety, **params):
+        if self.order_tag and not params.get("tag"):
+            params["tag"] = self.order_tag
+        return KiteConnect.place_order(self, variety, **params)
+
     def kws(self):
         return KiteTicker(api_key='kitefront', access_token=self.enctoken+"&user_id="+self.user_id, root='wss://ws.kite.trade')
 
@@ -1,11 +1,14 @@
 import kiteapp as kt
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import timedelta
 import logging
 from tabulate import tabulate
 from instrument_config import instruments, trade_config
+from order_waiter import OrderUpdates, await_fill, FILL_TIMEOUT
+from killswitch import KillSwitch
+from feed import ManagedFeed
 import threading
-from time import sleep
+import clock
 import signal
 import sys
 
@@ -29,6 +32,10 @@ logging.info("Kite API initialized successfully")
 # Initialize Kite Ticker
 kws = kite.kws()  # For Websocket
 
+# Tags this session's orders; SIGINT/SIGTERM or `python killswitch.py` cancels them and squares off
+kill_switch = KillSwitch(kite)
+kill_switch.watch()
+
 live_data = {}
 
 def on_ticks(ws, ticks):
@@ -46,12 +53,18 @@ def on_connect(ws, response):
     logging.info("WebSocket connected and subscribed to instruments")
 
 def on_close(ws, code, reason):
-    ws.stop()
-    logging.info("WebSocket closed")
+    logging.info("WebSocket closed, reconnecting")
 
 kws.on_ticks = on_ticks
 kws.on_connect = on_connect
 kws.on_close = on_close
+# Reconnects and resubscribes; `ready` is clear while the feed is down. Nothing to backfill:
+# fetch_historical_data() takes every candle whole from historical_data() each cycle
+feed = ManagedFeed(kite, kws, INTERVAL)
+
+# Order updates pushed over the websocket wake fill waiters immediately
+order_updates = OrderUpdates()
+order_updates.attach(kws)
 
 def has_active_sell_order_or_position(symbol):
     """Check if there's an active SELL order or any position (open or closed) for the given symbol."""
@@ -75,7 +88,7 @@ def has_active_sell_order_or_position(symbol):
 
 def fetch_historical_data(instrument):
     """Fetch historical OHLC data for the given instrument."""
-    today = datetime.now()
+    today = clock.now()
     from_date = (today - timedelta(days=5)).strftime("%Y-%m-%d %H:%M:%S")
     to_date = today.strftime("%Y-%m-%d %H:%M:%S")
 
@@ -163,42 +176,41 @@ def place_sell_order(instrument, ltp):
         )
         logging.info(f"✅ SELL Order placed successfully for {instrument['symbol']}! Order ID: {order_id}")
 
-        # Wait for order execution before placing SL and Target orders
-        sleep(2)
-        orders = kite.orders()
-
-        for order in orders:
-            if order["order_id"] == order_id and order["status"] == "COMPLETE":
-                # Place stop-loss order (BUY SL-M)
-                sl_order_id = kite.place_order(
-                    variety="regular",
-                    exchange=instrument["exchange"],
-                    tradingsymbol=instrument["symbol"],
-                    transaction_type="BUY",
-                    quantity=quantity,
-                    product="MIS",
-                    order_type="SL-M",
-                    trigger_price=stop_loss,
-                    validity="DAY"
-                )
-                logging.info(f"🛑 Stop-Loss Order placed at {stop_loss} for {instrument['symbol']}! Order ID: {sl_order_id}")
-
-                # Place target order (BUY LIMIT)
-                target_order_id = kite.place_order(
-                    variety="regular",
-                    exchange=instrument["exchange"],
-                    tradingsymbol=instrument["symbol"],
-                    transaction_type="BUY",
-                    quantity=quantity,
-                    product="MIS",
-                    order_type="LIMIT",
-                    price=target,
-                    validity="DAY"
-                )
-                logging.info(f"🎯 Target Order placed at {target} for {instrument['symbol']}! Order ID: {target_order_id}")
-
-                # Start monitoring the orders for OCO functionality
-                monitor_oco_orders(sl_order_id, target_order_id)
+        # Place SL and Target orders the moment the entry fills (cancelled if it doesn't fill in time)
+        filled_quantity = await_fill(kite, order_id, FILL_TIMEOUT, order_updates)
+
+        if filled_quantity:
+            quantity = filled_quantity
+            # Place stop-loss order (BUY SL-M)
+            sl_order_id = kite.place_order(
+                variety="regular",
+                exchange=instrument["exchange"],
+                tradingsymbol=instrument["symbol"],
+                transaction_type="BUY",
+                quantity=quantity,
+                product="MIS",
+                order_type="SL-M",
+                trigger_price=stop_loss,
+                validity="DAY"
+            )
+            logging.info(f"🛑 Stop-Loss Order placed at {stop_loss} for {instrument['symbol']}! Order ID: {sl_order_id}")
+
+            # Place target order (BUY LIMIT)
+            target_order_id = kite.place_order(
+                variety="regular",
+                exchange=instrument["exchange"],
+                tradingsymbol=instrument["symbol"],
+                transaction_type="BUY",
+                quantity=quantity,
+                product="MIS",
+                order_type="LIMIT",
+                price=target,
+                validity="DAY"
+            )
+            logging.info(f"🎯 Target Order placed at {target} for {instrument['symbol']}! Order ID: {target_order_id}")
+
+            # Start monitoring the orders for OCO functionality
+            monitor_oco_orders(sl_order_id, target_order_id)
     except Exception as e:
         logging.error(f"Error placing SELL order for {instrument['symbol']}: {e}")
 
@@ -219,12 +231,13 @@ def monitor_oco_orders(sl_order_id, target_order_id):
                 kite.cancel_order(variety="regular", order_id=sl_order_id)
                 break
 
-            sleep(1)
+            clock.sleep(1)
     except Exception as e:
         logging.error(f"Error monitoring OCO orders: {e}")
 
 def signal_handler(sig, frame):
-    logging.info("Interrupt received, stopping...")
+    logging.info("Interrupt received, flattening and stopping...")
+    kill_switch.run()
     kws.stop()
     sys.exit(0)
 
@@ -241,9 +254,12 @@ try:
     # Main loop (Runs continuously)
     while True:
         logging.info("Starting new cycle")
-        for instrument in instruments:
-            check_trade_condition(instrument)
+        if feed.ready.is_set():
+            for instrument in instruments:
+                check_trade_condition(instrument)
+        else:
+            logging.warning("Market feed is down, holding entry signals until it is back")
         logging.info(f"Sleeping for {DURATION} seconds...\n")
-        sleep(DURATION)
+        clock.sleep(DURATION)
 except (KeyboardInterrupt, SystemExit):
     signal_handler(None, None)
\ No newline at end of file
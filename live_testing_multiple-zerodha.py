@@ -1,34 +1,42 @@
-import kiteapp as kt
 import pandas as pd
-from datetime import datetime, timedelta
+from datetime import timedelta
 import logging
 from tabulate import tabulate
-from instrument_config import instruments, trade_config
+from instrument_config import instruments, trade_config, accounts
+from multi_account import AccountSession, FanOutExecutor
+from order_waiter import OrderUpdates
+from killswitch import KillSwitch
+from feed import ManagedFeed
 import threading
-from time import sleep
+from concurrent.futures import ThreadPoolExecutor
+import clock
 import signal
 import sys
 
 # Constants
 INTERVAL = "2minute"
 DURATION = 3  # Duration for each sleep cycle in seconds
+ENTRY_ORDER_TYPE = "MARKET"  # Order type for the SELL entry on every account
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
                     handlers=[logging.FileHandler("trading_script.log"), logging.StreamHandler()])
 
-# Read token from file
-with open('enctoken.txt', 'r') as rd:
-    token = rd.read().strip()
-    logging.info("Token read from file successfully")
+# One session per account; signals are computed once and orders fanned out to all of them
+sessions = [AccountSession.from_config(account) for account in accounts]
+executor = FanOutExecutor(sessions, trade_config, ENTRY_ORDER_TYPE)
+logging.info(f"Kite API initialized for accounts: {[session.user_id for session in sessions]}")
 
-# Initialize Kite API
-kite = kt.KiteApp("kite", "YQ6639", token)
-logging.info("Kite API initialized successfully")
+# Market data (websocket and historical candles) comes from the first account only
+kite = sessions[0].kite
 
 # Initialize Kite Ticker
 kws = kite.kws()  # For Websocket
 
+# Every account's orders carry this session's tag; SIGINT/SIGTERM or `python killswitch.py` flattens them all
+kill_switches = [KillSwitch(session.kite) for session in sessions]
+kill_switches[0].watch()
+
 live_data = {}
 
 def on_ticks(ws, ticks):
@@ -46,36 +54,22 @@ def on_connect(ws, response):
     logging.info("WebSocket connected and subscribed to instruments")
 
 def on_close(ws, code, reason):
-    ws.stop()
-    logging.info("WebSocket closed")
+    logging.info("WebSocket closed, reconnecting")
 
 kws.on_ticks = on_ticks
 kws.on_connect = on_connect
 kws.on_close = on_close
+# Reconnects and resubscribes; `ready` is clear while the feed is down. Nothing to backfill:
+# fetch_historical_data() takes every candle whole from historical_data() each cycle
+feed = ManagedFeed(kite, kws, INTERVAL)
 
-def has_active_sell_order(symbol):
-    """Check if there's an active SELL order for the given symbol."""
-    try:
-        orders = kite.orders()
-        for order in orders:
-            if order["tradingsymbol"] == symbol and order["transaction_type"] == "SELL":
-                if order["status"] in ["OPEN", "TRIGGER PENDING", "PARTIALLY EXECUTED", "PENDING", "AMO REQ RECEIVED"]:
-                    logging.info(f"Active SELL order detected for {symbol}! Order ID: {order['order_id']}, Status: {order['status']}")
-                    return True
-        
-        positions = kite.positions()
-        for position in positions["net"]:
-            if position["tradingsymbol"] == symbol and position["quantity"] < 0:
-                logging.info(f"Active position detected for {symbol}! Quantity: {position['quantity']}, Status: OPEN")
-                return True
-        return False
-    except Exception as e:
-        logging.error(f"Error checking active orders for {symbol}: {e}")
-        return False
+# Order updates for the first account arrive on its websocket; other accounts fall back to polling
+sessions[0].order_updates = OrderUpdates()
+sessions[0].order_updates.attach(kws)
 
 def fetch_historical_data(instrument):
     """Fetch historical OHLC data for the given instrument."""
-    today = datetime.now()
+    today = clock.now()
     from_date = (today - timedelta(days=5)).strftime("%Y-%m-%d %H:%M:%S")
     to_date = today.strftime("%Y-%m-%d %H:%M:%S")
 
@@ -132,75 +126,16 @@ def check_trade_condition(instrument):
     logging.info(f"{instrument['symbol']} - Latest Close: {close_price}, 50MA: {ma_50}, Lower BB: {lower_bb}")
 
     if close_price < ma_50 or close_price <= lower_bb:
-        if has_active_sell_order(instrument["symbol"]):
-            logging.info(f"Skipping SELL order for {instrument['symbol']} as an active order exists.")
-        else:
-            logging.info(f"Condition met for {instrument['symbol']}: Placing SELL order!")
-            place_sell_order(instrument, close_price)
+        logging.info(f"Condition met for {instrument['symbol']}: Placing SELL order on all accounts!")
+        executor.place_sell_order(instrument, close_price)
     else:
         logging.info(f"Condition not met for {instrument['symbol']}: No action taken.")
 
-def place_sell_order(instrument, ltp):
-    """Place a SELL order for the given instrument and set stop-loss and target orders only if the main order is executed."""
-    try:
-        config = trade_config.get(instrument["symbol"], {"sl_buffer": 2, "target_buffer": 2, "quantity": 1})
-        sl_buffer = config["sl_buffer"]
-        target_buffer = config["target_buffer"]
-        quantity = config["quantity"]
-        stop_loss = round(ltp + sl_buffer, 2)
-        target = round(ltp - target_buffer, 2)
-
-        order_id = kite.place_order(
-            variety="regular",
-            exchange=instrument["exchange"],
-            tradingsymbol=instrument["symbol"],
-            transaction_type="SELL",
-            quantity=quantity,
-            product="MIS",
-            order_type="MARKET",
-            price=ltp,
-            validity="DAY"
-        )
-        logging.info(f"✅ SELL Order placed successfully for {instrument['symbol']}! Order ID: {order_id}")
-
-        # Wait for order execution before placing SL and Target orders
-        sleep(2)
-        orders = kite.orders()
-
-        for order in orders:
-            if order["order_id"] == order_id and order["status"] == "COMPLETE":
-                # Place stop-loss order (BUY SL-M)
-                sl_order_id = kite.place_order(
-                    variety="regular",
-                    exchange=instrument["exchange"],
-                    tradingsymbol=instrument["symbol"],
-                    transaction_type="BUY",
-                    quantity=quantity,
-                    product="MIS",
-                    order_type="SL-M",
-                    trigger_price=stop_loss,
-                    validity="DAY"
-                )
-                logging.info(f"🛑 Stop-Loss Order placed at {stop_loss} for {instrument['symbol']}! Order ID: {sl_order_id}")
-
-                # Place target order (BUY LIMIT)
-                target_order_id = kite.place_order(
-                    variety="regular",
-                    exchange=instrument["exchange"],
-                    tradingsymbol=instrument["symbol"],
-                    transaction_type="BUY",
-                    quantity=quantity,
-                    product="MIS",
-                    order_type="LIMIT",
-                    price=target,
-                    validity="DAY"
-                )
-                logging.info(f"🎯 Target Order placed at {target} for {instrument['symbol']}! Order ID: {target_order_id}")
-    except Exception as e:
-        logging.error(f"Error placing SELL order for {instrument['symbol']}: {e}")
-
 def signal_handler(sig, frame):
-    logging.info("Interrupt received, stopping...")
+    logging.info("Interrupt received, flattening and stopping...")
+    executor.shutdown()
+    with ThreadPoolExecutor(max_workers=len(kill_switches)) as pool:
+        list(pool.map(lambda switch: switch.run(), kill_switches))
     kws.stop()
     sys.exit(0)
 
@@ -217,9 +152,13 @@ try:
     # Main loop (Runs continuously)
     while True:
         logging.info("Starting new cycle")
-        for instrument in instruments:
-            check_trade_condition(instrument)
+        executor.refresh_all()
+        if feed.ready.is_set():
+            for instrument in instruments:
+                check_trade_condition(instrument)
+        else:
+            logging.warning("Market feed is down, holding entry signals until it is back")
         logging.info(f"Sleeping for {DURATION} seconds...\n")
-        sleep(DURATION)
+        clock.sleep(DURATION)
 except (KeyboardInterrupt, SystemExit):
     signal_handler(None, None)
\ No newline at end of file
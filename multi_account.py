@@ -0,0 +1,133 @@
+import kiteapp as kt
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from time import time
+from ratelimit import RateLimiter, ORDER_RATE
+from order_waiter import await_fill
+
+log = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ["OPEN", "TRIGGER PENDING", "PARTIALLY EXECUTED", "PENDING", "AMO REQ RECEIVED"]
+DEFAULT_CONFIG = {"sl_buffer": 2, "target_buffer": 2, "quantity": 1}
+
+
+class AccountSession:
+    """One Zerodha login with its own HTTP session, order rate limiter and order/position cache."""
+
+    def __init__(self, kite, user_id, quantity_scale=1):
+        self.kite = kite
+        self.user_id = user_id
+        self.quantity_scale = quantity_scale
+        self.limiter = RateLimiter(ORDER_RATE)
+        self.orders = []
+        self.positions = []
+        self.pending = set()  # Symbols with an entry in flight that the cache may not show yet
+        self.order_updates = None  # order_waiter.OrderUpdates if this account's websocket is connected
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, account):
+        """Build a session from an `accounts` entry in instrument_config."""
+        with open(account["token_file"], 'r') as rd:
+            token = rd.read().strip()
+        kite = kt.KiteApp("kite", account["user_id"], token)
+        return cls(kite, account["user_id"], account.get("quantity_scale", 1))
+
+    def refresh(self):
+        """Reload this account's order book and net positions."""
+        try:
+            orders = self.kite.orders()
+            positions = self.kite.positions()["net"]
+        except Exception as e:
+            log.error(f"[{self.user_id}] Error refreshing orders and positions: {e}")
+            return
+        with self.lock:
+            self.orders = orders
+            self.positions = positions
+            self.pending -= {order["tradingsymbol"] for order in orders}
+
+    def has_active_sell_order_or_position(self, symbol):
+        """Answer from the cached order book and positions instead of two REST calls."""
+        with self.lock:
+            if symbol in self.pending:
+                return True
+            for order in self.orders:
+                if order["tradingsymbol"] == symbol and order["transaction_type"] == "SELL" and order["status"] in ACTIVE_STATUSES:
+                    return True
+            return any(p["tradingsymbol"] == symbol and p["quantity"] != 0 for p in self.positions)
+
+    def quantity_for(self, config):
+        """Scale the trade_config quantity for this account, never below one unit."""
+        scale = config.get("quantity_scale", {}).get(self.user_id, self.quantity_scale)
+        return max(1, int(round(config["quantity"] * scale)))
+
+    def place_order(self, **order_params):
+        self.limiter.acquire()
+        return self.kite.place_order(**order_params)
+
+    def place_bracket(self, instrument, ltp, config, order_type="LIMIT"):
+        """Place the SELL entry, then the SL-M and target legs once it fills."""
+        symbol = instrument["symbol"]
+        quantity = self.quantity_for(config)
+        stop_loss = round(ltp + config["sl_buffer"], 2)
+        target = round(ltp - config["target_buffer"], 2)
+        common = dict(variety="regular", exchange=instrument["exchange"], tradingsymbol=symbol,
+                      quantity=quantity, product="MIS", validity="DAY")
+        try:
+            price = dict(price=ltp) if order_type == "LIMIT" else {}
+            order_id = self.place_order(transaction_type="SELL", order_type=order_type, **price, **common)
+            log.info(f"[{self.user_id}] ✅ SELL Order placed for {symbol} x{quantity}! Order ID: {order_id}")
+
+            # Place SL and Target orders the moment the entry fills (cancelled if it doesn't fill in time)
+            filled_quantity = await_fill(self.kite, order_id, updates=self.order_updates)
+            if not filled_quantity:
+                log.info(f"[{self.user_id}] SELL order {order_id} for {symbol} did not fill; no SL/target placed")
+                return order_id, None, None
+            common["quantity"] = filled_quantity
+
+            sl_order_id = self.place_order(transaction_type="BUY", order_type="SL-M", trigger_price=stop_loss, **common)
+            log.info(f"[{self.user_id}] 🛑 Stop-Loss Order placed at {stop_loss} for {symbol}! Order ID: {sl_order_id}")
+            target_order_id = self.place_order(transaction_type="BUY", order_type="LIMIT", price=target, **common)
+            log.info(f"[{self.user_id}] 🎯 Target Order placed at {target} for {symbol}! Order ID: {target_order_id}")
+            return order_id, sl_order_id, target_order_id
+        except Exception as e:
+            log.error(f"[{self.user_id}] Error placing SELL order for {symbol}: {e}")
+            with self.lock:
+                self.pending.discard(symbol)
+            return None, None, None
+
+
+class FanOutExecutor:
+    """Send one signal to every account at once so entries land milliseconds apart."""
+
+    def __init__(self, sessions, trade_config, order_type="LIMIT"):
+        self.sessions = sessions
+        self.trade_config = trade_config
+        self.order_type = order_type
+        # Brackets block while waiting on fills, so leave room for several signals per cycle
+        self.pool = ThreadPoolExecutor(max_workers=max(8, 4 * len(sessions)), thread_name_prefix="fanout")
+
+    def refresh_all(self):
+        """Refresh every account's cache concurrently."""
+        wait([self.pool.submit(session.refresh) for session in self.sessions])
+
+    def place_sell_order(self, instrument, ltp):
+        """Fan the entry out to all accounts without an active order or position; returns the futures."""
+        config = self.trade_config.get(instrument["symbol"], DEFAULT_CONFIG)
+        eligible = []
+        for session in self.sessions:
+            if session.has_active_sell_order_or_position(instrument["symbol"]):
+                log.info(f"[{session.user_id}] Skipping SELL order for {instrument['symbol']} as an active order or position exists.")
+                continue
+            with session.lock:
+                session.pending.add(instrument["symbol"])
+            eligible.append(session)
+
+        started = time()
+        futures = [self.pool.submit(session.place_bracket, instrument, ltp, config, self.order_type) for session in eligible]
+        log.info(f"Fanned out SELL {instrument['symbol']} to {len(futures)} accounts in {(time() - started) * 1000:.2f} ms")
+        return futures
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
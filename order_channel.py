@@ -0,0 +1,122 @@
+import json
+import logging
+from urllib.parse import quote_plus, urlencode, urlsplit
+import certifi
+import urllib3
+import kiteconnect.exceptions as ex
+from warmup import ConnectionWarmer, KEEPALIVE_INTERVAL
+
+log = logging.getLogger(__name__)
+
+CONNECTIONS = 4  # Kept-alive connections to the OMS: an entry and both bracket legs in flight, plus a spare
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = 7  # Kite's own client allows 7s per request
+FIXED = ("exchange", "tradingsymbol", "transaction_type", "product", "order_type", "validity")  # Baked into a template
+LEGS = {  # The scripts' bracket: a SELL entry, then the BUY stop-loss and target once it fills
+    "entry": {"transaction_type": "SELL", "order_type": "LIMIT"},
+    "stop_loss": {"transaction_type": "BUY", "order_type": "SL-M"},
+    "target": {"transaction_type": "BUY", "order_type": "LIMIT"},
+}
+
+
+def auth_headers(kite):
+    """Headers for every order request: the KiteApp enctoken headers, or Kite Connect's API token."""
+    headers = dict(getattr(kite, "headers", None) or {
+        "X-Kite-Version": "3", "Authorization": f"token {kite.api_key}:{kite.access_token}"})
+    headers["Content-Type"] = "application/x-www-form-urlencoded"
+    return headers
+
+
+class OrderChannel:
+    """place_order over a keep-alive connection pool of its own to the OMS, from prebuilt payloads.
+
+    KiteApp.place_order goes through the generic _request: route formatting,
+    the root switch, requests' per-call request preparation, and a session
+    shared with historical downloads whose pooled connection may be busy or
+    have idled out. Here the OMS URL, headers and the form body of every
+    (instrument, leg) are built once by prepare(); a send appends quantity,
+    price, trigger price and tag to the body and writes it on one of
+    `connections` urllib3 connections that a ConnectionWarmer keeps alive.
+    Everything else (orders(), cancel_order, ...) goes to the wrapped kite.
+
+    Retries are never automatic: a failure that may have reached the OMS is
+    raised as a NetworkException, for OrderSubmitter's tag-checked retry.
+    """
+
+    def __init__(self, kite, connections=CONNECTIONS, keepalive=KEEPALIVE_INTERVAL):
+        self.kite = kite
+        base = urlsplit(getattr(kite, "root2", None) or kite.root)  # KiteApp sends orders to root2
+        self.origin = f"{base.scheme}://{base.netloc}/"
+        self.route = base.path.rstrip("/") + kite._routes["order.place"]
+        self.headers = auth_headers(kite)
+        self.timeout = urllib3.Timeout(connect=CONNECT_TIMEOUT, read=READ_TIMEOUT)
+        verify = not getattr(kite, "disable_ssl", False)
+        tls = {"cert_reqs": "CERT_REQUIRED", "ca_certs": certifi.where()} if verify else {"cert_reqs": "CERT_NONE"}
+        self.pool = urllib3.connection_from_url(self.origin, maxsize=connections, block=False,
+                                                **(tls if base.scheme == "https" else {}))
+        self.connections = connections
+        self.keepalive = keepalive
+        self.warmer = None
+        self.templates = {}  # (variety, *FIXED values) -> (path, form body of the fixed fields)
+
+    def __getattr__(self, name):
+        return getattr(self.kite, name)
+
+    def template(self, variety, *fixed):
+        key = (variety, *fixed)
+        if key not in self.templates:
+            fields = [("variety", variety)] + [(name, value) for name, value in zip(FIXED, fixed) if value is not None]
+            body = urlencode(fields)
+            self.templates[key] = (self.route.format(variety=variety), body)
+        return self.templates[key]
+
+    def prepare(self, instruments, legs=LEGS, product="MIS", validity="DAY", variety="regular"):
+        """Build the template of every leg for every instrument ahead of the first order."""
+        for instrument in instruments:
+            for leg in legs.values():
+                self.template(variety, instrument["exchange"], instrument["symbol"], leg["transaction_type"], product,
+                              leg["order_type"], validity)
+        return len(self.templates)
+
+    def start(self):
+        """Open the pool's connections and keep them alive with pings; returns how many answered."""
+        self.warmer = ConnectionWarmer(self, [self.origin], self.connections, self.keepalive)
+        return self.warmer.start()
+
+    def head(self, url, timeout=None):
+        """Keep-alive ping for the ConnectionWarmer, over this channel's own pool."""
+        return self.pool.urlopen("HEAD", urlsplit(url).path or "/", retries=False, timeout=timeout)
+
+    def place_order(self, variety, **params):
+        """Same call and result as kite.place_order: the order ID."""
+        path, body = self.template(variety, *[params.pop(name, None) for name in FIXED])
+        if not params.get("tag") and getattr(self.kite, "order_tag", None):
+            params["tag"] = self.kite.order_tag
+        body += "".join(f"&{name}={quote_plus(str(value))}" for name, value in params.items() if value is not None)
+        try:
+            response = self.pool.urlopen("POST", path, body=body.encode(), headers=self.headers, retries=False,
+                                         timeout=self.timeout)
+        except urllib3.exceptions.HTTPError as e:
+            raise ex.NetworkException(f"Order channel: {e}")
+        return self.parse(response)["order_id"]
+
+    def parse(self, response):
+        """Unwrap a Kite JSON response the way KiteApp._request does, raising its exception types."""
+        if "json" not in response.headers.get("content-type", ""):
+            raise ex.DataException(f"Unknown Content-Type ({response.headers.get('content-type')}) "
+                                   f"with response: ({response.data})")
+        try:
+            data = json.loads(response.data)
+        except ValueError:
+            raise ex.DataException(f"Couldn't parse the JSON response received from the server: {response.data}")
+        if data.get("error_type"):
+            hook = getattr(self.kite, "session_expiry_hook", None)
+            if hook and response.status == 403 and data["error_type"] == "TokenException":
+                hook()
+            raise getattr(ex, data["error_type"], ex.GeneralException)(data["message"], code=response.status)
+        return data["data"]
+
+    def stop(self):
+        if self.warmer:
+            self.warmer.stop()
+        self.pool.close()
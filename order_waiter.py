@@ -0,0 +1,111 @@
+import logging
+import threading
+import clock
+
+log = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ("COMPLETE", "CANCELLED", "REJECTED")
+FILL_TIMEOUT = 30  # Seconds to wait for an entry to fill before cancelling it
+FIRST_POLL = 0.05  # First order_history() poll after placing, in seconds
+MAX_POLL = 0.5  # Polling interval ceiling when no order-update stream is available
+POLL_BACKOFF = 1.5
+STREAM_POLL = 3  # Seconds between fallback order_history() polls while the order-update stream is attached
+
+
+class OrderUpdates:
+    """Latest order state per order id, pushed from the KiteTicker order-update stream."""
+
+    def __init__(self):
+        self.orders = {}
+        self.condition = threading.Condition()
+
+    def attach(self, kws):
+        """Hook into a ticker's on_order_update, keeping any callback already set."""
+        previous = kws.on_order_update
+
+        def on_order_update(ws, data):
+            self.update(data)
+            if previous:
+                previous(ws, data)
+
+        kws.on_order_update = on_order_update
+
+    def update(self, order):
+        with self.condition:
+            self.orders[order["order_id"]] = order
+            self.condition.notify_all()
+
+    def get(self, order_id):
+        with self.condition:
+            return self.orders.get(order_id)
+
+    def wait(self, order_id, timeout):
+        """Block up to `timeout` seconds for a terminal update of `order_id`."""
+        deadline = clock.monotonic() + timeout
+        with self.condition:
+            while True:
+                order = self.orders.get(order_id)
+                if order and order["status"] in TERMINAL_STATUSES:
+                    return order
+                remaining = deadline - clock.monotonic()
+                if remaining <= 0:
+                    return order
+                clock.wait(self.condition, remaining)
+
+
+def latest_state(kite, order_id):
+    history = kite.order_history(order_id)
+    return history[-1] if history else None
+
+
+def wait_for_order(kite, order_id, timeout=FILL_TIMEOUT, updates=None):
+    """Return the order as soon as it reaches a terminal state, or its last known state at the deadline.
+
+    With an OrderUpdates stream the wait ends the moment the update arrives, and order_history()
+    is only polled every STREAM_POLL seconds in case an update is missed; without one it is
+    polled with exponential back-off.
+    """
+    deadline = clock.monotonic() + timeout
+    delay = STREAM_POLL if updates else FIRST_POLL
+    order = None
+    while True:
+        if updates:
+            order = updates.wait(order_id, min(delay, max(0, deadline - clock.monotonic()))) or order
+        else:
+            clock.sleep(min(delay, max(0, deadline - clock.monotonic())))
+        if order and order["status"] in TERMINAL_STATUSES:
+            return order
+        try:
+            order = latest_state(kite, order_id) or order
+        except Exception as e:
+            log.warning(f"Error polling order {order_id}: {e}")
+        if order and order["status"] in TERMINAL_STATUSES:
+            return order
+        if clock.monotonic() >= deadline:
+            return order
+        if not updates:
+            delay = min(delay * POLL_BACKOFF, MAX_POLL)
+
+
+def cancel_unfilled(kite, order_id, updates=None, variety="regular", timeout=5):
+    """Cancel an entry that did not fill in time and return its final state (it may have filled meanwhile)."""
+    try:
+        kite.cancel_order(variety=variety, order_id=order_id)
+        log.info(f"Cancelled unfilled order {order_id}")
+    except Exception as e:
+        log.warning(f"Could not cancel order {order_id}: {e}")
+    return wait_for_order(kite, order_id, timeout, updates)
+
+
+def await_fill(kite, order_id, timeout=FILL_TIMEOUT, updates=None):
+    """Wait for an entry to fill; cancel it at the deadline. Returns the filled quantity (0 if none)."""
+    order = wait_for_order(kite, order_id, timeout, updates)
+    if not order or order["status"] not in TERMINAL_STATUSES:
+        log.info(f"Order {order_id} not filled within {timeout}s, cancelling")
+        order = cancel_unfilled(kite, order_id, updates)
+    if not order:
+        return 0
+    if order["status"] == "COMPLETE":
+        return order.get("filled_quantity") or order.get("quantity", 0)
+    # A cancelled order can still have a partial fill that needs protecting
+    return order.get("filled_quantity", 0)
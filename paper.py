@@ -0,0 +1,306 @@
+import itertools
+import logging
+import threading
+import clock
+from pnl import Position
+
+log = logging.getLogger(__name__)
+
+LATENCY = 0.05  # Seconds from placement until an order can first fill
+SLIPPAGE_TICKS = 1  # Adverse ticks on MARKET and stop fills
+DEFAULT_TICK = 0.05
+CAPITAL = 1_000_000  # Virtual funds reported by margins()
+MIS_MARGIN = 0.2  # Fraction of notional order_margins() quotes for MIS
+
+
+class PaperBroker:
+    """Stand-in for KiteApp that simulates the order and portfolio calls against live ticks.
+
+    place/modify/cancel_order, orders, order_history, positions, margins and
+    order_margins never leave the process; market-data calls (historical_data,
+    instruments, kws) go to the real KiteApp. Orders become eligible to fill
+    `latency` seconds after they are placed and fill on the next tick that
+    crosses them: MARKET and triggered stops at the touch plus `slippage_ticks`
+    against us, LIMIT orders at their price. GTTs trigger on the first tick
+    through a trigger value and place their leg as a paper order. Order
+    updates are dispatched to the ticker's on_order_update chain exactly like
+    real ones.
+    """
+
+    def __init__(self, kite, instruments, latency=LATENCY, slippage_ticks=SLIPPAGE_TICKS, tick_size=DEFAULT_TICK,
+                 capital=CAPITAL):
+        self.kite = kite
+        self.tokens = {instrument["symbol"]: instrument["token"] for instrument in instruments}
+        self.latency = latency
+        self.slippage_ticks = slippage_ticks
+        self.tick_size = tick_size
+        self.capital = capital
+        self.order_tag = None
+        self.orders_ = {}  # order_id -> order dict (Kite format)
+        self.history = {}  # order_id -> [order dict per status change]
+        self.working = {}  # instrument token -> {order_id: (eligible_at, order)}
+        self.gtts = {}  # trigger_id -> GTT dict (Kite format)
+        self.armed = {}  # instrument token -> {trigger_id: GTT} for active GTTs
+        self.positions_ = {}  # symbol -> Position
+        self.positions_by_token = {}  # instrument token -> Position
+        self.ltp = {}  # instrument token -> last tick
+        self.ids = itertools.count(1)
+        self.listeners = []  # Callables given each order update
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        # Anything not simulated here is a read from the real account
+        return getattr(self.kite, name)
+
+    def attach(self, kws):
+        """Feed fills from this ticker and send paper order updates down its on_order_update chain.
+
+        Call after every other on_ticks/on_order_update hook is in place; real
+        order updates from the account are dropped so they can't mix with paper fills.
+        """
+        previous_ticks = kws.on_ticks
+        dispatch = kws.on_order_update
+        if dispatch:
+            self.listeners.append(lambda order: dispatch(kws, order))
+
+        def on_ticks(ws, ticks):
+            self.on_ticks(ws, ticks)
+            if previous_ticks:
+                previous_ticks(ws, ticks)
+
+        kws.on_ticks = on_ticks
+        kws.on_order_update = None
+
+    def _update(self, order, **changes):
+        order.update(changes, exchange_update_timestamp=clock.now())
+        snapshot = dict(order)
+        self.history[order["order_id"]].append(snapshot)
+        return snapshot
+
+    def _dispatch(self, updates):
+        for update in updates:
+            for listener in self.listeners:
+                try:
+                    listener(update)
+                except Exception as e:
+                    log.error(f"Error dispatching paper order update {update['order_id']}: {e}")
+
+    # Orders
+
+    def place_order(self, variety, exchange, tradingsymbol, transaction_type, quantity, product, order_type,
+                    price=None, validity=None, trigger_price=None, tag=None, **params):
+        with self.lock:
+            order_id, update = self._place(variety, exchange, tradingsymbol, transaction_type, quantity, product,
+                                           order_type, price, validity, trigger_price, tag)
+        self._dispatch([update])
+        return order_id
+
+    def _place(self, variety, exchange, tradingsymbol, transaction_type, quantity, product, order_type,
+               price=None, validity=None, trigger_price=None, tag=None):
+        """Book a new order; the caller holds the lock and dispatches the returned update."""
+        order_id = f"paper{next(self.ids)}"
+        order = {
+            "order_id": order_id, "variety": variety, "exchange": exchange, "tradingsymbol": tradingsymbol,
+            "instrument_token": self.tokens.get(tradingsymbol), "transaction_type": transaction_type,
+            "quantity": quantity, "product": product, "order_type": order_type, "price": price or 0,
+            "trigger_price": trigger_price or 0, "validity": validity, "tag": tag or self.order_tag,
+            "filled_quantity": 0, "pending_quantity": quantity, "average_price": 0.0,
+            "order_timestamp": clock.now(), "status_message": None,
+        }
+        self.orders_[order_id] = order
+        self.history[order_id] = []
+        if order["instrument_token"] is None:
+            update = self._update(order, status="REJECTED", status_message=f"Unknown instrument {tradingsymbol}")
+        else:
+            update = self._update(order, status="TRIGGER PENDING" if order_type in ("SL", "SL-M") else "OPEN")
+            self.working.setdefault(order["instrument_token"], {})[order_id] = (clock.monotonic() + self.latency, order)
+        return order_id, update
+
+    def modify_order(self, variety, order_id, quantity=None, price=None, order_type=None, trigger_price=None, **params):
+        with self.lock:
+            order = self.orders_[order_id]
+            if order["status"] not in ("OPEN", "TRIGGER PENDING"):
+                raise ValueError(f"Order {order_id} is {order['status']} and cannot be modified")
+            changes = {key: value for key, value in (("price", price), ("order_type", order_type),
+                                                      ("trigger_price", trigger_price)) if value is not None}
+            if quantity is not None:
+                changes.update(quantity=quantity, pending_quantity=quantity - order["filled_quantity"])
+            update = self._update(order, **changes)
+        self._dispatch([update])
+        return order_id
+
+    def cancel_order(self, variety, order_id, **params):
+        with self.lock:
+            order = self.orders_[order_id]
+            if order["status"] not in ("OPEN", "TRIGGER PENDING"):
+                raise ValueError(f"Order {order_id} is {order['status']} and cannot be cancelled")
+            self.working.get(order["instrument_token"], {}).pop(order_id, None)
+            update = self._update(order, status="CANCELLED")
+        self._dispatch([update])
+        return order_id
+
+    def orders(self):
+        with self.lock:
+            return [dict(order) for order in self.orders_.values()]
+
+    def order_history(self, order_id):
+        with self.lock:
+            return list(self.history.get(order_id, []))
+
+    def positions(self):
+        with self.lock:
+            net = [{
+                "tradingsymbol": p.symbol, "exchange": p.exchange, "instrument_token": p.token, "product": "MIS",
+                "quantity": p.quantity, "average_price": p.average_price, "last_price": p.ltp or 0,
+                "realised": p.realised, "unrealised": p.unrealised(), "pnl": p.realised + p.unrealised(),
+            } for p in self.positions_.values()]
+        return {"net": net, "day": net}
+
+    def margins(self, segment=None):
+        used = sum(abs(p.exposure()) for p in self.positions_.values()) * MIS_MARGIN
+        funds = {"net": self.capital - used, "available": {"cash": self.capital}, "utilised": {"debits": used}}
+        margins = {"equity": funds, "commodity": dict(funds)}
+        return margins[segment] if segment else margins
+
+    def order_margins(self, params):
+        return [{"tradingsymbol": order["tradingsymbol"],
+                 "total": order["quantity"] * (order.get("price") or 0) * MIS_MARGIN} for order in params]
+
+    # GTTs
+
+    def _gtt(self, trigger_id, trigger_type, tradingsymbol, exchange, trigger_values, last_price, orders):
+        if len(trigger_values) != (2 if trigger_type == "two-leg" else 1) or len(orders) != len(trigger_values):
+            raise ValueError(f"Invalid {trigger_type} GTT: {len(trigger_values)} trigger values, {len(orders)} orders")
+        token = self.tokens.get(tradingsymbol)
+        if token is None:
+            raise ValueError(f"Unknown instrument {tradingsymbol}")
+        now = clock.now()
+        return {
+            "id": trigger_id, "type": trigger_type, "status": "active", "created_at": now, "updated_at": now,
+            "condition": {"exchange": exchange, "tradingsymbol": tradingsymbol, "instrument_token": token,
+                          "trigger_values": list(trigger_values), "last_price": last_price},
+            "orders": [dict(order, exchange=exchange, tradingsymbol=tradingsymbol, result=None) for order in orders],
+        }
+
+    def place_gtt(self, trigger_type, tradingsymbol, exchange, trigger_values, last_price, orders):
+        with self.lock:
+            trigger_id = next(self.ids)
+            gtt = self.gtts[trigger_id] = self._gtt(trigger_id, trigger_type, tradingsymbol, exchange, trigger_values,
+                                                    last_price, orders)
+            self.armed.setdefault(gtt["condition"]["instrument_token"], {})[trigger_id] = gtt
+        return {"trigger_id": trigger_id}
+
+    def modify_gtt(self, trigger_id, trigger_type, tradingsymbol, exchange, trigger_values, last_price, orders):
+        with self.lock:
+            gtt = self.gtts[trigger_id]
+            if gtt["status"] != "active":
+                raise ValueError(f"GTT {trigger_id} is {gtt['status']} and cannot be modified")
+            gtt.update(self._gtt(trigger_id, trigger_type, tradingsymbol, exchange, trigger_values, last_price, orders),
+                       created_at=gtt["created_at"])
+        return {"trigger_id": trigger_id}
+
+    def delete_gtt(self, trigger_id):
+        with self.lock:
+            gtt = self.gtts[trigger_id]
+            if gtt["status"] != "active":
+                raise ValueError(f"GTT {trigger_id} is {gtt['status']} and cannot be deleted")
+            self.armed.get(gtt["condition"]["instrument_token"], {}).pop(trigger_id, None)
+            gtt.update(status="deleted", updated_at=clock.now())
+        return {"trigger_id": trigger_id}
+
+    def get_gtts(self):
+        with self.lock:
+            return [dict(gtt) for gtt in self.gtts.values()]
+
+    def get_gtt(self, trigger_id):
+        with self.lock:
+            return dict(self.gtts[trigger_id])
+
+    @staticmethod
+    def _triggered_leg(gtt, price):
+        """Index of the GTT leg this price triggers, or None."""
+        values = gtt["condition"]["trigger_values"]
+        if gtt["type"] == "two-leg":
+            return 0 if price <= values[0] else 1 if price >= values[1] else None
+        # A single leg fires when price crosses its value from where it was when the GTT was placed
+        rising = gtt["condition"]["last_price"] < values[0]
+        return 0 if (price >= values[0] if rising else price <= values[0]) else None
+
+    def _trigger(self, token, price):
+        """Fire the active GTTs this price crosses; the caller holds the lock and dispatches the updates."""
+        updates = []
+        for trigger_id, gtt in list(self.armed.get(token, {}).items()):
+            leg = self._triggered_leg(gtt, price)
+            if leg is None:
+                continue
+            del self.armed[token][trigger_id]
+            order = gtt["orders"][leg]
+            order_id, update = self._place("regular", order["exchange"], order["tradingsymbol"],
+                                           order["transaction_type"], order["quantity"], order["product"],
+                                           order["order_type"], order["price"], "DAY", tag=self.order_tag)
+            order["result"] = {"order_result": {"order_id": order_id, "status": update["status"]}}
+            gtt.update(status="triggered", updated_at=clock.now())
+            updates.append(update)
+            log.info(f"📄 Paper GTT {trigger_id} for {order['tradingsymbol']} triggered at {price}: "
+                     f"{order['transaction_type']} {order['order_type']} {order['price']} ({order_id})")
+        return updates
+
+    # Fills
+
+    def _fill_price(self, order, tick):
+        """Price the order fills at on this tick, or None if it doesn't fill."""
+        sell = order["transaction_type"] == "SELL"
+        depth = tick.get("depth", {})
+        bid = (depth.get("buy") or [{}])[0].get("price") or tick["last_price"]
+        ask = (depth.get("sell") or [{}])[0].get("price") or tick["last_price"]
+        touch = bid if sell else ask
+        slip = self.slippage_ticks * self.tick_size * (-1 if sell else 1)
+
+        order_type = order["order_type"]
+        if order_type in ("SL", "SL-M"):
+            triggered = tick["last_price"] <= order["trigger_price"] if sell else tick["last_price"] >= order["trigger_price"]
+            if not triggered:
+                return None
+            if order_type == "SL-M":
+                return round(touch + slip, 2)
+            order_type = "LIMIT"
+        if order_type == "MARKET":
+            return round(touch + slip, 2)
+        if (sell and touch >= order["price"]) or (not sell and touch <= order["price"]):
+            return order["price"]
+        return None
+
+    def on_ticks(self, ws, ticks):
+        now = clock.monotonic()
+        updates = []
+        with self.lock:
+            for tick in ticks:
+                token = tick["instrument_token"]
+                self.ltp[token] = tick["last_price"]
+                position = self.positions_by_token.get(token)
+                if position:
+                    position.ltp = tick["last_price"]
+                if self.armed.get(token):
+                    updates.extend(self._trigger(token, tick["last_price"]))
+                working = self.working.get(token)
+                if not working:
+                    continue
+                for order_id, (eligible_at, order) in list(working.items()):
+                    if now < eligible_at:
+                        continue
+                    price = self._fill_price(order, tick)
+                    if price is None:
+                        continue
+                    del working[order_id]
+                    symbol = order["tradingsymbol"]
+                    position = self.positions_.get(symbol)
+                    if position is None:
+                        position = self.positions_[symbol] = Position(symbol, token, order["exchange"])
+                        self.positions_by_token[token] = position
+                    quantity = order["pending_quantity"]
+                    position.apply_fill(quantity if order["transaction_type"] == "BUY" else -quantity, price)
+                    position.ltp = tick["last_price"]
+                    updates.append(self._update(order, status="COMPLETE", filled_quantity=order["quantity"],
+                                                pending_quantity=0, average_price=price))
+                    log.info(f"📄 Paper {order['transaction_type']} {symbol} x{quantity} filled at {price} ({order_id})")
+        self._dispatch(updates)
@@ -0,0 +1,165 @@
+import logging
+import threading
+
+log = logging.getLogger(__name__)
+
+
+class Position:
+    def __init__(self, symbol, token, exchange=None):
+        self.symbol = symbol
+        self.token = token
+        self.exchange = exchange
+        self.quantity = 0  # Signed: negative for a short
+        self.average_price = 0.0
+        self.realised = 0.0
+        self.ltp = None
+
+    def apply_fill(self, quantity, price):
+        """Apply a signed fill, booking realised P&L on the part that reduces the position."""
+        if self.quantity == 0 or (self.quantity > 0) == (quantity > 0):
+            total = abs(self.quantity) + abs(quantity)
+            self.average_price = (self.average_price * abs(self.quantity) + price * abs(quantity)) / total
+            self.quantity += quantity
+        else:
+            closing = min(abs(quantity), abs(self.quantity))
+            self.realised += closing * (price - self.average_price) * (1 if self.quantity > 0 else -1)
+            self.quantity += quantity
+            if self.quantity == 0:
+                self.average_price = 0.0
+            elif abs(quantity) > closing:
+                self.average_price = price  # Flipped through flat: the remainder opened at this price
+        if self.ltp is None:
+            self.ltp = price
+
+    def unrealised(self):
+        return self.quantity * (self.ltp - self.average_price) if self.quantity and self.ltp is not None else 0.0
+
+    def exposure(self):
+        return self.quantity * self.ltp if self.ltp is not None else 0.0
+
+
+class PnLEngine:
+    """Positions, realised/unrealised P&L, exposure and drawdown kept in process.
+
+    Fills come from the order-update stream and marks from ticks; every update
+    adjusts the running totals by the one position that changed, so reading the
+    numbers costs nothing and needs no positions() call. Once the day's P&L
+    reaches -daily_loss_limit the engine halts new entries for the rest of the day.
+    """
+
+    def __init__(self, daily_loss_limit=None):
+        self.daily_loss_limit = daily_loss_limit
+        self.positions = {}  # symbol -> Position
+        self.by_token = {}  # instrument token -> Position
+        self.filled = {}  # order_id -> (filled quantity, average price) already applied
+        self.realised = 0.0
+        self.unrealised = 0.0
+        self.gross_exposure = 0.0
+        self.net_exposure = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.halted = False
+        self.watchers = []  # Objects with remove(position)/add(position), told about every position change
+        self.lock = threading.Lock()
+
+    def attach(self, kws):
+        """Hook into a ticker's on_order_update, keeping any callback already set."""
+        previous = kws.on_order_update
+
+        def on_order_update(ws, data):
+            self.on_order_update(data)
+            if previous:
+                previous(ws, data)
+
+        kws.on_order_update = on_order_update
+
+    def seed(self, positions):
+        """Start from kite.positions()["net"] so a restart mid-session keeps the day's numbers."""
+        with self.lock:
+            for row in positions:
+                position = self._position(row["tradingsymbol"], row["instrument_token"], row.get("exchange"))
+                self._remove(position)
+                position.quantity = row["quantity"]
+                position.average_price = row["average_price"] if row["quantity"] else 0.0
+                position.realised = row.get("realised", 0.0)
+                position.ltp = row.get("last_price") or None
+                self._add(position)
+            self._mark()
+
+    def _position(self, symbol, token, exchange=None):
+        position = self.positions.get(symbol)
+        if position is None:
+            position = self.positions[symbol] = Position(symbol, token, exchange)
+            self.by_token[token] = position
+        return position
+
+    def _remove(self, position):
+        self.realised -= position.realised
+        self.unrealised -= position.unrealised()
+        self.gross_exposure -= abs(position.exposure())
+        self.net_exposure -= position.exposure()
+        for watcher in self.watchers:
+            watcher.remove(position)
+
+    def _add(self, position):
+        self.realised += position.realised
+        self.unrealised += position.unrealised()
+        self.gross_exposure += abs(position.exposure())
+        self.net_exposure += position.exposure()
+        for watcher in self.watchers:
+            watcher.add(position)
+
+    def _mark(self):
+        equity = self.realised + self.unrealised
+        self.peak = max(self.peak, equity)
+        self.max_drawdown = max(self.max_drawdown, self.peak - equity)
+        if self.daily_loss_limit and not self.halted and equity <= -self.daily_loss_limit:
+            self.halted = True
+            log.error(f"🚨 Daily loss limit hit: P&L {equity:.2f} <= -{self.daily_loss_limit}; new entries halted")
+
+    def on_order_update(self, order):
+        """Apply the part of an order's cumulative fill not seen yet."""
+        filled = order.get("filled_quantity") or 0
+        average = order.get("average_price") or order.get("price") or 0.0
+        with self.lock:
+            seen, seen_average = self.filled.get(order["order_id"], (0, 0.0))
+            if filled <= seen:
+                return
+            quantity = filled - seen
+            price = (average * filled - seen_average * seen) / quantity
+            signed = quantity if order["transaction_type"] == "BUY" else -quantity
+            self.filled[order["order_id"]] = (filled, average)
+            position = self._position(order["tradingsymbol"], order["instrument_token"], order.get("exchange"))
+            self._remove(position)
+            position.apply_fill(signed, price)
+            self._add(position)
+            self._mark()
+
+    def on_ticks(self, ws, ticks):
+        with self.lock:
+            for tick in ticks:
+                position = self.by_token.get(tick["instrument_token"])
+                if position is None:
+                    continue
+                self._remove(position)
+                position.ltp = tick["last_price"]
+                self._add(position)
+                self._mark()
+
+    def allows_entry(self):
+        return not self.halted
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "realised": self.realised,
+                "unrealised": self.unrealised,
+                "total": self.realised + self.unrealised,
+                "gross_exposure": self.gross_exposure,
+                "net_exposure": self.net_exposure,
+                "max_drawdown": self.max_drawdown,
+                "halted": self.halted,
+                "positions": {symbol: {"quantity": p.quantity, "average_price": p.average_price, "ltp": p.ltp,
+                                       "realised": p.realised, "unrealised": p.unrealised()}
+                              for symbol, p in self.positions.items()},
+            }
@@ -0,0 +1,176 @@
+import logging
+import re
+import threading
+import clock
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_UP
+
+log = logging.getLogger(__name__)
+
+MARGIN_TTL = 30  # Seconds before cached available/required margins are refreshed
+DEFAULT_CONFIG = {"sl_buffer": 2, "target_buffer": 2, "quantity": 1}
+
+# Broker error messages that will keep failing until funds or config change
+INSUFFICIENT_FUNDS_RE = re.compile(r"Insufficient funds", re.IGNORECASE)
+LOT_SIZE_RE = re.compile(r"should be multiple of (\d+)", re.IGNORECASE)
+
+ROUNDING = {"nearest": ROUND_HALF_UP, "up": ROUND_CEILING, "down": ROUND_FLOOR}
+
+
+def margin_segment(exchange):
+    """Return the margins() segment an exchange draws funds from."""
+    return "commodity" if exchange in ("MCX", "NCO") else "equity"
+
+
+class PreTradeValidator:
+    """Reject orders that the OMS would reject before they cost an order-API round trip."""
+
+    def __init__(self, kite, trade_config, margin_ttl=MARGIN_TTL):
+        self.kite = kite
+        self.trade_config = trade_config
+        self.margin_ttl = margin_ttl
+        self.instrument_meta = {}  # symbol -> {"lot_size", "tick_size"}
+        self.available_margin = {}  # segment -> available cash
+        self.required_margin = {}  # symbol -> (margin for configured quantity, price it was quoted at)
+        self.rejected = {}  # symbol -> {"reason", "config", "available"}
+        self.margins_fetched_at = 0
+        self.lock = threading.Lock()
+
+    def load_instruments(self, instruments):
+        """Cache lot size and tick size for the given instruments with one dump call per exchange."""
+        wanted = {}
+        for instrument in instruments:
+            wanted.setdefault(instrument["exchange"], set()).add(instrument["symbol"])
+
+        for exchange, symbols in wanted.items():
+            try:
+                for row in self.kite.instruments(exchange):
+                    if row["tradingsymbol"] in symbols:
+                        self.instrument_meta[row["tradingsymbol"]] = {
+                            "lot_size": int(row.get("lot_size") or 1),
+                            "tick_size": float(row.get("tick_size") or 0.05),
+                        }
+            except Exception as e:
+                log.error(f"Error loading instrument master for {exchange}: {e}")
+
+        missing = [s for symbols in wanted.values() for s in symbols if s not in self.instrument_meta]
+        if missing:
+            log.warning(f"No instrument metadata for {missing}; lot/tick checks skipped for them")
+
+    def config_for(self, symbol):
+        return self.trade_config.get(symbol, DEFAULT_CONFIG)
+
+    def lot_size(self, symbol):
+        return self.instrument_meta.get(symbol, {}).get("lot_size", 1)
+
+    def tick_size(self, symbol):
+        return self.instrument_meta.get(symbol, {}).get("tick_size", 0.05)
+
+    def round_to_tick(self, symbol, price, mode="nearest"):
+        """Round a price onto the instrument's tick grid ("nearest", "up" or "down")."""
+        tick = self.tick_size(symbol)
+        ticks = (Decimal(str(price)) / Decimal(str(tick))).quantize(Decimal("1"), rounding=ROUNDING[mode])
+        return float(ticks * Decimal(str(tick)))
+
+    def refresh_margins(self, instruments, prices, force=False):
+        """Refresh available funds and batch-quote required margin for every configured instrument.
+
+        Costs one margins() call and one order_margins() call for the whole watchlist,
+        at most once every margin_ttl seconds.
+        """
+        now = clock.time()
+        if not force and now - self.margins_fetched_at < self.margin_ttl:
+            return
+
+        try:
+            margins = self.kite.margins()
+            available = {segment: float(margins[segment]["net"]) for segment in ("equity", "commodity") if segment in margins}
+        except Exception as e:
+            log.error(f"Error fetching available margins: {e}")
+            return
+
+        orders = []
+        for instrument in instruments:
+            price = prices.get(instrument["token"], {}).get("ltp")
+            if not price:
+                continue
+            orders.append({
+                "exchange": instrument["exchange"],
+                "tradingsymbol": instrument["symbol"],
+                "transaction_type": "SELL",
+                "variety": "regular",
+                "product": "MIS",
+                "order_type": "LIMIT",
+                "quantity": self.config_for(instrument["symbol"])["quantity"],
+                "price": price,
+            })
+
+        required = {}
+        if orders:
+            try:
+                for order, quote in zip(orders, self.kite.order_margins(orders)):
+                    required[order["tradingsymbol"]] = (float(quote["total"]), order["price"])
+            except Exception as e:
+                log.error(f"Error fetching order margins: {e}")
+
+        with self.lock:
+            self.available_margin = available
+            self.required_margin.update(required)
+            self.margins_fetched_at = now
+            self._expire_rejections()
+
+    def _expire_rejections(self):
+        """Drop negative-cache entries whose config or available funds have changed."""
+        for symbol, entry in list(self.rejected.items()):
+            if entry["config"] != self.config_for(symbol):
+                del self.rejected[symbol]
+            elif entry["available"] is not None and self.available_margin.get(entry["segment"], 0) > entry["available"]:
+                del self.rejected[symbol]
+
+    def reject(self, symbol, exchange, reason, funds_related=False):
+        """Put a symbol in the negative cache until its config (or, for margin, the funds) change."""
+        segment = margin_segment(exchange)
+        with self.lock:
+            self.rejected[symbol] = {
+                "reason": reason,
+                "config": dict(self.config_for(symbol)),
+                "segment": segment,
+                "available": self.available_margin.get(segment, 0) if funds_related else None,
+            }
+        log.warning(f"Blocking orders for {symbol} until funds or config change: {reason}")
+
+    def record_rejection(self, instrument, error):
+        """Negative-cache a symbol if the OMS rejected it for a non-transient reason."""
+        message = str(error)
+        if INSUFFICIENT_FUNDS_RE.search(message):
+            self.reject(instrument["symbol"], instrument["exchange"], message, funds_related=True)
+        elif LOT_SIZE_RE.search(message):
+            lot_size = int(LOT_SIZE_RE.search(message).group(1))
+            self.instrument_meta.setdefault(instrument["symbol"], {"tick_size": 0.05})["lot_size"] = lot_size
+            self.reject(instrument["symbol"], instrument["exchange"], message)
+
+    def validate(self, instrument, quantity, price):
+        """Return (ok, reason) for a SELL entry; failures that will not fix themselves are negative-cached."""
+        symbol = instrument["symbol"]
+        with self.lock:
+            self._expire_rejections()
+            if symbol in self.rejected:
+                return False, self.rejected[symbol]["reason"]
+
+        lot_size = self.instrument_meta.get(symbol, {}).get("lot_size", 1)
+        if quantity <= 0 or quantity % lot_size:
+            reason = f"quantity {quantity} is not a multiple of lot size {lot_size}"
+            self.reject(symbol, instrument["exchange"], reason)
+            return False, reason
+
+        quote = self.required_margin.get(symbol)
+        segment = margin_segment(instrument["exchange"])
+        if quote and segment in self.available_margin:
+            # Scale the batched quote to the current price and quantity instead of asking again
+            required = quote[0] * (price / quote[1]) * (quantity / self.config_for(symbol)["quantity"])
+            available = self.available_margin[segment]
+            if required > available:
+                reason = f"required margin {required:.2f} exceeds available margin {available:.2f}"
+                self.reject(symbol, instrument["exchange"], reason, funds_related=True)
+                return False, reason
+
+        return True, None
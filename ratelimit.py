@@ -0,0 +1,54 @@
+import threading
+import clock
+
+# Kite Connect API limits (requests per second)
+ORDER_RATE = 10
+HISTORICAL_RATE = 3
+QUOTE_RATE = 1
+DEFAULT_RATE = 10
+
+
+class RateLimiter:
+    """Thread-safe token bucket: `rate` calls per second with bursts of up to `burst`."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else rate)
+        self.tokens = self.burst
+        self.updated = clock.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens=1):
+        """Take tokens if available right now, without waiting."""
+        with self.lock:
+            self._refill(clock.monotonic())
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def delay(self, tokens=1):
+        """Seconds until `tokens` would be available, without taking them."""
+        with self.lock:
+            self._refill(clock.monotonic())
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def acquire(self, tokens=1, timeout=None):
+        """Block until tokens are available; returns False if `timeout` seconds pass first."""
+        deadline = None if timeout is None else clock.monotonic() + timeout
+        while True:
+            with self.lock:
+                now = clock.monotonic()
+                self._refill(now)
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate
+            if deadline is not None:
+                if now + wait > deadline:
+                    return False
+            clock.sleep(wait)
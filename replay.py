@@ -0,0 +1,401 @@
+"""Replay recorded candles or ticks through an unmodified live script in virtual time.
+
+The script runs exactly as it does live (its own main loop, threads, order
+waits and timers) with --paper, against a ReplayKite serving candles from a
+ColumnStore and a ReplayTicker fed by the driver, on a clock.SimClock. Time
+only moves when the engine is idle, so a trading day takes as long as the
+engine's own work in it rather than six hours.
+
+    python replay.py live_testing_closing_orders.py --date 2024-06-14
+    python replay.py check-50MA-onlyonce.py --date 2024-06-14 --ticks ticks-2024-06-14.jsonl
+
+Ticks come from the store's minute bars (open, high/low, low/high, close per
+bar) unless a file written by TickRecorder is given. The script's logs go to
+a scratch directory, reported at the end.
+"""
+import argparse
+import json
+import logging
+import os
+import runpy
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+import numpy as np
+import clock
+from candles import SESSION_OPEN, DEFAULT_SESSION_OPEN, interval_minutes
+from store import ColumnStore
+
+log = logging.getLogger(__name__)
+
+IST = timezone(timedelta(hours=5, minutes=30))
+IST_OFFSET = 19800  # Seconds east of UTC; bars are bucketed by IST minute of day
+BAR_TICK_OFFSETS = (0, 15, 30, 59)  # Seconds into a minute bar of its open, first extreme, second extreme and close ticks
+LEAD_SECONDS = 60  # Virtual seconds between the script starting and the first tick
+TAIL_SECONDS = 60  # Virtual seconds the script runs on after the last tick
+DEPTH_LEVELS = 5
+TICK_SIZE = 0.05
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.strptime(value[:19], "%Y-%m-%d %H:%M:%S" if len(value) > 10 else "%Y-%m-%d")
+
+
+def resample(columns, minutes, session_open):
+    """Minute bar columns -> `minutes` bars aligned to the session open, as numpy columns."""
+    dates = columns["date"]
+    if minutes == 1 or not len(dates):
+        return columns
+    local = dates + IST_OFFSET
+    day, minute = local // 86400, local % 86400 // 60
+    bucket = day * 1440 + session_open + (minute - session_open) // minutes * minutes
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(dates)] - 1
+    return {
+        "date": bucket[starts] * 60 - IST_OFFSET, "open": columns["open"][starts],
+        "high": np.maximum.reduceat(columns["high"], starts), "low": np.minimum.reduceat(columns["low"], starts),
+        "close": columns["close"][ends], "volume": np.add.reduceat(columns["volume"], starts),
+    }
+
+
+class ReplayKite:
+    """Market-data side of KiteApp served from a ColumnStore, cut off at the current virtual time.
+
+    historical_data() returns the bars that had started by clock.now(), built
+    from minute bars that had closed, so the newest bar is still forming just
+    like the real API's. Orders and positions are left to the PaperBroker the
+    script wraps this in.
+    """
+
+    def __init__(self, store, instruments, interval="minute"):
+        self.store = store
+        self.interval = interval
+        self.instruments_ = instruments
+        self.exchanges = {instrument["token"]: instrument.get("exchange") or "NSE" for instrument in instruments}
+        self.columns = {}  # token -> minute columns, loaded on first use
+        self.ticker = ReplayTicker()
+        self.order_tag = None
+        self.user_id = "REPLAY"  # No account of its own; the script's dashboard goes to the default port
+
+    def minute_bars(self, token):
+        if token not in self.columns:
+            self.columns[token] = self.store.load(self.interval, token)
+        return self.columns[token]
+
+    def historical_data(self, instrument_token, from_date, to_date, interval, continuous=False, oi=False):
+        columns = self.minute_bars(instrument_token)
+        start = parse_date(from_date).replace(tzinfo=IST).timestamp()
+        end = min(parse_date(to_date).replace(tzinfo=IST).timestamp(), clock.time())
+        dates = columns["date"]
+        lo = np.searchsorted(dates, start)
+        hi = np.searchsorted(dates, end - 60, side="right")  # Minute bars that had closed by `end`
+        window = {name: np.asarray(values[lo:hi]) for name, values in columns.items()}
+        minutes = interval_minutes(interval)
+        if minutes is None:
+            window = resample(window, 1440, 0)  # Days, at IST midnight
+        else:
+            window = resample(window, minutes, SESSION_OPEN.get(self.exchanges.get(instrument_token),
+                                                               DEFAULT_SESSION_OPEN))
+        return [{"date": datetime.fromtimestamp(int(date), IST), "open": float(o), "high": float(h),
+                 "low": float(l), "close": float(c), "volume": int(v)}
+                for date, o, h, l, c, v in zip(window["date"], window["open"], window["high"], window["low"],
+                                               window["close"], window["volume"])]
+
+    def instruments(self, exchange=None):
+        return [{"instrument_token": instrument["token"], "tradingsymbol": instrument["symbol"],
+                 "exchange": instrument.get("exchange") or "NSE", "lot_size": 1, "tick_size": TICK_SIZE,
+                 "instrument_type": "EQ", "segment": instrument.get("exchange") or "NSE"}
+                for instrument in self.instruments_ if exchange in (None, instrument.get("exchange") or "NSE")]
+
+    def kws(self):
+        return self.ticker
+
+    def orders(self):
+        return []
+
+    def positions(self):
+        return {"net": [], "day": []}
+
+    def __getattr__(self, name):
+        raise AttributeError(f"{name}() is not available in a replay")
+
+
+class ReplayTicker:
+    """KiteTicker stand-in: the same callbacks and subscription calls, fed by Replay instead of a websocket."""
+
+    MODE_FULL, MODE_QUOTE, MODE_LTP = "full", "quote", "ltp"
+
+    def __init__(self):
+        self.on_ticks = self.on_connect = self.on_close = self.on_error = None
+        self.on_order_update = self.on_reconnect = self.on_noreconnect = self.on_message = None
+        self.subscribed_tokens = {}  # token -> mode
+        self.connected = threading.Event()
+        self.stopped = False
+
+    def connect(self, threaded=False, disable_ssl_verification=False, proxy=None):
+        if self.on_connect:
+            self.on_connect(self, {})
+        self.connected.set()
+
+    def is_connected(self):
+        return self.connected.is_set() and not self.stopped
+
+    def subscribe(self, instrument_tokens):
+        for token in instrument_tokens:
+            self.subscribed_tokens.setdefault(token, self.MODE_QUOTE)
+        return True
+
+    def unsubscribe(self, instrument_tokens):
+        for token in instrument_tokens:
+            self.subscribed_tokens.pop(token, None)
+        return True
+
+    def set_mode(self, mode, instrument_tokens):
+        for token in instrument_tokens:
+            self.subscribed_tokens[token] = mode
+        return True
+
+    def resubscribe(self):
+        pass
+
+    def stop(self):
+        self.stopped = True
+
+    def close(self, code=None, reason=None):
+        self.stopped = True
+        if self.on_close:
+            self.on_close(self, code or 1000, reason or "replay closed")
+
+    stop_retry = stop
+
+
+class TickRecorder:
+    """Append every on_ticks batch to a JSONL file that replay.py --ticks can play back."""
+
+    def __init__(self, path):
+        self.file = open(path, "a")
+        self.lock = threading.Lock()
+
+    def attach(self, kws):
+        previous = kws.on_ticks
+
+        def on_ticks(ws, ticks):
+            line = json.dumps({"time": time.time(), "ticks": ticks}, default=lambda value: value.isoformat())
+            with self.lock:
+                self.file.write(line + "\n")
+            if previous:
+                previous(ws, ticks)
+
+        kws.on_ticks = on_ticks
+
+
+def shape(tick, mode):
+    """Cut a full tick down to what KiteTicker sends in `mode`."""
+    if mode == "full":
+        return tick
+    if mode == "ltp":
+        return {"tradable": True, "mode": mode, "instrument_token": tick["instrument_token"],
+                "last_price": tick["last_price"]}
+    quote = {key: value for key, value in tick.items()
+             if key not in ("depth", "exchange_timestamp", "last_trade_time", "oi", "oi_day_high", "oi_day_low")}
+    quote["mode"] = mode
+    return quote
+
+
+def bar_ticks(store, instruments, start, end, interval="minute"):
+    """(epoch seconds, [full ticks]) batches synthesised from minute bars in [start, end), in time order."""
+    times, tokens, prices, volumes = [], [], [], []
+    previous_close = {}
+    for instrument in instruments:
+        token = instrument["token"]
+        columns = store.load(interval, token)
+        dates = columns["date"]
+        lo, hi = np.searchsorted(dates, start), np.searchsorted(dates, end)
+        if lo:
+            previous_close[token] = float(columns["close"][lo - 1])
+        if lo == hi:
+            continue
+        o, h, l, c = (np.asarray(columns[name][lo:hi]) for name in ("open", "high", "low", "close"))
+        up = c >= o  # A rising bar is taken to dip first, a falling one to rally first
+        path = np.stack([o, np.where(up, l, h), np.where(up, h, l), c], axis=1)
+        bar_volume = np.asarray(columns["volume"][lo:hi])
+        cumulative = np.cumsum(bar_volume)
+        volume = np.stack([cumulative - bar_volume, cumulative - bar_volume * 2 // 3,
+                           cumulative - bar_volume // 3, cumulative], axis=1)
+        times.append((dates[lo:hi, None] + np.array(BAR_TICK_OFFSETS)).ravel())
+        tokens.append(np.full(path.size, token))
+        prices.append(path.ravel())
+        volumes.append(volume.ravel())
+    if not times:
+        return []
+    times, tokens, prices, volumes = (np.concatenate(values) for values in (times, tokens, prices, volumes))
+    order = np.argsort(times, kind="stable")
+    day = {}  # token -> [open, high, low]
+    batches = []
+    for when, token, price, volume in zip(times[order].tolist(), tokens[order].tolist(), prices[order].tolist(),
+                                          volumes[order].tolist()):
+        ohlc = day.get(token)
+        if ohlc is None:
+            ohlc = day[token] = [price, price, price]
+        ohlc[1], ohlc[2] = max(ohlc[1], price), min(ohlc[2], price)
+        close = previous_close.get(token, ohlc[0])
+        stamp = datetime.fromtimestamp(when)
+        tick = {
+            "tradable": True, "mode": "full", "instrument_token": token, "last_price": price,
+            "last_traded_quantity": 0, "average_traded_price": price, "volume_traded": volume,
+            "total_buy_quantity": 0, "total_sell_quantity": 0,
+            "ohlc": {"open": ohlc[0], "high": ohlc[1], "low": ohlc[2], "close": close},
+            "change": (price - close) * 100 / close if close else 0, "last_trade_time": stamp,
+            "oi": 0, "oi_day_high": 0, "oi_day_low": 0, "exchange_timestamp": stamp,
+            "depth": {
+                "buy": [{"quantity": 0, "price": round(price - TICK_SIZE * (k + 1), 2), "orders": 0}
+                        for k in range(DEPTH_LEVELS)],
+                "sell": [{"quantity": 0, "price": round(price + TICK_SIZE * (k + 1), 2), "orders": 0}
+                         for k in range(DEPTH_LEVELS)],
+            },
+        }
+        if batches and batches[-1][0] == when:
+            batches[-1][1].append(tick)
+        else:
+            batches.append((when, [tick]))
+    return batches
+
+
+def recorded_ticks(path, start=None, end=None):
+    """(epoch seconds, ticks) batches from a TickRecorder file, optionally limited to [start, end)."""
+    batches = []
+    with open(path) as f:
+        for line in f:
+            entry = json.loads(line)
+            if (start is not None and entry["time"] < start) or (end is not None and entry["time"] >= end):
+                continue
+            for tick in entry["ticks"]:
+                for key in ("exchange_timestamp", "last_trade_time"):
+                    if tick.get(key):
+                        tick[key] = datetime.fromisoformat(tick[key])
+            batches.append((entry["time"], entry["ticks"]))
+    return batches
+
+
+class Replay:
+    """Run `script` on a SimClock, delivering `batches` to its ticker at their virtual times."""
+
+    def __init__(self, script, kite, batches, args=(), lead=LEAD_SECONDS, tail=TAIL_SECONDS):
+        self.script = os.path.abspath(script)
+        self.kite = kite
+        self.batches = batches
+        self.args = list(args)
+        self.lead = lead
+        self.tail = tail
+        self.ticks = 0
+        self.error = None
+
+    def deliver(self, ticks):
+        kws = self.kite.ticker
+        if kws.stopped or not kws.on_ticks:
+            return
+        modes = kws.subscribed_tokens
+        wanted = [shape(tick, modes[tick["instrument_token"]]) for tick in ticks if tick["instrument_token"] in modes]
+        if wanted:
+            kws.on_ticks(kws, wanted)
+            self.ticks += len(wanted)
+
+    def drive(self, sim, main):
+        try:
+            kws = self.kite.ticker
+            while not kws.connected.is_set():  # Startup: let the script's own sleeps and waits run
+                sim.settle()
+                deadline = sim.next_deadline()
+                if deadline is not None:
+                    sim.advance_to(deadline)
+                else:
+                    kws.connected.wait(0.01)
+            sim.settle()
+            for when, ticks in self.batches:
+                sim.advance_to(when)
+                self.deliver(ticks)
+                sim.settle()
+            sim.advance_to(self.batches[-1][0] + self.tail)
+        except Exception as e:
+            self.error = e
+            log.exception("Replay driver failed")
+        finally:
+            sim.finish(interrupt=main)
+
+    def run(self, workdir=None):
+        """Run the script to the end of the batches; returns a summary dict."""
+        if not self.batches:
+            raise ValueError("Nothing to replay")
+        import kiteapp
+        workdir = workdir or tempfile.mkdtemp(prefix="replay-")
+        os.makedirs(workdir, exist_ok=True)
+        with open(os.path.join(workdir, "enctoken.txt"), "w") as f:
+            f.write("replay")
+        start = self.batches[0][0] - self.lead
+        sim = clock.SimClock(start)
+        kiteapp.KiteApp = lambda api_key, userid, enctoken: self.kite
+        sys.argv = [self.script, "--paper"] + self.args
+        sys.path.insert(0, os.path.dirname(self.script))
+        os.chdir(workdir)
+        clock.use(sim)
+        factory = logging.getLogRecordFactory()
+
+        def record(*args, **kwargs):
+            entry = factory(*args, **kwargs)
+            entry.created = sim.t  # Stamp log lines in virtual time (read directly, so logging isn't clock activity)
+            entry.msecs = entry.created % 1 * 1000
+            return entry
+
+        logging.setLogRecordFactory(record)
+        driver = threading.Thread(target=self.drive, args=(sim, threading.current_thread()), name="replay-driver",
+                                  daemon=True)
+        started = time.monotonic()
+        driver.start()
+        try:
+            runpy.run_path(self.script, run_name="__main__")
+        except (KeyboardInterrupt, SystemExit):
+            pass
+        finally:
+            driver.join()
+            clock.use(clock.RealClock())
+            logging.setLogRecordFactory(factory)
+        wall = time.monotonic() - started
+        span = self.batches[-1][0] + self.tail - start
+        return {"script": os.path.basename(self.script), "workdir": workdir, "ticks": self.ticks,
+                "virtual": span, "wall": wall, "speedup": span / wall if wall else 0.0, "error": self.error}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a trading day through a live script in virtual time.")
+    parser.add_argument("script")
+    parser.add_argument("--date", required=True, help="YYYY-MM-DD")
+    parser.add_argument("--from", dest="from_time", default="09:15", help="HH:MM")
+    parser.add_argument("--to", dest="to_time", default="15:30", help="HH:MM")
+    parser.add_argument("--store", default="candles")
+    parser.add_argument("--ticks", help="TickRecorder JSONL to play instead of ticks built from minute bars")
+    parser.add_argument("--workdir", help="Where the script runs and writes its logs (default: a new temp dir)")
+    args, script_args = parser.parse_known_args()
+
+    # Bars, ticks and the script's datetime.now() all agree on exchange time
+    os.environ["TZ"] = "Asia/Kolkata"
+    time.tzset()
+
+    store = ColumnStore(os.path.abspath(args.store))
+    metas = [store.meta("minute", token) for token in store.tokens("minute")]
+    instruments = [{"token": meta["token"], "symbol": meta["symbol"], "exchange": meta.get("exchange")}
+                   for meta in metas]
+    start = datetime.strptime(f"{args.date} {args.from_time}", "%Y-%m-%d %H:%M").timestamp()
+    end = datetime.strptime(f"{args.date} {args.to_time}", "%Y-%m-%d %H:%M").timestamp()
+    if args.ticks:
+        batches = recorded_ticks(args.ticks, start, end)
+    else:
+        batches = bar_ticks(store, instruments, start, end)
+
+    summary = Replay(args.script, ReplayKite(store, instruments), batches, script_args).run(args.workdir)
+    logging.info(f"⏩ Replayed {summary['virtual'] / 3600:.2f}h of {summary['script']} ({summary['ticks']} ticks) "
+                 f"in {summary['wall']:.1f}s, {summary['speedup']:.0f}x; logs in {summary['workdir']}")
+    sys.exit(1 if summary["error"] else 0)
@@ -0,0 +1,105 @@
+import logging
+import re
+import threading
+
+log = logging.getLogger(__name__)
+
+OPEN_STATUSES = ("OPEN", "TRIGGER PENDING", "PARTIALLY EXECUTED", "PENDING", "AMO REQ RECEIVED",
+                 "VALIDATION PENDING", "OPEN PENDING", "MODIFY PENDING", "MODIFIED", "PUT ORDER REQ RECEIVED")
+TERMINAL_STATUSES = ("COMPLETE", "CANCELLED", "REJECTED")
+
+# NAME + YY + (monthly MMM | weekly M + DD) + FUT or strike + CE/PE, e.g. INFY25MARFUT, NIFTY2530622000CE
+DERIVATIVE_RE = re.compile(r"^(.+?)\d{2}(?:[A-Z]{3}|[1-9OND]\d{2})(?:FUT|\d+(?:\.\d+)?(?:CE|PE))$")
+
+
+def underlying(symbol):
+    """Cash symbol a derivative is written on (the symbol itself for cash instruments)."""
+    match = DERIVATIVE_RE.match(symbol)
+    return match.group(1) if match else symbol
+
+
+class RiskEngine:
+    """Portfolio limits checked in O(1) before each entry.
+
+    Gross and net notional come from the PnLEngine's running totals; per-underlying
+    and per-sector net notional are kept here, adjusted by the PnLEngine on every
+    fill and tick, and open orders are counted from the order-update stream.
+    A check is a handful of dict lookups and never calls the API.
+    """
+
+    def __init__(self, pnl, limits, sectors=None):
+        self.pnl = pnl
+        self.limits = limits
+        self.sectors = sectors or {}  # underlying -> sector
+        self.by_underlying = {}  # underlying -> net notional
+        self.by_sector = {}  # sector -> net notional
+        self.open_orders = set()
+        self.lock = threading.Lock()
+        pnl.watchers.append(self)
+
+    def attach(self, kws):
+        """Hook into a ticker's on_order_update, keeping any callback already set."""
+        previous = kws.on_order_update
+
+        def on_order_update(ws, data):
+            self.on_order_update(data)
+            if previous:
+                previous(ws, data)
+
+        kws.on_order_update = on_order_update
+
+    def seed_orders(self, orders):
+        """Start the open order count from kite.orders()."""
+        with self.lock:
+            self.open_orders = {order["order_id"] for order in orders if order["status"] in OPEN_STATUSES}
+
+    def on_order_update(self, order):
+        with self.lock:
+            if order["status"] in OPEN_STATUSES:
+                self.open_orders.add(order["order_id"])
+            elif order["status"] in TERMINAL_STATUSES:
+                self.open_orders.discard(order["order_id"])
+
+    def _adjust(self, position, sign):
+        name = underlying(position.symbol)
+        exposure = sign * position.exposure()
+        self.by_underlying[name] = self.by_underlying.get(name, 0.0) + exposure
+        sector = self.sectors.get(name)
+        if sector:
+            self.by_sector[sector] = self.by_sector.get(sector, 0.0) + exposure
+
+    # Called by the PnLEngine (under its lock) around every position change
+    def remove(self, position):
+        self._adjust(position, -1)
+
+    def add(self, position):
+        self._adjust(position, 1)
+
+    def check(self, instrument, quantity, price, transaction_type="SELL"):
+        """Return (ok, reason) for an order of `quantity` at `price` against every configured limit."""
+        notional = quantity * price * (1 if transaction_type == "BUY" else -1)
+        name = underlying(instrument["symbol"])
+        sector = self.sectors.get(name)
+        limits = self.limits
+
+        checks = (
+            ("max_open_orders", len(self.open_orders) + 1, "open orders"),
+            ("max_gross_notional", self.pnl.gross_exposure + abs(notional), "gross notional"),
+            ("max_net_notional", abs(self.pnl.net_exposure + notional), "net notional"),
+            ("max_underlying_notional", abs(self.by_underlying.get(name, 0.0) + notional), f"{name} notional"),
+            ("max_sector_notional", abs(self.by_sector.get(sector, 0.0) + notional) if sector else 0, f"{sector} notional"),
+        )
+        for key, value, label in checks:
+            limit = limits.get(key)
+            if limit is not None and value > limit:
+                return False, f"{label} {value:.2f} would exceed {key} {limit}"
+        return True, None
+
+    def snapshot(self):
+        return {
+            "open_orders": len(self.open_orders),
+            "gross_notional": self.pnl.gross_exposure,
+            "net_notional": self.pnl.net_exposure,
+            "by_underlying": dict(self.by_underlying),
+            "by_sector": dict(self.by_sector),
+        }
@@ -0,0 +1,322 @@
+import re
+import logging
+from functools import lru_cache
+import numpy as np
+
+log = logging.getLogger(__name__)
+
+# Named indicators are macros over the primitive functions, so "20MA" inside the
+# Bollinger Band and inside an MA rule is the same node and is evaluated once.
+# Definitions mirror indicators.INDICATORS.
+MACROS = {
+    "20MA": "sma(close, 20)",
+    "50MA": "sma(close, 50)",
+    "std_dev": "std(close, 20)",
+    "Upper_BB": "20MA + std_dev * 2",
+    "Lower_BB": "20MA - 2 * std_dev",
+    "RSI": "rsi(close, 14)",
+    "12EMA": "ema(close, 12)",
+    "26EMA": "ema(close, 26)",
+    "MACD": "12EMA - 26EMA",
+    "Signal_Line": "ema(MACD, 9)",
+}
+COLUMNS = ("open", "high", "low", "close", "volume")
+PANEL_CANDLES = 250  # Recent candles per instrument; enough for the 50MA and for the EMAs to converge
+
+TOKEN_RE = re.compile(r"\s*(?:(\d+\.\d*|\.\d+|\d+(?![A-Za-z_0-9]))|([A-Za-z_0-9]+)|(<=|>=|==|!=|[<>+\-*/(),]))")
+COMPARISONS = ("<", "<=", ">", ">=", "==", "!=")
+
+
+class RuleError(ValueError):
+    pass
+
+
+def tokenize(text):
+    tokens, pos = [], 0
+    text = text.strip()
+    while pos < len(text):
+        match = TOKEN_RE.match(text, pos)
+        if not match:
+            raise RuleError(f"Unexpected character at {pos} in rule: {text!r}")
+        number, name, op = match.groups()
+        tokens.append(("num", float(number)) if number else ("name", name) if name else ("op", op))
+        pos = match.end()
+    return tokens
+
+
+class Parser:
+    """Recursive-descent parser producing nested tuples; equal subexpressions are equal tuples."""
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self, kind=None, value=None):
+        token = self.peek()
+        if (kind and token[0] != kind) or (value and token[1] != value):
+            raise RuleError(f"Expected {value or kind} but found {token[1]!r} in rule: {self.text!r}")
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.or_expr()
+        if self.pos != len(self.tokens):
+            raise RuleError(f"Unexpected {self.peek()[1]!r} in rule: {self.text!r}")
+        return node
+
+    def or_expr(self):
+        node = self.and_expr()
+        while self.peek() == ("name", "or"):
+            self.take()
+            node = ("or", node, self.and_expr())
+        return node
+
+    def and_expr(self):
+        node = self.not_expr()
+        while self.peek() == ("name", "and"):
+            self.take()
+            node = ("and", node, self.not_expr())
+        return node
+
+    def not_expr(self):
+        if self.peek() == ("name", "not"):
+            self.take()
+            return ("not", self.not_expr())
+        return self.comparison()
+
+    def comparison(self):
+        node = self.additive()
+        if self.peek()[0] == "op" and self.peek()[1] in COMPARISONS:
+            op = self.take()[1]
+            node = ("cmp", op, node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.term()
+        while self.peek()[0] == "op" and self.peek()[1] in ("+", "-"):
+            op = self.take()[1]
+            node = ("arith", op, node, self.term())
+        return node
+
+    def term(self):
+        node = self.unary()
+        while self.peek()[0] == "op" and self.peek()[1] in ("*", "/"):
+            op = self.take()[1]
+            node = ("arith", op, node, self.unary())
+        return node
+
+    def unary(self):
+        if self.peek() == ("op", "-"):
+            self.take()
+            return ("arith", "-", ("num", 0.0), self.unary())
+        return self.atom()
+
+    def atom(self):
+        kind, value = self.peek()
+        if kind == "num":
+            self.take()
+            return ("num", value)
+        if (kind, value) == ("op", "("):
+            self.take()
+            node = self.or_expr()
+            self.take("op", ")")
+            return node
+        if kind == "name":
+            self.take()
+            if self.peek() == ("op", "("):
+                return self.call(value)
+            if value in MACROS:
+                return parse(MACROS[value])
+            if value in COLUMNS:
+                return ("col", value)
+            if value == "ltp":
+                return ("ltp",)
+            raise RuleError(f"Unknown name {value!r} in rule: {self.text!r}")
+        raise RuleError(f"Unexpected end of rule: {self.text!r}")
+
+    def call(self, name):
+        if name not in FUNCTIONS:
+            raise RuleError(f"Unknown function {name!r} in rule: {self.text!r}")
+        self.take("op", "(")
+        args = [self.additive()]
+        while self.peek() == ("op", ","):
+            self.take()
+            args.append(self.additive())
+        self.take("op", ")")
+        # Window lengths must be literal so the node identifies the computation
+        if any(arg[0] != "num" for arg in args[1:]):
+            raise RuleError(f"Window arguments of {name}() must be numbers in rule: {self.text!r}")
+        return ("call", name, args[0]) + tuple(int(arg[1]) for arg in args[1:])
+
+
+@lru_cache(maxsize=None)
+def parse(text):
+    return Parser(text).parse()
+
+
+def rolling_sum(x, window):
+    """Rolling sum along time that is NaN until `window` valid values (like pandas min_periods=window)."""
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    ccount = np.cumsum(valid, axis=1)
+    total = csum.copy()
+    count = ccount.copy()
+    total[:, window:] -= csum[:, :-window]
+    count[:, window:] -= ccount[:, :-window]
+    return np.where(count == window, total, np.nan)
+
+
+def sma(x, window):
+    return rolling_sum(x, window) / window
+
+
+def std(x, window):
+    mean = sma(x, window)
+    sq = rolling_sum(x * x, window) / window
+    return np.sqrt(np.maximum(sq - mean * mean, 0.0) * window / (window - 1))
+
+
+def ema(x, span):
+    alpha = 2.0 / (span + 1)
+    out = np.empty_like(x)
+    prev = np.full(x.shape[0], np.nan)
+    for t in range(x.shape[1]):
+        col = x[:, t]
+        prev = np.where(np.isnan(prev), col, np.where(np.isnan(col), prev, alpha * col + (1 - alpha) * prev))
+        out[:, t] = prev
+    return out
+
+
+def rsi(x, window):
+    delta = np.full_like(x, np.nan)
+    delta[:, 1:] = x[:, 1:] - x[:, :-1]
+    with np.errstate(invalid="ignore"):
+        gain = np.where(np.isnan(x), np.nan, np.where(delta > 0, delta, 0.0))
+        loss = np.where(np.isnan(x), np.nan, np.where(delta < 0, -delta, 0.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = sma(gain, window) / sma(loss, window)
+        return 100 - (100 / (1 + rs))
+
+
+def prev(x, periods=1):
+    out = np.full_like(x, np.nan, dtype=float)
+    out[:, periods:] = x[:, :-periods]
+    return out
+
+
+FUNCTIONS = {"sma": sma, "std": std, "ema": ema, "rsi": rsi, "prev": prev}
+ARITH = {"+": np.add, "-": np.subtract, "*": np.multiply, "/": np.divide}
+CMP = {"<": np.less, "<=": np.less_equal, ">": np.greater, ">=": np.greater_equal, "==": np.equal, "!=": np.not_equal}
+
+
+def children(node):
+    kind = node[0]
+    if kind in ("and", "or"):
+        return node[1:]
+    if kind == "not":
+        return node[1:2]
+    if kind in ("cmp", "arith"):
+        return node[2:4]
+    if kind == "call":
+        return node[2:3]
+    return ()
+
+
+class Plan:
+    """Unique nodes of a set of rules in evaluation order; shared subexpressions appear once."""
+
+    def __init__(self, roots):
+        self.roots = roots
+        self.steps = []
+        seen = set()
+
+        def visit(node):
+            if node in seen:
+                return
+            for child in children(node):
+                visit(child)
+            seen.add(node)
+            self.steps.append(node)
+
+        for root in roots:
+            visit(root)
+
+    def evaluate(self, panel, ltp):
+        """Evaluate every rule over the panel; returns one bool array (instruments,) per rule."""
+        env = {}
+        with np.errstate(invalid="ignore", divide="ignore"):
+            for node in self.steps:
+                kind = node[0]
+                if kind == "num":
+                    value = node[1]
+                elif kind == "col":
+                    value = panel[node[1]]
+                elif kind == "ltp":
+                    value = ltp[:, None]
+                elif kind == "call":
+                    value = FUNCTIONS[node[1]](env[node[2]], *node[3:])
+                elif kind == "arith":
+                    value = ARITH[node[1]](env[node[2]], env[node[3]])
+                elif kind == "cmp":
+                    value = CMP[node[1]](env[node[2]], env[node[3]])
+                elif kind == "and":
+                    value = np.logical_and(env[node[1]], env[node[2]])
+                elif kind == "or":
+                    value = np.logical_or(env[node[1]], env[node[2]])
+                else:
+                    value = np.logical_not(env[node[1]])
+                env[node] = value
+        return [latest(env[root], len(ltp)) for root in self.roots]
+
+
+def latest(value, n):
+    """Latest-candle column of a rule result as a bool array of length n."""
+    value = np.asarray(value)
+    if value.ndim == 2:
+        value = value[:, -1]
+    return np.broadcast_to(value, (n,)).astype(bool)
+
+
+@lru_cache(maxsize=64)
+def compile_rules(texts):
+    """Compile a tuple of rule texts into one cached Plan."""
+    return Plan([parse(text) for text in texts])
+
+
+def build_panel(frames, columns=("close",), candles=PANEL_CANDLES):
+    """Stack candle DataFrames into right-aligned (instruments x candles) arrays, NaN-padded on the left."""
+    length = min(candles, max((len(df) for df in frames), default=0))
+    panel = {}
+    for column in columns:
+        matrix = np.full((len(frames), length), np.nan)
+        for i, df in enumerate(frames):
+            values = df[column].to_numpy(dtype=float)[-length:] if length else []
+            if len(values):
+                matrix[i, length - len(values):] = values
+        panel[column] = matrix
+    return panel
+
+
+class RuleBook:
+    """Per-instrument trade rules from config, evaluated together over one panel."""
+
+    def __init__(self, trade_rules):
+        self.trade_rules = trade_rules
+        self.default = trade_rules.get("default")
+        self.texts = tuple(sorted(set(trade_rules.values())))
+        self.plan = compile_rules(self.texts)
+        self.columns = tuple(sorted({node[1] for node in self.plan.steps if node[0] == "col"} | {"close"}))
+
+    def rule_for(self, symbol):
+        return self.trade_rules.get(symbol, self.default)
+
+    def evaluate(self, symbols, frames, ltp):
+        """Return {symbol: bool} for instruments whose candles are in `frames` (same order)."""
+        panel = build_panel(frames, self.columns)
+        results = dict(zip(self.texts, self.plan.evaluate(panel, np.asarray(ltp, dtype=float))))
+        return {symbol: bool(results[self.rule_for(symbol)][i]) for i, symbol in enumerate(symbols)
+                if self.rule_for(symbol) is not None}
@@ -0,0 +1,244 @@
+import kiteapp as kt
+from feed import ManagedFeed, complete_candles
+from candles import SESSION_OPEN, DEFAULT_SESSION_OPEN, bucket_end, interval_minutes
+import numpy as np
+from datetime import timedelta
+import logging
+import threading
+from time import time
+import clock
+import signal
+import sys
+
+# Constants
+INTERVAL = "2minute"  # Candle length for the screen
+MAX_TOKENS_PER_CONNECTION = 3000  # Kite websocket subscription limit per connection
+MAX_CONNECTIONS = 3  # Kite allows three websocket connections per API key
+HISTORY = 50  # Candles kept per token, enough for the 50MA
+BB_WINDOW = 20
+BB_STD = 2
+
+log = logging.getLogger(__name__)
+
+
+def load_universe(kite, exchanges=("NSE", "NFO")):
+    """Return every NSE cash equity and F&O future as instrument dicts."""
+    universe = []
+    for exchange in exchanges:
+        for row in kite.instruments(exchange):
+            if exchange == "NSE" and row["instrument_type"] != "EQ":
+                continue
+            if exchange == "NFO" and row["instrument_type"] != "FUT":
+                continue
+            universe.append({"token": row["instrument_token"], "symbol": row["tradingsymbol"], "exchange": exchange})
+    return universe
+
+
+def shard(tokens, size=MAX_TOKENS_PER_CONNECTION):
+    """Split tokens into per-connection subscription lists."""
+    return [tokens[i:i + size] for i in range(0, len(tokens), size)]
+
+
+class UniverseState:
+    """Indicator state for the whole universe held as (tokens x candles) arrays.
+
+    Ticks only write the latest price into a flat array; at candle close the
+    20/50 MA and lower Bollinger Band are computed for every token at once and
+    compared with the previous candle's condition so only flips are reported.
+    """
+
+    def __init__(self, instruments, history=HISTORY):
+        self.instruments = instruments
+        self.index = {instrument["token"]: i for i, instrument in enumerate(instruments)}
+        n = len(instruments)
+        self.history = history
+        self.closes = np.full((n, history), np.nan)  # ring buffer, column `pos` is the oldest candle
+        self.pos = 0
+        self.candles = 0
+        self.ltp = np.full(n, np.nan)
+        self.condition = np.zeros(n, dtype=bool)
+        # Indicators as of the last closed candle
+        self.ma_20 = np.full(n, np.nan)
+        self.ma_50 = np.full(n, np.nan)
+        self.lower_bb = np.full(n, np.nan)
+        self.lock = threading.Lock()
+
+    def seed(self, token, closes):
+        """Preload closes (oldest first) for one token from historical candles."""
+        row = self.index[token]
+        closes = np.asarray(closes[-self.history:], dtype=float)
+        with self.lock:
+            self.closes[row] = np.nan
+            self.closes[row, self.history - len(closes):] = closes
+            self.candles = max(self.candles, len(closes))
+            self.ltp[row] = closes[-1]
+
+    def backfill(self, token, closes):
+        """Overwrite the most recent closed candles of one token (oldest first), e.g. after a feed outage."""
+        row = self.index[token]
+        closes = np.asarray(closes[-self.history:], dtype=float)
+        if not len(closes):
+            return
+        with self.lock:
+            self.closes[row, self.window(len(closes))] = closes
+            self._compute_indicators()
+
+    def on_ticks(self, ws, ticks):
+        index = self.index
+        ltp = self.ltp
+        for tick in ticks:
+            row = index.get(tick["instrument_token"])
+            if row is not None:
+                ltp[row] = tick["last_price"]
+
+    def window(self, length):
+        """Columns of the ring buffer holding the most recent `length` candles."""
+        return (self.pos - length + np.arange(length)) % self.history
+
+    def _compute_indicators(self):
+        recent = self.closes[:, self.window(BB_WINDOW)]
+        self.ma_20 = recent.mean(axis=1)
+        std_dev = recent.std(axis=1, ddof=1)  # Same sample std as pandas rolling().std()
+        self.ma_50 = self.closes.mean(axis=1)
+        self.lower_bb = self.ma_20 - BB_STD * std_dev
+        return self.ma_20, self.ma_50, self.lower_bb
+
+    def compute_indicators(self):
+        """Recompute the indicator arrays from the history as it stands (e.g. after seeding)."""
+        with self.lock:
+            self._compute_indicators()
+
+    def close_candle(self):
+        """Roll the latest prices into the history and return instruments whose condition flipped."""
+        with self.lock:
+            # Tokens that did not trade this candle carry their previous close forward
+            last = self.closes[:, (self.pos - 1) % self.history]
+            self.closes[:, self.pos] = np.where(np.isnan(self.ltp), last, self.ltp)
+            self.pos = (self.pos + 1) % self.history
+            self.candles += 1
+            ma_20, ma_50, lower_bb = self._compute_indicators()
+            close = self.closes[:, (self.pos - 1) % self.history]
+
+            with np.errstate(invalid="ignore"):
+                condition = (close < ma_50) | (close <= lower_bb)
+            flipped = np.flatnonzero(condition != self.condition)
+            self.condition = condition
+
+        return [
+            {**self.instruments[i], "condition": bool(condition[i]), "ltp": close[i],
+             "50MA": ma_50[i], "20MA": ma_20[i], "Lower_BB": lower_bb[i]}
+            for i in flipped
+        ]
+
+
+class Scanner:
+    """Run the 50MA/Bollinger screen over the universe on sharded websocket connections."""
+
+    def __init__(self, kite, instruments, interval=INTERVAL, on_flip=None):
+        shards = shard([instrument["token"] for instrument in instruments])
+        if len(shards) > MAX_CONNECTIONS:
+            raise ValueError(f"{len(instruments)} tokens need {len(shards)} connections, "
+                             f"more than the {MAX_CONNECTIONS} allowed per API key")
+        self.kite = kite
+        self.state = UniverseState(instruments)
+        self.shards = shards
+        self.on_flip = on_flip or self.log_flip
+        self.interval = interval
+        self.minutes = interval_minutes(interval)
+        # Candles close on Kite's grid, counted from the session open (09:15 for NSE/NFO), not the epoch
+        self.session_open = min((SESSION_OPEN.get(instrument["exchange"], DEFAULT_SESSION_OPEN)
+                                 for instrument in instruments), default=DEFAULT_SESSION_OPEN)
+        self.tickers = []
+        self.feeds = []
+        self.stopped = threading.Event()
+
+    def seed_history(self, interval=None, days=5, rate=3):
+        """Seed indicator state from closed historical candles, paced under the historical rate limit."""
+        interval = interval or self.interval
+        today = clock.now()
+        from_date = (today - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+        to_date = today.strftime("%Y-%m-%d %H:%M:%S")
+        for instrument in self.state.instruments:
+            try:
+                # The last candle is usually still forming; its close comes from ticks at close_candle()
+                data = complete_candles(self.kite.historical_data(instrument["token"], from_date, to_date, interval),
+                                        interval)
+                if data:
+                    self.state.seed(instrument["token"], [candle["close"] for candle in data])
+            except Exception as e:
+                log.error(f"Error seeding history for {instrument['symbol']}: {e}")
+            clock.sleep(1 / rate)
+
+    def connect(self):
+        """Open one ticker connection per shard, each subscribing to its own tokens in LTP mode."""
+        for tokens in self.shards:
+            kws = self.kite.kws()
+
+            def on_connect(ws, response, tokens=tokens):
+                ws.subscribe(tokens)
+                ws.set_mode(ws.MODE_LTP, tokens)
+                log.info(f"Scanner shard connected with {len(tokens)} tokens")
+
+            kws.on_ticks = self.state.on_ticks
+            kws.on_connect = on_connect
+            # Reconnects on its own and refills the candles each shard missed while it was down
+            self.feeds.append(ManagedFeed(self.kite, kws, self.interval, self.backfill, self.state.instruments))
+            kws.connect(threaded=True)
+            self.tickers.append(kws)
+            clock.sleep(1)  # Let the shared reactor come up before the next connection
+
+    def backfill(self, token, candles):
+        self.state.backfill(token, [candle["close"] for candle in complete_candles(candles, self.interval)])
+
+    def run(self):
+        """Evaluate the screen at every candle close until stopped."""
+        while not self.stopped.is_set():
+            closes_at = bucket_end(clock.now(), self.minutes, self.session_open)
+            while not self.stopped.is_set() and clock.now() < closes_at:
+                clock.wait_event(self.stopped, (closes_at - clock.now()).total_seconds())
+            if self.stopped.is_set():
+                break
+            started = time()
+            flips = self.state.close_candle()
+            log.info(f"Evaluated {len(self.state.instruments)} instruments in {(time() - started) * 1000:.1f} ms, "
+                     f"{len(flips)} flipped")
+            for flip in flips:
+                self.on_flip(flip)
+
+    def stop(self):
+        self.stopped.set()
+        for kws in self.tickers:
+            kws.stop()
+
+    @staticmethod
+    def log_flip(flip):
+        state = "entered" if flip["condition"] else "left"
+        log.info(f"{flip['exchange']}:{flip['symbol']} {state} the 50MA/Lower BB condition - "
+                 f"LTP: {flip['ltp']}, 50MA: {flip['50MA']:.2f}, Lower BB: {flip['Lower_BB']:.2f}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler("scanner.log"), logging.StreamHandler()])
+
+    with open('enctoken.txt', 'r') as rd:
+        token = rd.read().strip()
+
+    kite = kt.KiteApp("kite", "YQ6639", token)
+    universe = load_universe(kite)
+    logging.info(f"Loaded {len(universe)} instruments into the scanner universe")
+
+    scanner = Scanner(kite, universe)
+    if "--seed" in sys.argv:
+        scanner.seed_history()
+
+    def signal_handler(sig, frame):
+        logging.info("Interrupt received, stopping...")
+        scanner.stop()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    scanner.connect()
+    scanner.run()
@@ -0,0 +1,173 @@
+import logging
+import threading
+import clock
+from concurrent.futures import ThreadPoolExecutor
+from ratelimit import RateLimiter, ORDER_RATE
+from order_waiter import await_fill, FILL_TIMEOUT
+
+log = logging.getLogger(__name__)
+
+
+def plan_slices(quantity, lot_size=1, freeze_quantity=None, visible=None, slices=None):
+    """Child quantities for a parent order, each a multiple of the lot size and within the freeze limit.
+
+    visible: iceberg clip size; slices: number of TWAP children. Without either the
+    parent is only split as far as the exchange freeze quantity requires.
+    """
+    cap = quantity
+    if freeze_quantity:
+        cap = min(cap, freeze_quantity)
+    if visible:
+        cap = min(cap, visible)
+    if slices:
+        lots = quantity // lot_size
+        cap = min(cap, -(-lots // slices) * lot_size)  # ceil(lots / slices) lots per child
+    cap = max(lot_size, cap // lot_size * lot_size)
+
+    children = []
+    remaining = quantity
+    while remaining > 0:
+        child = min(cap, remaining)
+        children.append(child)
+        remaining -= child
+    return children
+
+
+class ParentOrder:
+    def __init__(self, instrument, quantity, price):
+        self.instrument = instrument
+        self.quantity = quantity
+        self.price = price
+        self.children = []  # [{"order_id", "quantity", "filled"}]
+        self.filled = 0
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+
+    def add_fill(self, child, filled):
+        with self.lock:
+            child["filled"] = filled
+            self.filled += filled
+            return self.filled
+
+    def wait(self, timeout=None):
+        return clock.wait_event(self.done, timeout)
+
+
+class ProtectiveBracket:
+    """SL-M and target legs for a short that grow with the parent's fills (one place, then modifies)."""
+
+    def __init__(self, kite, instrument, stop_loss, target, limiter=None, product="MIS"):
+        self.kite = kite
+        self.instrument = instrument
+        self.stop_loss = stop_loss
+        self.target = target
+        self.product = product
+        self.limiter = limiter or RateLimiter(ORDER_RATE)
+        self.sl_order_id = None
+        self.target_order_id = None
+        self.quantity = 0
+        self.lock = threading.Lock()
+
+    def resize(self, quantity):
+        with self.lock:
+            if quantity <= self.quantity:
+                return
+            common = dict(variety="regular", exchange=self.instrument["exchange"],
+                          tradingsymbol=self.instrument["symbol"], transaction_type="BUY",
+                          product=self.product, validity="DAY")
+            try:
+                if self.sl_order_id is None:
+                    self.limiter.acquire()
+                    self.sl_order_id = self.kite.place_order(quantity=quantity, order_type="SL-M",
+                                                             trigger_price=self.stop_loss, **common)
+                    self.limiter.acquire()
+                    self.target_order_id = self.kite.place_order(quantity=quantity, order_type="LIMIT",
+                                                                 price=self.target, **common)
+                    log.info(f"🛑🎯 SL {self.sl_order_id} at {self.stop_loss} and target {self.target_order_id} "
+                             f"at {self.target} placed for {self.instrument['symbol']} x{quantity}")
+                else:
+                    for order_id in (self.sl_order_id, self.target_order_id):
+                        self.limiter.acquire()
+                        self.kite.modify_order(variety="regular", order_id=order_id, quantity=quantity)
+                    log.info(f"Resized SL/target for {self.instrument['symbol']} to x{quantity}")
+                self.quantity = quantity
+            except Exception as e:
+                log.error(f"Error sizing SL/target for {self.instrument['symbol']} to x{quantity}: {e}")
+
+
+class SliceExecutor:
+    """Split a parent SELL into child orders by freeze limit, TWAP schedule or iceberg clip.
+
+    Children are submitted concurrently within the order rate budget (iceberg
+    clips one after another), fills are aggregated into the parent, and on_fill
+    is called with the parent after every child fill.
+    """
+
+    def __init__(self, kite, updates=None, limiter=None, workers=8):
+        self.kite = kite
+        self.updates = updates
+        self.limiter = limiter or RateLimiter(ORDER_RATE)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="slicer")
+
+    def place_child(self, parent, quantity, order_type, timeout, on_fill):
+        instrument = parent.instrument
+        price = dict(price=parent.price) if order_type == "LIMIT" else {}
+        child = {"order_id": None, "quantity": quantity, "filled": 0}
+        with parent.lock:
+            parent.children.append(child)
+        try:
+            self.limiter.acquire()
+            child["order_id"] = self.kite.place_order(
+                variety="regular", exchange=instrument["exchange"], tradingsymbol=instrument["symbol"],
+                transaction_type="SELL", quantity=quantity, product="MIS", order_type=order_type,
+                validity="DAY", **price)
+            log.info(f"✅ SELL slice {child['order_id']} for {instrument['symbol']} x{quantity}")
+            filled = await_fill(self.kite, child["order_id"], timeout, self.updates)
+        except Exception as e:
+            log.error(f"Error placing SELL slice for {instrument['symbol']} x{quantity}: {e}")
+            return 0
+        if filled:
+            total = parent.add_fill(child, filled)
+            log.info(f"{instrument['symbol']} slice filled x{filled}; parent {total}/{parent.quantity}")
+            if on_fill:
+                on_fill(parent)
+        return filled
+
+    def execute(self, instrument, quantity, price, mode="freeze", order_type="LIMIT", lot_size=1,
+                freeze_quantity=None, visible=None, slices=None, duration=0, timeout=FILL_TIMEOUT, on_fill=None):
+        """Start working a parent order; returns the ParentOrder (use .wait() to block until done)."""
+        parent = ParentOrder(instrument, quantity, price)
+        children = plan_slices(quantity, lot_size, freeze_quantity,
+                               visible if mode == "iceberg" else None, slices if mode == "twap" else None)
+        log.info(f"Slicing SELL {instrument['symbol']} x{quantity} ({mode}) into {children}")
+
+        if mode == "iceberg":
+            def run_iceberg():
+                # Only one clip is visible at a time; stop if a clip fails to fill
+                for child in children:
+                    if not self.place_child(parent, child, order_type, timeout, on_fill):
+                        break
+                parent.done.set()
+            self.pool.submit(run_iceberg)
+            return parent
+
+        start = clock.monotonic()
+        interval = duration / len(children) if mode == "twap" and len(children) > 1 else 0
+
+        def run_child(index, child):
+            delay = start + index * interval - clock.monotonic()
+            if delay > 0:
+                clock.sleep(delay)
+            return self.place_child(parent, child, order_type, timeout, on_fill)
+
+        futures = [self.pool.submit(run_child, i, child) for i, child in enumerate(children)]
+
+        def finish():
+            for future in futures:
+                future.exception()
+            parent.done.set()
+        threading.Thread(target=finish, daemon=True).start()
+        return parent
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
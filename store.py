@@ -0,0 +1,55 @@
+import json
+import os
+import numpy as np
+
+COLUMNS = {"date": np.int64, "open": np.float64, "high": np.float64, "low": np.float64, "close": np.float64,
+           "volume": np.int64}  # date is epoch seconds
+
+
+class ColumnStore:
+    """Candles on disk as one .npy file per column per token: <root>/<interval>/<token>/<column>.npy.
+
+    Plain .npy columns load with mmap_mode="r", so many processes can share one
+    page-cached copy of years of minute data without parsing or copying it.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, interval, token):
+        return os.path.join(self.root, interval, str(token))
+
+    def tokens(self, interval):
+        directory = os.path.join(self.root, interval)
+        if not os.path.isdir(directory):
+            return []
+        return sorted(int(name) for name in os.listdir(directory) if os.path.exists(self.meta_path(interval, name)))
+
+    def meta_path(self, interval, token):
+        return os.path.join(self.path(interval, token), "meta.json")
+
+    def meta(self, interval, token):
+        try:
+            with open(self.meta_path(interval, token)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def write(self, interval, token, columns, meta):
+        """Write all columns, then meta.json last, so a token only counts as stored once it is complete."""
+        directory = self.path(interval, token)
+        os.makedirs(directory, exist_ok=True)
+        for name, dtype in COLUMNS.items():
+            tmp = os.path.join(directory, f"{name}.tmp.npy")
+            np.save(tmp, np.asarray(columns[name], dtype=dtype))
+            os.replace(tmp, os.path.join(directory, f"{name}.npy"))
+        tmp = self.meta_path(interval, token) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(meta, f, indent=1)
+        os.replace(tmp, self.meta_path(interval, token))
+
+    def load(self, interval, token, mmap=True):
+        """Column name -> array (memory-mapped read-only by default)."""
+        directory = self.path(interval, token)
+        return {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                for name in COLUMNS}
@@ -0,0 +1,122 @@
+"""Strategy plugins for strategy_host.py.
+
+A strategy declares the candle interval and indicators it needs and implements
+its entry (and optionally exit) rule against a SignalView. The host fetches and
+computes everything once per (instrument, interval, indicator) and shares it.
+"""
+from rules import RuleBook
+
+
+class Strategy:
+    name = "base"
+    interval = "2minute"
+    indicators = ()
+    timeframes = {}  # Extra interval -> indicators, read through view.timeframe(interval)
+
+    def prepare(self, host):
+        """Called once per cycle after candles are loaded, for strategies that evaluate in bulk."""
+
+    def should_enter(self, instrument, view):
+        return False
+
+    def should_exit(self, instrument, view):
+        return False
+
+
+class MA50OrLowerBB(Strategy):
+    """live_testing_closing_orders.py: sell when price is below the 50MA or at/below the lower BB."""
+    name = "50ma_or_lower_bb"
+    indicators = ("50MA", "Lower_BB")
+
+    def should_enter(self, instrument, view):
+        ma_50 = view.latest("50MA")
+        lower_bb = view.value("Lower_BB")
+        return ma_50 is not None and (view.ltp < ma_50 or view.ltp <= lower_bb)
+
+
+class MA50CrossOnce(Strategy):
+    """check-50MA-onlyonce.py: sell once when price crosses below the 50MA."""
+    name = "50ma_cross_once"
+    indicators = ("50MA",)
+
+    def __init__(self):
+        self.previous_below_50ma = {}
+
+    def should_enter(self, instrument, view):
+        ma_50 = view.latest("50MA")
+        if ma_50 is None:
+            return False
+        was_below = self.previous_below_50ma.get(instrument["symbol"], False)
+        below = view.ltp < ma_50
+        self.previous_below_50ma[instrument["symbol"]] = below
+        return below and not was_below
+
+
+class MA50BBRsiMacd(Strategy):
+    """The stricter rule kept commented out in the live scripts."""
+    name = "50ma_bb_rsi_macd"
+    indicators = ("50MA", "Lower_BB", "RSI", "MACD", "Signal_Line")
+
+    def should_enter(self, instrument, view):
+        ma_50 = view.latest("50MA")
+        return (ma_50 is not None and view.ltp < ma_50 and view.ltp <= view.value("Lower_BB")
+                and view.value("RSI") > 70 and view.value("MACD") < view.value("Signal_Line"))
+
+
+class MA50Testing(Strategy):
+    """testing_multiple*.py: latest 5-minute close below its 50MA."""
+    name = "50ma_5minute"
+    interval = "5minute"
+    indicators = ("50MA",)
+
+    def should_enter(self, instrument, view):
+        ma_50 = view.value("50MA")
+        return view.value("close") < ma_50
+
+
+class MA50TrendConfirmed(Strategy):
+    """50ma_or_lower_bb on 2-minute bars, only while price is also below the 15-minute 50MA."""
+    name = "50ma_15minute_confirmed"
+    indicators = ("50MA", "Lower_BB")
+    timeframes = {"15minute": ("50MA",)}
+
+    def should_enter(self, instrument, view):
+        ma_50 = view.latest("50MA")
+        if ma_50 is None or not (view.ltp < ma_50 or view.ltp <= view.value("Lower_BB")):
+            return False
+        higher = view.timeframe("15minute")
+        trend = higher.latest("50MA") if higher else None
+        return trend is not None and view.ltp < trend
+
+
+class ConfiguredRules(Strategy):
+    """Per-instrument rules from `trade_rules` in instrument_config, evaluated for all instruments at once."""
+    name = "rules"
+
+    def __init__(self, trade_rules=None):
+        if trade_rules is None:
+            from instrument_config import trade_rules
+        self.book = RuleBook(trade_rules)
+        self.signals = {}
+
+    def prepare(self, host):
+        loaded = [(instrument, host.frame(instrument, self.interval)) for instrument in host.instruments
+                  if instrument["token"] in host.live_data]
+        loaded = [(instrument, frame) for instrument, frame in loaded if frame is not None]
+        self.signals = self.book.evaluate(
+            [instrument["symbol"] for instrument, _ in loaded],
+            [frame.df for _, frame in loaded],
+            [host.live_data[instrument["token"]]["ltp"] for instrument, _ in loaded],
+        )
+
+    def should_enter(self, instrument, view):
+        return self.signals.get(instrument["symbol"], False)
+
+
+STRATEGIES = {cls.name: cls for cls in (MA50OrLowerBB, MA50CrossOnce, MA50BBRsiMacd, MA50Testing, MA50TrendConfirmed,
+                                               ConfiguredRules)}
+
+
+def load_strategies(names):
+    """Instantiate plugins by name, e.g. from the `strategies` list in instrument_config."""
+    return [STRATEGIES[name]() for name in names]
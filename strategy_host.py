@@ -0,0 +1,198 @@
+from datetime import timedelta
+import logging
+import threading
+from time import time
+import clock
+import signal
+import sys
+from indicators import to_frame
+from candles import CandleStore, interval_minutes
+
+DURATION = 3  # Duration for each sleep cycle in seconds
+HISTORY_DAYS = 5
+
+log = logging.getLogger(__name__)
+
+
+class SignalView:
+    """What a strategy sees for one instrument: the live price and the shared indicator frame."""
+
+    def __init__(self, frame, ltp, frames=None):
+        self.frame = frame
+        self.ltp = ltp
+        self.frames = frames  # interval -> IndicatorFrame for the same instrument
+
+    def timeframe(self, interval):
+        """The same view on another timeframe, e.g. view.timeframe("15minute").latest("50MA"); None without candles."""
+        frame = self.frames(interval)
+        return SignalView(frame, self.ltp, self.frames) if frame is not None else None
+
+    def latest(self, name):
+        return self.frame.latest(name)
+
+    def value(self, name, offset=-1):
+        return self.frame.value(name, offset)
+
+    def series(self, name):
+        return self.frame.get(name)
+
+
+class StrategyHost:
+    """Run many strategy plugins off one data and indicator pipeline.
+
+    Every minute-based timeframe is resampled from one 1-minute series per
+    instrument kept by a CandleStore, so extra timeframes cost no API calls;
+    every indicator is computed once per (instrument, interval, indicator) per
+    cycle, however many strategies ask for it, and order book checks are one
+    refresh per cycle.
+    """
+
+    def __init__(self, kite, instruments, strategies, executor, live_data, exit_handler=None):
+        self.kite = kite
+        self.instruments = instruments
+        self.strategies = strategies
+        self.executor = executor
+        self.live_data = live_data
+        self.exit_handler = exit_handler
+        self.frames = {}
+        self.candles = CandleStore(kite)
+        self.indicators = {}  # interval -> union of indicators declared for it, main or extra timeframe
+        for strategy in strategies:
+            for interval, names in [(strategy.interval, strategy.indicators), *strategy.timeframes.items()]:
+                self.indicators.setdefault(interval, set()).update(names)
+        self.intervals = sorted(self.indicators)
+
+    def on_ticks(self, ws, ticks):
+        """Keep the forming minute bar current between candle fetches."""
+        self.candles.on_ticks(ws, ticks)
+
+    def fetch_frame(self, instrument, interval):
+        today = clock.now()
+        from_date = (today - timedelta(days=HISTORY_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+        to_date = today.strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            data = self.kite.historical_data(instrument_token=instrument["token"], from_date=from_date,
+                                             to_date=to_date, interval=interval)
+        except Exception as e:
+            log.error(f"Error fetching historical data for {instrument['symbol']}: {e}")
+            return None
+        frame = to_frame(data)
+        if frame is None:
+            log.warning(f"No data available for {instrument['symbol']}. Market might be closed.")
+            return None
+        return frame
+
+    def frame(self, instrument, interval):
+        """The cycle's shared indicator frame for an instrument and interval."""
+        key = (instrument["token"], interval)
+        if key not in self.frames:
+            if interval_minutes(interval):
+                frame = self.candles.frame(instrument, interval)
+            else:
+                frame = self.fetch_frame(instrument, interval)
+            if frame is not None:
+                # Precompute the union of what this interval's strategies declared
+                frame.compute(sorted(self.indicators.get(interval, ())))
+            self.frames[key] = frame
+        return self.frames[key]
+
+    def run_cycle(self):
+        self.frames = {}
+        self.executor.refresh_all()
+        started = time()
+        for strategy in self.strategies:
+            try:
+                strategy.prepare(self)
+            except Exception as e:
+                log.error(f"[{strategy.name}] Error preparing cycle: {e}")
+        for instrument in self.instruments:
+            if instrument["token"] not in self.live_data:
+                log.warning(f"No live data available for {instrument['symbol']}")
+                continue
+            ltp = self.live_data[instrument["token"]]["ltp"]
+            entered = False
+            for strategy in self.strategies:
+                frame = self.frame(instrument, strategy.interval)
+                if frame is None:
+                    continue
+                view = SignalView(frame, ltp, lambda interval, instrument=instrument: self.frame(instrument, interval))
+                try:
+                    # Every strategy sees every cycle, so stateful ones stay in step; only the order is deduped
+                    if strategy.should_enter(instrument, view):
+                        if entered:
+                            log.debug(f"[{strategy.name}] Condition met for {instrument['symbol']}, "
+                                      f"already entered this cycle")
+                            continue
+                        log.info(f"[{strategy.name}] Condition met for {instrument['symbol']}: Placing SELL order!")
+                        self.executor.place_sell_order(instrument, ltp)
+                        entered = True  # One entry per instrument per cycle, whichever strategy fired first
+                    elif strategy.should_exit(instrument, view) and self.exit_handler:
+                        log.info(f"[{strategy.name}] Exit condition met for {instrument['symbol']}")
+                        self.exit_handler(strategy, instrument, ltp)
+                except Exception as e:
+                    log.error(f"[{strategy.name}] Error evaluating {instrument['symbol']}: {e}")
+        log.info(f"Evaluated {len(self.strategies)} strategies on {len(self.instruments)} instruments "
+                 f"on {len(self.frames)} frames in {(time() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    from instrument_config import instruments, trade_config, accounts, strategies as strategy_names
+    from multi_account import AccountSession, FanOutExecutor
+    from strategies import load_strategies
+    from warmup import WarmUp
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s',
+                        handlers=[logging.FileHandler("trading_script.log"), logging.StreamHandler()])
+
+    session = AccountSession.from_config(accounts[0])
+    executor = FanOutExecutor([session], trade_config)
+    kite = session.kite
+    kws = kite.kws()
+    live_data = {}
+
+    def on_ticks(ws, ticks):
+        for tick in ticks:
+            live_data[tick['instrument_token']] = {
+                "ltp": tick["last_price"],
+                "high": tick["ohlc"]["high"],
+                "low": tick["ohlc"]["low"]
+            }
+        host.on_ticks(ws, ticks)
+
+    def on_connect(ws, response):
+        ws.subscribe([instrument["token"] for instrument in instruments])
+        ws.set_mode(ws.MODE_QUOTE, [instrument["token"] for instrument in instruments])
+        logging.info("WebSocket connected and subscribed to instruments")
+
+    kws.on_ticks = on_ticks
+    kws.on_connect = on_connect
+
+    host = StrategyHost(kite, instruments, load_strategies(strategy_names), executor, live_data)
+    logging.info(f"Strategy host running: {[strategy.name for strategy in host.strategies]}")
+    warmup = WarmUp(kite, host.candles, instruments)
+    warmup.attach(kws)
+
+    def signal_handler(sig, frame):
+        logging.info("Interrupt received, stopping...")
+        kws.stop()
+        executor.shutdown()
+        sys.exit(0)
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+
+    ws_thread = threading.Thread(target=kws.connect)
+    ws_thread.daemon = True
+    ws_thread.start()
+
+    try:
+        # Every declared frame and indicator built once; run_cycle() starts each cycle with fresh frames
+        warmup.run(lambda instrument: [host.frame(instrument, interval) for interval in host.intervals])
+        warmup.park()
+        while True:
+            logging.info("Starting new cycle")
+            host.run_cycle()
+            logging.info(f"Sleeping for {DURATION} seconds...\n")
+            clock.sleep(DURATION)
+    except (KeyboardInterrupt, SystemExit):
+        signal_handler(None, None)
@@ -0,0 +1,114 @@
+import itertools
+import logging
+import random
+from concurrent.futures import Future, ThreadPoolExecutor
+import requests
+import kiteconnect.exceptions as ex
+from ratelimit import RateLimiter, ORDER_RATE
+import clock
+
+log = logging.getLogger(__name__)
+
+MAX_RETRIES = 3  # Attempts after the first before an order is given up on
+BASE_DELAY = 0.2  # Seconds; back-off doubles per retry, with full jitter
+MAX_DELAY = 2.0
+MAX_TAG_LENGTH = 20  # Kite limit for the order tag
+TAG_DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def is_retryable(error):
+    """True for failures where the order may or may not have reached the OMS (timeouts, network, 5xx)."""
+    if isinstance(error, (requests.exceptions.RequestException, ex.NetworkException, ex.DataException)):
+        return True
+    return isinstance(error, ex.GeneralException) and (getattr(error, "code", 0) or 0) >= 500
+
+
+def base36(n):
+    digits = ""
+    while True:
+        n, r = divmod(n, 36)
+        digits = TAG_DIGITS[r] + digits
+        if not n:
+            return digits
+
+
+class OrderSubmitter:
+    """Idempotent place_order: every logical order gets a unique tag, and a retry only goes out
+    after orders() shows that no order with that tag reached the OMS.
+
+    Fatal errors (rejections, bad input, auth) fail at once; ambiguous ones are
+    retried with jittered exponential back-off on a timer, so submit() never
+    blocks the caller and other orders keep flowing meanwhile.
+    """
+
+    def __init__(self, kite, limiter=None, max_retries=MAX_RETRIES, base_delay=BASE_DELAY, max_delay=MAX_DELAY,
+                 workers=8):
+        self.kite = kite
+        self.limiter = limiter or RateLimiter(ORDER_RATE)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="order-submit")
+        self.sequence = itertools.count(1)
+
+    def next_tag(self):
+        """Session tag (so the kill switch still recognises the order) plus a per-order sequence number."""
+        prefix = getattr(self.kite, "order_tag", None) or "ll"
+        return (prefix + base36(next(self.sequence)))[:MAX_TAG_LENGTH]
+
+    def find_by_tag(self, tag):
+        for order in self.kite.orders():
+            if order.get("tag") == tag:
+                return order["order_id"]
+        return None
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def submit(self, **params):
+        """Start placing an order; returns a Future that resolves to its order ID."""
+        params.setdefault("tag", self.next_tag())
+        future = Future()
+        self.pool.submit(self._attempt, params, future, 0)
+        return future
+
+    def place(self, **params):
+        """Blocking submit()."""
+        return self.submit(**params).result()
+
+    def _attempt(self, params, future, attempt):
+        tag = params["tag"]
+        try:
+            if attempt:
+                # The last attempt may have reached the OMS even though its response was lost
+                order_id = self.find_by_tag(tag)
+                if order_id:
+                    log.info(f"Order {tag} already at the OMS as {order_id}; not resending")
+                    future.set_result(order_id)
+                    return
+            self.limiter.acquire()
+            future.set_result(self.kite.place_order(**params))
+        except Exception as e:
+            if not is_retryable(e):
+                log.error(f"Order {tag} for {params.get('tradingsymbol')} failed: {e}")
+                future.set_exception(e)
+            elif attempt >= self.max_retries:
+                log.error(f"Order {tag} for {params.get('tradingsymbol')} failed after {attempt + 1} attempts: {e}")
+                future.set_exception(e)
+            else:
+                delay = self.backoff(attempt)
+                log.warning(f"Order {tag} for {params.get('tradingsymbol')} failed ({e}); "
+                            f"retry {attempt + 1}/{self.max_retries} in {delay:.2f}s")
+                timer = clock.Timer(delay, self._retry, (params, future, attempt + 1, e))
+                timer.daemon = True
+                timer.start()
+
+    def _retry(self, params, future, attempt, error):
+        try:
+            self.pool.submit(self._attempt, params, future, attempt)
+        except RuntimeError:  # shutdown() came while the retry was pending; don't leave place() blocked
+            log.error(f"Order {params['tag']} for {params.get('tradingsymbol')} not retried, submitter shut down")
+            future.set_exception(error)
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False)
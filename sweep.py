@@ -0,0 +1,320 @@
+import argparse
+import itertools
+import logging
+import os
+import random
+import time
+from multiprocessing import Pool
+import numpy as np
+from candles import SESSION_OPEN, DEFAULT_SESSION_OPEN, interval_minutes
+from replay import resample
+from store import ColumnStore
+
+log = logging.getLogger(__name__)
+
+# Values searched per parameter; override any of them from the command line as start:stop:step
+GRID = {
+    "sl_buffer": [0.5, 1, 1.5, 2, 3, 4, 5],  # Stop-loss distance above the short entry, in price points
+    "target_buffer": [1, 2, 3, 4, 6, 8],  # Target distance below the entry
+    "ma_window": [20, 50, 100],  # Slow MA the close crossing below triggers an entry
+    "bb_window": [20, 30],  # Bollinger Band MA/std-dev window
+    "bb_width": [1.5, 2, 2.5],  # Std-devs from the MA to the lower band
+    "rsi_length": [0, 14],  # 0 disables the RSI filter
+}
+RSI_FLOOR = 30  # Don't short a close whose RSI is already below this (oversold)
+SPLITS = 4  # Walk-forward folds (consecutive blocks of trading days)
+MIN_TRADES = 10  # Parameter sets with fewer trades over the whole range aren't ranked
+COST_BPS = 3  # Round-trip brokerage, taxes and slippage as basis points of the entry price
+SIGNAL_KEYS = ("ma_window", "bb_window", "bb_width", "rsi_length")
+LIVE_INTERVAL = "2minute"  # INTERVAL of the live scripts; stored bars are resampled to it so windows mean the same
+
+
+def rolling_mean(values, window):
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.insert(values, 0, 0.0))
+        out[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return out
+
+
+def rolling_std(values, window):
+    """Sample std-dev like pandas' rolling().std()."""
+    mean = rolling_mean(values, window)
+    squares = rolling_mean(values * values, window)
+    return np.sqrt(np.maximum(squares - mean * mean, 0) * window / (window - 1))
+
+
+def rsi(close, length):
+    delta = np.diff(close, prepend=np.nan)
+    gain = rolling_mean(np.where(delta > 0, delta, 0.0), length)
+    loss = rolling_mean(np.where(delta < 0, -delta, 0.0), length)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100 - 100 / (1 + gain / loss)
+
+
+class Candles:
+    """One token's memory-mapped columns plus the per-bar day bookkeeping the simulation needs."""
+
+    def __init__(self, columns):
+        self.close = np.asarray(columns["close"])
+        self.high = np.asarray(columns["high"])
+        self.low = np.asarray(columns["low"])
+        days = (np.asarray(columns["date"]) + 19800) // 86400  # IST calendar day
+        _, self.day, counts = np.unique(days, return_inverse=True, return_counts=True)
+        self.day_end = np.cumsum(counts)[self.day]  # One past the day's last bar, for every bar
+        self.days = len(counts)
+        self.indicators = {}
+
+    def indicator(self, name, *args):
+        key = (name, *args)
+        if key not in self.indicators:
+            if name == "ma":
+                self.indicators[key] = rolling_mean(self.close, *args)
+            elif name == "lower_bb":
+                window, width = args
+                self.indicators[key] = self.indicator("ma", window) - width * self.indicator("std", window)
+            elif name == "std":
+                self.indicators[key] = rolling_std(self.close, *args)
+            elif name == "rsi":
+                self.indicators[key] = rsi(self.close, *args)
+        return self.indicators[key]
+
+    def entries(self, ma_window, bb_window, bb_width, rsi_length):
+        """Entry bars of live_testing_closing_orders.py's rule: close below the MA or on/below the lower band.
+
+        Live enters whenever the condition holds and nothing is open, and
+        has_closed_position_today allows one trade per symbol per day, so the
+        entry is each day's first bar the condition holds on.
+        """
+        close = self.close
+        with np.errstate(invalid="ignore"):
+            condition = (close < self.indicator("ma", ma_window)) | (close <= self.indicator("lower_bb", bb_window, bb_width))
+            if rsi_length:
+                condition &= self.indicator("rsi", rsi_length) >= RSI_FLOOR
+        condition &= np.arange(len(close)) + 1 < self.day_end  # Needs a later bar in the same session
+        bars = np.flatnonzero(condition)
+        _, first = np.unique(self.day[bars], return_index=True)
+        return bars[first]
+
+    def simulate(self, entries, sl_buffer, target_buffer):
+        """Short at the signal close with an SL-M above and a target below; MIS squares off at the day's last close.
+
+        One position at a time (entries() gives at most one per day). If a bar
+        reaches both legs the stop is assumed to have filled first. Returns
+        (entry bar, P&L per share) for every trade.
+        """
+        trades = []
+        free_from = 0
+        for i in entries:
+            if i < free_from:
+                continue
+            entry, end = self.close[i], self.day_end[i]
+            stop, target = entry + sl_buffer, entry - target_buffer
+            stop_hits = np.flatnonzero(self.high[i + 1:end] >= stop)
+            target_hits = np.flatnonzero(self.low[i + 1:end] <= target)
+            stop_at = stop_hits[0] if len(stop_hits) else end
+            target_at = target_hits[0] if len(target_hits) else end
+            if stop_at == end and target_at == end:
+                exit_at, pnl = end - 1, entry - self.close[end - 1]
+            elif stop_at <= target_at:
+                exit_at, pnl = i + 1 + stop_at, -sl_buffer
+            else:
+                exit_at, pnl = i + 1 + target_at, target_buffer
+            trades.append((i, pnl - entry * COST_BPS / 10000))
+            free_from = exit_at + 1
+        return trades
+
+
+def grid(space, samples=None, seed=0):
+    """Every combination of the search space, or `samples` of them drawn at random."""
+    keys = list(space)
+    combos = [dict(zip(keys, values)) for values in itertools.product(*(space[key] for key in keys))]
+    combos = [c for c in combos if c["target_buffer"] > 0 and c["sl_buffer"] > 0]
+    if samples and samples < len(combos):
+        combos = random.Random(seed).sample(combos, samples)
+    return combos
+
+
+_store = None
+_interval = None
+_bar = None
+_candles = {}
+
+
+def _init(root, interval, bar):
+    global _store, _interval, _bar
+    _store, _interval, _bar = ColumnStore(root), interval, bar
+
+
+def _candles_for(token):
+    # Each worker maps the same .npy files read-only, so the page cache holds one copy for all of them
+    if token not in _candles:
+        columns = _store.load(_interval, token, mmap=True)
+        minutes = interval_minutes(_bar)
+        if minutes != interval_minutes(_interval):
+            session_open = SESSION_OPEN.get(_store.meta(_interval, token).get("exchange"), DEFAULT_SESSION_OPEN)
+            columns = resample(columns, minutes, session_open)
+        _candles[token] = Candles(columns)
+    return _candles[token]
+
+
+def _evaluate(task):
+    """Worker: all (sl, target) pairs for one token and one set of signal windows, P&L split into folds."""
+    token, signal, brackets, splits = task
+    candles = _candles_for(token)
+    entries = candles.entries(**signal)
+    fold_of_day = np.minimum(np.arange(candles.days) * splits // max(candles.days, 1), splits - 1)
+    results = []
+    for sl_buffer, target_buffer in brackets:
+        trades = candles.simulate(entries, sl_buffer, target_buffer)
+        folds = np.zeros(splits)
+        for i, pnl in trades:
+            folds[fold_of_day[candles.day[i]]] += pnl
+        results.append((token, {**signal, "sl_buffer": sl_buffer, "target_buffer": target_buffer},
+                        folds.tolist(), len(trades)))
+    return results
+
+
+def score(folds):
+    """Fold-consistent profit: the mean fold P&L less its spread, so one lucky fold can't carry a set."""
+    folds = np.asarray(folds)
+    return float(folds.mean() - folds.std())
+
+
+def walk_forward(results, splits):
+    """Out-of-sample P&L of the selection rule: for each fold k, pick the best score() on folds [0, k) and book fold k."""
+    total = 0.0
+    for k in range(1, splits):
+        best = max(results, key=lambda r: score(r[1][:k]))
+        total += best[1][k]
+    return total
+
+
+class Sweep:
+    """Grid/random search of the bracket and signal parameters for many tokens over all CPU cores.
+
+    Stored `interval` bars are resampled to the live scripts' `bar` interval
+    on the session-open grid. Work is split into (token, signal windows)
+    tasks, so a worker computes the indicators and entry bars once and replays
+    every (sl, target) pair on them.
+    """
+
+    def __init__(self, root, interval="minute", workers=None, splits=SPLITS, bar=LIVE_INTERVAL):
+        if interval_minutes(bar) is None or interval_minutes(bar) % interval_minutes(interval):
+            raise ValueError(f"{bar} bars can't be built from {interval} bars")
+        self.root = root
+        self.interval = interval
+        self.bar = bar
+        self.workers = workers or os.cpu_count()
+        self.splits = splits
+
+    def run(self, tokens, space, samples=None):
+        combos = grid(space, samples)
+        groups = {}
+        for combo in combos:
+            signal = tuple(combo[key] for key in SIGNAL_KEYS)
+            groups.setdefault(signal, []).append((combo["sl_buffer"], combo["target_buffer"]))
+        tasks = [(token, dict(zip(SIGNAL_KEYS, signal)), brackets, self.splits)
+                 for token in tokens for signal, brackets in groups.items()]
+        log.info(f"{len(combos)} parameter sets x {len(tokens)} tokens = {len(tasks)} tasks on {self.workers} processes")
+
+        started = time.monotonic()
+        by_token = {token: [] for token in tokens}
+        with Pool(self.workers, initializer=_init, initargs=(self.root, self.interval, self.bar)) as pool:
+            for results in pool.imap_unordered(_evaluate, tasks, chunksize=4):
+                for token, params, folds, trades in results:
+                    by_token[token].append((params, folds, trades))
+        log.info(f"Swept in {time.monotonic() - started:.1f}s")
+        return by_token
+
+    def rank(self, by_token):
+        """token -> (ranked [(score, params, folds, trades)], walk-forward P&L of the selection rule).
+
+        The winner is the top score() over all folds; the walk-forward P&L is
+        the out-of-sample result of picking that way, and decides whether the
+        winner is worth writing at all.
+        """
+        ranked = {}
+        for token, results in by_token.items():
+            eligible = [r for r in results if r[2] >= MIN_TRADES]
+            table = sorted(((score(folds), params, folds, trades) for params, folds, trades in eligible),
+                           key=lambda row: row[0], reverse=True)
+            ranked[token] = (table, walk_forward(eligible, self.splits) if eligible else None)
+        return ranked
+
+
+def write_trade_config(path, ranked, store, interval, trade_config, bar=LIVE_INTERVAL):
+    """Write the winners as a trade_config dict; quantity and any other keys are carried over.
+
+    Tokens where picking by score lost money out of sample are left out with a comment.
+    """
+    lines = [f"# Generated by sweep.py on {bar} bars; paste the entries you accept into instrument_config.trade_config",
+             "trade_config = {"]
+    for token, (table, walk_forward_pnl) in ranked.items():
+        if not table:
+            continue
+        symbol = store.meta(interval, token)["symbol"]
+        best_score, params, folds, trades = table[0]
+        if walk_forward_pnl <= 0:
+            lines.append(f"    # {symbol}: not written, walk-forward P&L {walk_forward_pnl:.1f}")
+            continue
+        existing = trade_config.get(symbol, {})
+        config = {"sl_buffer": params["sl_buffer"], "target_buffer": params["target_buffer"],
+                  "quantity": existing.get("quantity", 1)}
+        config.update({key: value for key, value in existing.items() if key not in config})
+        signal = ", ".join(f"{key}={params[key]}" for key in SIGNAL_KEYS)
+        lines.append(f"    {symbol!r}: {config!r},  # {signal}; {trades} trades, folds "
+                     f"{[round(f, 1) for f in folds]}, walk-forward {walk_forward_pnl:.1f}")
+    lines.append("}")
+    with open(path, "w") as f:
+        f.write("\n".join(lines).replace("'", '"') + "\n")
+
+
+def parse_range(text):
+    """"1:5:0.5" -> [1, 1.5, ..., 5]; "20,50" -> [20, 50]."""
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        values = np.round(np.arange(start, stop + step / 2, step), 6).tolist()
+    else:
+        values = [float(x) for x in text.split(",")]
+    return [int(v) if float(v).is_integer() else v for v in values]
+
+
+if __name__ == "__main__":
+    from instrument_config import trade_config
+
+    parser = argparse.ArgumentParser(description="Sweep SL/target buffers and signal windows over stored candles.")
+    parser.add_argument("--store", default="candles")
+    parser.add_argument("--interval", default="minute", help="Interval of the stored bars")
+    parser.add_argument("--bar", default=LIVE_INTERVAL, help="Interval the signal is evaluated on, as in the live scripts")
+    parser.add_argument("--symbols", help="Comma-separated; default is every token in the store")
+    parser.add_argument("--random", type=int, help="Sample this many parameter sets instead of the full grid")
+    parser.add_argument("--splits", type=int, default=SPLITS)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--out", default="trade_config_optimized.py")
+    for key, values in GRID.items():
+        parser.add_argument(f"--{key.replace('_', '-')}", type=parse_range, default=values)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    store = ColumnStore(args.store)
+    tokens = store.tokens(args.interval)
+    if args.symbols:
+        wanted = set(args.symbols.split(","))
+        tokens = [token for token in tokens if store.meta(args.interval, token)["symbol"] in wanted]
+    space = {key: getattr(args, key) for key in GRID}
+
+    sweep = Sweep(args.store, args.interval, args.workers, args.splits, args.bar)
+    ranked = sweep.rank(sweep.run(tokens, space, args.random))
+    for token, (table, walk_forward_pnl) in ranked.items():
+        symbol = store.meta(args.interval, token)["symbol"]
+        if not table:
+            logging.info(f"{symbol}: no parameter set reached {MIN_TRADES} trades")
+            continue
+        logging.info(f"{symbol}: walk-forward P&L per share {walk_forward_pnl:.2f}"
+                     f"{'' if walk_forward_pnl > 0 else ', not written'}")
+        for best_score, params, folds, trades in table[:5]:
+            logging.info(f"  score {best_score:8.2f}  {trades:4d} trades  folds {[round(f, 1) for f in folds]}  {params}")
+    write_trade_config(args.out, ranked, store, args.interval, trade_config, args.bar)
+    logging.info(f"Winners written to {args.out}")
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta
+import clock
+from candles import CandleStore
+
+DAY = datetime(2024, 6, 14)
+INSTRUMENT = {"token": 1, "symbol": "TEST", "exchange": "NSE"}
+
+
+class MinuteKite:
+    """historical_data() over a fixed run of minute candles, one per minute from 09:15."""
+
+    def __init__(self, until):
+        self.candles = []
+        when = DAY.replace(hour=9, minute=15)
+        while when <= until:
+            price = 100 + len(self.candles)
+            self.candles.append({"date": when, "open": price, "high": price + 1, "low": price - 1,
+                                 "close": price, "volume": 10})
+            when += timedelta(minutes=1)
+        self.calls = []
+
+    def historical_data(self, instrument_token, from_date, to_date, interval):
+        start, end = (datetime.strptime(date, "%Y-%m-%d %H:%M:%S") for date in (from_date, to_date))
+        self.calls.append((start, end))
+        return [candle for candle in self.candles if start <= candle["date"] <= end]
+
+
+def tick(store, price, when):
+    store.on_ticks(None, [{"instrument_token": INSTRUMENT["token"], "last_price": price, "exchange_timestamp": when}])
+
+
+def test_refresh_fills_a_feed_outage(monkeypatch):
+    now = DAY.replace(hour=10, minute=0, second=30)
+    monkeypatch.setattr(clock, "now", lambda: now)
+    kite = MinuteKite(DAY.replace(hour=10, minute=30))
+    store = CandleStore(kite, history_days=1)
+    store.frame(INSTRUMENT, "2minute")
+
+    # The feed is down from 10:00 to 10:20; the first tick back opens a 10:20 bar on its own
+    now = DAY.replace(hour=10, minute=20, second=5)
+    tick(store, 500, now)
+    frame = store.frame(INSTRUMENT, "2minute")
+
+    assert kite.calls[-1][0] == DAY.replace(hour=10, minute=0)  # From the last fetched bar, not the tick bar
+    expected = [DAY.replace(hour=9, minute=15) + timedelta(minutes=2 * i) for i in range(33)]
+    assert list(frame.df["date"]) == expected  # 09:59, 10:01, ... 10:19 with nothing missing
+    # Every bar carries the API's OHLC and volume, including the one the tick had opened
+    assert list(frame.df["volume"]) == [20] * 33
+    assert frame.df["close"].iloc[-1] == kite.candles[65]["close"]
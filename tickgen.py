@@ -0,0 +1,281 @@
+"""Seeded synthetic market for load- and soak-testing the tick pipeline.
+
+SyntheticMarket moves prices by a random walk, optionally with jumps, and
+emits ticks in the exact dict shape KiteTicker hands to on_ticks (ltp, quote
+or full mode), or packed as KiteTicker binary frames. TickStream paces them at
+a target rate shaped by a profile such as the market-open burst, and calls a
+sink with each batch. Quote-mode ticks are generated well above 100k/s on one
+core; full mode, with market depth, at about half that.
+
+    python tickgen.py --instruments 2000 --rate 100000 --profile open --duration 30 --sink candles
+"""
+import argparse
+import logging
+import math
+import random
+import struct
+import time
+from datetime import datetime, timedelta
+
+log = logging.getLogger(__name__)
+
+NSE_SEGMENT = 1  # Low byte of an instrument token; KiteTicker divides NSE prices by 100
+PRICE_DIVISOR = 100
+TICK_SIZE = 0.05
+BATCH_INTERVAL = 0.01  # Seconds of market time per on_ticks call at full pace
+DEPTH_LEVELS = 5
+
+
+def flat(elapsed):
+    return 1.0
+
+
+def market_open(elapsed):
+    """Ten times the base rate at the bell, settling to it over the first few minutes."""
+    return 1.0 + 9.0 * math.exp(-elapsed / 120)
+
+
+class Bursty:
+    """Quiet half-rate trading broken by seeded 1-3 second bursts at five times the rate."""
+
+    def __init__(self, seed=0, chance=0.1):
+        self.rng = random.Random(seed)
+        self.chance = chance
+        self.second = -1
+        self.burst_until = -1
+
+    def __call__(self, elapsed):
+        second = int(elapsed)
+        if second != self.second:
+            self.second = second
+            if second >= self.burst_until and self.rng.random() < self.chance:
+                self.burst_until = second + self.rng.randint(1, 3)
+        return 5.0 if second < self.burst_until else 0.5
+
+
+PROFILES = {"flat": lambda seed: flat, "open": lambda seed: market_open, "bursty": Bursty}
+
+
+def synthetic_instruments(count, exchange="NSE"):
+    return [{"token": (200000 + i) << 8 | NSE_SEGMENT, "symbol": f"SYN{i}", "exchange": exchange} for i in range(count)]
+
+
+class SyntheticMarket:
+    """Per-instrument price, day OHLC, volume and book state, advanced one tick at a time.
+
+    Prices follow a geometric random walk with `volatility` per sqrt(second) of
+    market time, plus Poisson jumps of `jump_size` (as a fraction of price) at
+    `jump_rate` per instrument per second when jump_rate > 0. Busier names tick
+    more often: activity falls off with a Zipf-like weight, as in a real watchlist.
+    """
+
+    def __init__(self, instruments, seed=0, volatility=0.0005, jump_rate=0.0, jump_size=0.01, tick_size=TICK_SIZE,
+                 start=None):
+        self.instruments = instruments
+        self.rng = random.Random(seed)
+        self.volatility = volatility
+        self.jump_rate = jump_rate
+        self.jump_size = jump_size
+        self.tick_size = tick_size
+        self.now = start or datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
+        self.tokens = [instrument["token"] for instrument in instruments]
+        self.weights = [1 / (rank + 1) ** 0.8 for rank in range(len(instruments))]
+        self.cumulative = list(self._accumulate(self.weights))
+        n = len(instruments)
+        self.close = [round(round(self.rng.uniform(50, 5000) / tick_size) * tick_size, 2) for _ in range(n)]
+        self.price = list(self.close)
+        self.open = list(self.close)
+        self.high = list(self.close)
+        self.low = list(self.close)
+        self.volume = [0] * n
+        self.turnover = [0.0] * n
+        self.last_quantity = [0] * n
+        self.last_trade = [self.now] * n
+
+    @staticmethod
+    def _accumulate(weights):
+        total = 0.0
+        for weight in weights:
+            total += weight
+            yield total
+
+    def step(self, i, dt):
+        """Trade instrument i after dt seconds since its last tick."""
+        rng = self.rng
+        price = self.price[i]
+        move = self.volatility * math.sqrt(max(dt, 1e-3)) * rng.gauss(0, 1)
+        if self.jump_rate and rng.random() < self.jump_rate * dt:
+            move += rng.gauss(0, self.jump_size)
+        price = max(self.tick_size, round(round(price * math.exp(move) / self.tick_size) * self.tick_size, 2))
+        quantity = int(rng.expovariate(1 / 50)) + 1
+        self.price[i] = price
+        if price > self.high[i]:
+            self.high[i] = price
+        if price < self.low[i]:
+            self.low[i] = price
+        self.volume[i] += quantity
+        self.turnover[i] += quantity * price
+        self.last_quantity[i] = quantity
+        self.last_trade[i] = self.now
+        return price
+
+    def tick(self, i, mode):
+        price = self.price[i]
+        token = self.tokens[i]
+        if mode == "ltp":
+            return {"tradable": True, "mode": mode, "instrument_token": token, "last_price": price}
+        volume = self.volume[i]
+        tick = {
+            "tradable": True, "mode": mode, "instrument_token": token, "last_price": price,
+            "last_traded_quantity": self.last_quantity[i],
+            "average_traded_price": round(self.turnover[i] / volume, 2) if volume else price,
+            "volume_traded": volume, "total_buy_quantity": volume // 2 + 1000, "total_sell_quantity": volume // 2 + 900,
+            "ohlc": {"open": self.open[i], "high": self.high[i], "low": self.low[i], "close": self.close[i]},
+            "change": (price - self.close[i]) * 100 / self.close[i],
+        }
+        if mode == "full":
+            step = self.tick_size
+            tick.update({
+                "last_trade_time": self.last_trade[i], "oi": 0, "oi_day_high": 0, "oi_day_low": 0,
+                "exchange_timestamp": self.now,
+                "depth": {
+                    "buy": [{"quantity": 100 * (k + 1), "price": round(price - step * (k + 1), 2), "orders": k + 1}
+                            for k in range(DEPTH_LEVELS)],
+                    "sell": [{"quantity": 100 * (k + 1), "price": round(price + step * (k + 1), 2), "orders": k + 1}
+                             for k in range(DEPTH_LEVELS)],
+                },
+            })
+        return tick
+
+    def batch(self, count, seconds, mode="quote"):
+        """`count` ticks spread over `seconds` of market time, each for an instrument drawn by activity."""
+        picks = self.rng.choices(range(len(self.tokens)), cum_weights=self.cumulative, k=count)
+        n = len(self.tokens)
+        ticks = []
+        for i in picks:
+            # Each name's share of the batch sets how long it went between ticks
+            self.step(i, seconds * n / max(count, 1))
+            ticks.append(self.tick(i, mode))
+        self.now += timedelta(seconds=seconds)
+        return ticks
+
+
+def encode(ticks):
+    """Pack ticks into one KiteTicker binary message (the inverse of KiteTicker._parse_binary)."""
+    price = lambda value: int(round(value * PRICE_DIVISOR))
+    packets = []
+    for tick in ticks:
+        if tick["mode"] == "ltp":
+            packet = struct.pack(">II", tick["instrument_token"], price(tick["last_price"]))
+        else:
+            ohlc = tick["ohlc"]
+            packet = struct.pack(">11I", tick["instrument_token"], price(tick["last_price"]),
+                                 tick["last_traded_quantity"], price(tick["average_traded_price"]),
+                                 tick["volume_traded"], tick["total_buy_quantity"], tick["total_sell_quantity"],
+                                 price(ohlc["open"]), price(ohlc["high"]), price(ohlc["low"]), price(ohlc["close"]))
+            if tick["mode"] == "full":
+                packet += struct.pack(">5I", int(tick["last_trade_time"].timestamp()), tick["oi"], tick["oi_day_high"],
+                                      tick["oi_day_low"], int(tick["exchange_timestamp"].timestamp()))
+                for level in tick["depth"]["buy"] + tick["depth"]["sell"]:
+                    packet += struct.pack(">IIHxx", level["quantity"], price(level["price"]), level["orders"])
+        packets.append(struct.pack(">H", len(packet)) + packet)
+    return struct.pack(">H", len(packets)) + b"".join(packets)
+
+
+class TickStream:
+    """Drive a sink with batches from a SyntheticMarket at `rate` ticks/s shaped by a profile.
+
+    Real-time mode sleeps to hold the pace and reports how far behind the sink
+    fell; otherwise batches go out back to back, as fast as the sink takes them.
+    """
+
+    def __init__(self, market, rate=1000, profile="flat", mode="quote", binary=False, seed=0,
+                 batch_interval=BATCH_INTERVAL):
+        self.market = market
+        self.rate = rate
+        self.profile = PROFILES[profile](seed) if isinstance(profile, str) else profile
+        self.mode = mode
+        self.binary = binary
+        self.batch_interval = batch_interval
+        self.stats = {"ticks": 0, "batches": 0, "max_lag": 0.0}
+
+    def run(self, sink, duration, realtime=True):
+        """Call sink(ticks) (or sink(frame) with binary=True) for `duration` seconds of market time."""
+        started = time.perf_counter()
+        elapsed = 0.0
+        carry = 0.0
+        while elapsed < duration:
+            wanted = self.rate * self.profile(elapsed) * self.batch_interval + carry
+            count = int(wanted)
+            carry = wanted - count
+            if count:
+                ticks = self.market.batch(count, self.batch_interval, self.mode)
+                sink(encode(ticks) if self.binary else ticks)
+                self.stats["ticks"] += count
+                self.stats["batches"] += 1
+            else:
+                self.market.now += timedelta(seconds=self.batch_interval)
+            elapsed += self.batch_interval
+            if realtime:
+                lag = time.perf_counter() - started - elapsed
+                if lag < 0:
+                    time.sleep(-lag)
+                else:
+                    self.stats["max_lag"] = max(self.stats["max_lag"], lag)
+        wall = time.perf_counter() - started
+        self.stats.update(seconds=wall, achieved_rate=self.stats["ticks"] / wall if wall else 0.0)
+        return self.stats
+
+
+def kite_ticker_sink(kws):
+    """Sink that pushes binary frames through a KiteTicker's own parser into its on_ticks, like the websocket does."""
+    def sink(frame):
+        kws.on_ticks(kws, kws._parse_binary(frame))
+    return sink
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Soak-test tick consumers with a seeded synthetic market.")
+    parser.add_argument("--instruments", type=int, default=200)
+    parser.add_argument("--rate", type=int, default=10000, help="Base ticks per second (before the profile)")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="flat")
+    parser.add_argument("--mode", choices=("ltp", "quote", "full"), default="quote")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of market time")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jumps", type=float, default=0.0, help="Jump rate per instrument per second")
+    parser.add_argument("--binary", action="store_true", help="Send KiteTicker binary frames through its parser")
+    parser.add_argument("--flat-out", action="store_true", help="Don't pace to real time; measure max throughput")
+    parser.add_argument("--sink", choices=("none", "universe", "candles", "pnl"), default="none")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    instruments = synthetic_instruments(args.instruments)
+    market = SyntheticMarket(instruments, seed=args.seed, jump_rate=args.jumps)
+
+    if args.sink == "universe":
+        from scanner import UniverseState
+        consumer = UniverseState(instruments).on_ticks
+    elif args.sink == "candles":
+        from candles import CandleStore, BaseSeries
+        store = CandleStore(None)
+        store.series = {instrument["token"]: BaseSeries() for instrument in instruments}
+        consumer = store.on_ticks
+    elif args.sink == "pnl":
+        from pnl import PnLEngine
+        consumer = PnLEngine().on_ticks
+    else:
+        consumer = lambda ws, ticks: None
+
+    if args.binary:
+        from kiteconnect import KiteTicker
+        kws = KiteTicker("soak", "soak")
+        kws.on_ticks = consumer
+        sink = kite_ticker_sink(kws)
+    else:
+        sink = lambda ticks: consumer(None, ticks)
+
+    stream = TickStream(market, args.rate, args.profile, args.mode, args.binary, args.seed)
+    stats = stream.run(sink, args.duration, realtime=not args.flat_out)
+    logging.info(f"{stats['ticks']} ticks in {stats['batches']} batches over {stats['seconds']:.2f}s: "
+                 f"{stats['achieved_rate']:.0f} ticks/s, max lag {stats['max_lag'] * 1000:.0f} ms")
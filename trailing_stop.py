@@ -0,0 +1,137 @@
+import logging
+import math
+import threading
+import clock
+from ratelimit import RateLimiter, ORDER_RATE
+
+log = logging.getLogger(__name__)
+
+MIN_MODIFY_INTERVAL = 0.5  # Seconds between modify_order calls for the same SL order
+DEFAULT_TICK = 0.05
+
+
+class TrailingPosition:
+    def __init__(self, symbol, token, sl_order_id, trigger, extreme, mode, distance, tick_size, atr=None):
+        self.symbol = symbol
+        self.token = token
+        self.sl_order_id = sl_order_id
+        self.trigger = trigger  # Trigger currently live at the broker
+        self.desired = trigger  # Latest trigger computed from ticks, sent when the throttle allows
+        self.extreme = extreme  # Lowest price seen since entry (the favourable side of a short)
+        self.mode = mode
+        self.distance = distance
+        self.tick_size = tick_size
+        self.atr = atr
+        self.last_modify = 0.0
+
+    def offset(self):
+        if self.mode == "percent":
+            return self.extreme * self.distance / 100
+        if self.mode == "atr":
+            if self.atr and not math.isnan(self.atr):
+                return self.distance * self.atr
+            return self.distance  # NaN until the ATR window has filled; points meanwhile
+        return self.distance
+
+    def trail(self, ltp):
+        """Track a new low and tighten the desired trigger; returns True if it moved by at least a tick."""
+        if ltp >= self.extreme:
+            return False
+        self.extreme = ltp
+        # Round up onto the tick grid so the stop never sits tighter than configured
+        desired = math.ceil(round((self.extreme + self.offset()) / self.tick_size, 6)) * self.tick_size
+        desired = round(desired, 2)
+        if self.desired - desired >= self.tick_size - 1e-9:
+            self.desired = desired
+            return True
+        return False
+
+
+class TrailingStopEngine:
+    """Trail the SL-M leg of open shorts from ticks, coalescing modify_order calls per order.
+
+    Ticks only update in-memory state. A single worker thread sends at most one
+    modify per order every MIN_MODIFY_INTERVAL seconds, always with the latest
+    trigger, so a fast market costs one API call per order per interval.
+    """
+
+    def __init__(self, kite, min_interval=MIN_MODIFY_INTERVAL):
+        self.kite = kite
+        self.min_interval = min_interval
+        self.limiter = RateLimiter(ORDER_RATE)
+        self.positions = {}  # symbol -> TrailingPosition
+        self.by_token = {}  # instrument token -> TrailingPosition
+        self.atr = {}  # symbol -> latest ATR, for "atr" mode; set through set_atr()
+        self.condition = threading.Condition()
+        self.running = True
+        self.worker = threading.Thread(target=self.run, name="trailing-stop", daemon=True)
+        self.worker.start()
+
+    def track(self, instrument, sl_order_id, trigger, entry_price, trail, tick_size=DEFAULT_TICK):
+        """Start trailing an SL order. trail: {"mode": "points"|"percent"|"atr", "distance": x}."""
+        mode = trail.get("mode", "points")
+        atr = self.atr.get(instrument["symbol"])
+        if mode == "atr" and (not atr or math.isnan(atr)):
+            log.warning(f"No ATR yet for {instrument['symbol']}; trailing by {trail['distance']} points until there is")
+        position = TrailingPosition(instrument["symbol"], instrument["token"], sl_order_id, trigger,
+                                    entry_price, mode, trail["distance"], tick_size, atr)
+        with self.condition:
+            self.positions[position.symbol] = position
+            self.by_token[position.token] = position
+        log.info(f"Trailing SL {sl_order_id} for {position.symbol} by {trail['distance']} ({mode}) from {trigger}")
+
+    def set_atr(self, symbol, atr):
+        """Latest ATR for a symbol; an open position trails by it from its next new low on."""
+        with self.condition:
+            self.atr[symbol] = atr
+            position = self.positions.get(symbol)
+            if position:
+                position.atr = atr
+
+    def remove(self, symbol):
+        with self.condition:
+            position = self.positions.pop(symbol, None)
+            if position:
+                self.by_token.pop(position.token, None)
+
+    def on_ticks(self, ws, ticks):
+        moved = False
+        with self.condition:
+            for tick in ticks:
+                position = self.by_token.get(tick["instrument_token"])
+                if position and position.trail(tick["last_price"]):
+                    moved = True
+            if moved:
+                self.condition.notify()
+
+    def due(self, now):
+        """Positions whose desired trigger differs from the live one and whose throttle has expired."""
+        return [p for p in self.positions.values()
+                if p.desired < p.trigger and now - p.last_modify >= self.min_interval]
+
+    def run(self):
+        while self.running:
+            with self.condition:
+                now = clock.monotonic()
+                ready = self.due(now)
+                if not ready:
+                    waiting = [p.last_modify + self.min_interval - now for p in self.positions.values() if p.desired < p.trigger]
+                    clock.wait(self.condition, max(min(waiting), 0.001) if waiting else None)
+                    continue
+                sends = [(p, p.desired) for p in ready]
+                for position, _ in sends:
+                    position.last_modify = now
+            for position, trigger in sends:
+                self.limiter.acquire()
+                try:
+                    self.kite.modify_order(variety="regular", order_id=position.sl_order_id, trigger_price=trigger)
+                    with self.condition:
+                        position.trigger = trigger
+                    log.info(f"🛑 Trailed SL for {position.symbol} to {trigger} (low {position.extreme})")
+                except Exception as e:
+                    log.error(f"Error trailing SL for {position.symbol}: {e}")
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
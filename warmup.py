@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import clock
+from candles import SESSION_OPEN, DEFAULT_SESSION_OPEN, CLOSE
+from ratelimit import RateLimiter, HISTORICAL_RATE
+
+log = logging.getLogger(__name__)
+
+WARM_CONNECTIONS = 4  # Pooled keep-alive connections opened per API host (requests pools up to 10)
+KEEPALIVE_INTERVAL = 25  # Seconds between pings, under the ~60s idle timeout of the API's load balancers
+PING_TIMEOUT = 5
+CONNECT_TIMEOUT = 30  # Seconds run() waits for the websocket before reporting it down
+FINAL_REFRESH = 20  # Seconds before the open for the last top-up; inside pretrade's MARGIN_TTL, so the first cycle reuses it
+OPEN_GRACE = 60  # Seconds after the open park() gives up waiting for a first tick (e.g. a holiday)
+
+
+def origins(kite):
+    """scheme://host/ of every API host the session talks to (KiteApp sends both data and orders to root2)."""
+    urls = []
+    for url in (getattr(kite, "root", None), getattr(kite, "root2", None)):
+        if url:
+            parts = urlsplit(url)
+            origin = f"{parts.scheme}://{parts.netloc}/"
+            if origin not in urls:
+                urls.append(origin)
+    return urls
+
+
+class ConnectionWarmer:
+    """Keep `connections` pooled keep-alive connections open to each host of a requests session.
+
+    A ping is one HEAD per connection, all in flight at once: urllib3 hands out
+    the most recently used connection first, so sequential pings would keep a
+    single socket alive while the rest idled out and cost a TLS handshake on
+    the next burst of requests.
+    """
+
+    def __init__(self, session, urls, connections=WARM_CONNECTIONS, interval=KEEPALIVE_INTERVAL):
+        self.session = session
+        self.urls = urls
+        self.connections = connections
+        self.interval = interval
+        self.pool = ThreadPoolExecutor(max_workers=connections * max(len(urls), 1), thread_name_prefix="keepalive")
+        self.stopped = threading.Event()
+
+    def ping(self):
+        """One round of pings; returns how many got a response."""
+        futures = [self.pool.submit(self.session.head, url, timeout=PING_TIMEOUT)
+                   for url in self.urls for _ in range(self.connections)]
+        answered = 0
+        for future in futures:
+            try:
+                future.result()
+                answered += 1
+            except Exception as e:
+                log.debug(f"Keep-alive ping failed: {e}")
+        return answered
+
+    def start(self):
+        """Open the connections now and keep them alive in the background until stop()."""
+        answered = self.ping()
+        threading.Thread(target=self.run, name="keepalive", daemon=True).start()
+        return answered
+
+    def run(self):
+        while not clock.wait_event(self.stopped, self.interval):
+            self.ping()
+
+    def stop(self):
+        self.stopped.set()
+        self.pool.shutdown(wait=False)
+
+
+class WarmUp:
+    """Bring a script to the open with history, indicators, instruments, connections and websocket warm.
+
+    run() loads minute history for every instrument into the CandleStore in
+    parallel under the historical rate limit while pooled connections to the
+    API hosts are opened (and kept alive by pings from then on), then calls
+    `prepare(instrument)` once each - the script's own fetch and indicator code,
+    so pandas' lazy imports and first-call costs are paid now - and waits for
+    the websocket. park() holds the caller until the session's first tick,
+    topping up margins just before the open and marking the history current,
+    so the first cycle makes no candle or margin calls.
+    """
+
+    def __init__(self, kite, candles, instruments, validator=None, connections=WARM_CONNECTIONS,
+                 keepalive=KEEPALIVE_INTERVAL):
+        self.kite = kite
+        self.candles = candles
+        self.instruments = instruments
+        self.validator = validator
+        self.limiter = RateLimiter(HISTORICAL_RATE)
+        session, urls = getattr(kite, "reqsession", None), origins(kite)
+        self.warmer = ConnectionWarmer(session, urls, connections, keepalive) if session is not None and urls else None
+        minutes = min((SESSION_OPEN.get(instrument.get("exchange"), DEFAULT_SESSION_OPEN) for instrument in instruments),
+                      default=DEFAULT_SESSION_OPEN)
+        self.opens_at = clock.now().replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+        self.connected = threading.Event()
+        self.opened = threading.Event()
+        self.ready = threading.Event()
+        self.report = {}
+
+    def attach(self, kws):
+        """Watch the ticker for its connection and for the first tick of the session."""
+        previous_ticks, previous_connect = kws.on_ticks, kws.on_connect
+
+        def on_ticks(ws, ticks):
+            if previous_ticks:
+                previous_ticks(ws, ticks)
+            if ticks and not self.opened.is_set():
+                if (ticks[0].get("exchange_timestamp") or clock.now()) >= self.opens_at:
+                    self.opened.set()
+
+        def on_connect(ws, response):
+            if previous_connect:
+                previous_connect(ws, response)
+            self.connected.set()
+
+        kws.on_ticks = on_ticks
+        kws.on_connect = on_connect
+
+    def load(self, instrument):
+        self.limiter.acquire()
+        series = self.candles.refresh(instrument)
+        return len(series.bars) if series is not None else 0
+
+    def run(self, prepare=None, timeout=CONNECT_TIMEOUT):
+        """Warm everything up; logs and returns a report of what is ready."""
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=HISTORICAL_RATE + 1, thread_name_prefix="warmup") as pool:
+            connections = pool.submit(self.warmer.start) if self.warmer else None
+            bars = sum(pool.map(self.load, self.instruments))
+            loaded = time.monotonic() - started
+            if prepare:
+                for instrument in self.instruments:
+                    try:
+                        prepare(instrument)
+                    except Exception as e:
+                        log.error(f"Error preparing {instrument['symbol']}: {e}")
+            warm = connections.result() if connections else 0
+        connected = clock.wait_event(self.connected, timeout)
+        resolved = len([i for i in self.instruments if self.validator and i["symbol"] in self.validator.instrument_meta])
+        self.report = {
+            "instruments": len(self.instruments), "bars": bars, "resolved": resolved, "history_seconds": loaded,
+            "connections": warm, "hosts": self.warmer.urls if self.warmer else [], "websocket": connected,
+            "seconds": time.monotonic() - started,
+        }
+        self.ready.set()
+        log.info(f"🔥 Warm in {self.report['seconds']:.1f}s: {bars} minute bars for {len(self.instruments)} instruments "
+                 f"({loaded:.1f}s), {resolved} instruments resolved, {warm} connections to {self.report['hosts']}, "
+                 f"websocket {'connected' if connected else 'NOT connected'}")
+        return self.report
+
+    def top_up(self):
+        """Just before the open: quote margins at the last closes and mark the history current for the open."""
+        prices = {}
+        for instrument in self.instruments:
+            series = self.candles.series.get(instrument["token"])
+            if series is not None and series.bars:
+                prices[instrument["token"]] = {"ltp": series.bars[-1][CLOSE]}
+        if self.validator:
+            self.validator.refresh_margins(self.instruments, prices, force=True)
+        self.candles.mark_fetched(self.opens_at)  # No candle forms before the open, so the first cycle needn't fetch
+
+    def park(self):
+        """Before the open, hold the caller until the session's first tick; returns at once once the market is open."""
+        wait = (self.opens_at - clock.now()).total_seconds()
+        if wait <= 0:
+            return
+        log.info(f"🅿️ Ready and parked until the {self.opens_at:%H:%M} open ({wait / 60:.0f} min)")
+        if wait > FINAL_REFRESH:
+            clock.sleep(wait - FINAL_REFRESH)
+        self.top_up()
+        if clock.wait_event(self.opened, (self.opens_at - clock.now()).total_seconds() + OPEN_GRACE):
+            log.info("🔔 First tick of the session, evaluating")
+        else:
+            log.warning(f"No tick within {OPEN_GRACE}s of the open; starting the cycle anyway")
+
+    def stop(self):
+        if self.warmer:
+            self.warmer.stop()